@@ -0,0 +1,109 @@
+"""按日聚合结果的旁路缓存（``data/.aggcache.json``）。
+
+每个日文件缓存一条：按进程的全天总秒数与逐小时秒数桶。条目以文件大小与
+mtime 校验，文件变化后自动失效并在下次访问时重建；整体超出体积预算时按最近
+使用时间淘汰。读取缓存不依赖 pandas。
+"""
+
+import json
+import os
+import time
+
+from core import DATA_DIR, time_to_seconds as _seconds
+
+CACHE_FILE = os.path.join(DATA_DIR, ".aggcache.json")
+CACHE_BUDGET = 2 * 1024 * 1024  # 旁路文件体积上限（字节）
+VERSION = 3  # 3：跨午夜记录（end < start）计到 24:00 为止，小时桶固定 24 个
+
+
+def file_signature(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def hour_aligned(start: str | None, end: str | None) -> bool:
+    """区间端点均落在整点（或未指定）时，可直接由小时桶求得区间用时。"""
+    try:
+        return all(_seconds(t) % 3600 == 0 for t in (start, end) if t)
+    except ValueError:
+        return False
+
+
+def minutes_in_range(entry: dict, start: str | None, end: str | None) -> dict[str, float]:
+    """由缓存条目求 {process: minutes}；区间须满足 hour_aligned。"""
+    if not start and not end:
+        return {p: sec / 60 for p, sec in entry["totals"].items()}
+    h0 = _seconds(start) // 3600 if start else 0
+    h1 = _seconds(end) // 3600 if end else 24
+    out = {}
+    for proc, buckets in entry["hours"].items():
+        sec = sum(buckets[h0:h1])
+        if sec > 0:
+            out[proc] = sec / 60.0
+    return out
+
+
+class AggCache:
+    """旁路缓存文件的读写。非线程安全：由调用方（主进程）统一读写。"""
+
+    def __init__(self, path: str = CACHE_FILE, budget: int = CACHE_BUDGET):
+        self.path = path
+        self.budget = budget
+        self._dirty = False
+        self._entries = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == VERSION:
+                self._entries = data.get("entries", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def get(self, path: str) -> dict | None:
+        """返回仍然有效的条目；文件已变化或无条目时返回 None。"""
+        key = self._key(path)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        sig = file_signature(path)
+        if sig is None or [entry["size"], entry["mtime"]] != list(sig):
+            del self._entries[key]
+            self._dirty = True
+            return None
+        entry["used"] = time.time()
+        self._dirty = True
+        return entry
+
+    def put(self, path: str, entry: dict):
+        entry["used"] = time.time()
+        self._entries[self._key(path)] = entry
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        sizes = {k: len(json.dumps(v, ensure_ascii=False).encode("utf-8")) for k, v in self._entries.items()}
+        total = sum(sizes.values())
+        # 按最近使用时间淘汰，直到满足体积预算
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["used"]):
+            if total <= self.budget:
+                break
+            total -= sizes[key]
+            del self._entries[key]
+
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": VERSION, "entries": self._entries}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            pass
@@ -1,147 +1,263 @@
-import threading
+import multiprocessing
+import queue
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
-from tkinter import messagebox, filedialog
+from tkinter import messagebox, filedialog, ttk
 import os
 from datetime import datetime
 
 # Local imports
+import live
 import tracker
-import stats
 
-# 状态文件，用于与托盘同步显示
-DATA_DIR = os.path.join(os.getcwd(), "data")
-STATE_FILE = os.path.join(DATA_DIR, "state.txt")
+# stats（pandas/matplotlib）在首次统计/绘图时才导入，GUI 启动不加载
 
+LIVE_REFRESH_MS = 5000  # “今日至今”统计的刷新间隔
+STATE_DRAIN_MS = 200  # 从 IPC 推送队列取状态的间隔（仅内存队列，不读文件）
+RECONNECT_MS = 5000  # 未连上记录进程时的重连间隔
 
-def read_state() -> str:
-    try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            val = f.read().strip().lower()
-            if val == "running":
-                return "running"
-    except Exception:
-        pass
-    return "stopped"
-
-class TrackerManager:
-    def __init__(self):
-        self._tracker = None
-        self._thread = None
-        self._running = False
-
-    def start(self):
-        if self._running:
-            return
-        self._tracker = tracker.Tracker()
-        self._running = True
-        # 若当天 CSV 不存在或为空，先创建并写入表头
-        try:
-            tracker.ensure_today_file_with_header()
-        except Exception:
-            pass
-        self._thread = threading.Thread(target=self._tracker.loop, daemon=True)
-        self._thread.start()
-        try:
-            tracker.set_state(True)
-        except Exception:
-            pass
-
-    def stop(self):
-        if not self._running:
-            return
-        try:
-            self._tracker.stop()
-        except Exception:
-            pass
-        self._running = False
-        self._tracker = None
-        self._thread = None
-        try:
-            tracker.set_state(False)
-        except Exception:
-            pass
-
-    @property
-    def running(self):
-        return self._running
+# 时间段预设：名称 -> (开始, 结束)
+PRESET_RANGES = {
+    "全天": (None, None),
+    "上午 (09:00-12:00)": ("09:00:00", "12:00:00"),
+    "下午 (13:00-18:00)": ("13:00:00", "18:00:00"),
+    "晚上 (18:00-23:00)": ("18:00:00", "23:00:00"),
+    "工作时段 (09:00-18:00)": ("09:00:00", "18:00:00"),
+    "不限制": (None, None),
+}
 
 
 def today_str():
     return datetime.now().strftime("%Y-%m-%d")
 
 
-def on_start(manager: TrackerManager, status_var: tk.StringVar):
+def format_state(msg: dict) -> str:
+    if msg.get("running"):
+        text = "状态：记录中…"
+        if msg.get("process"):
+            text += f"（当前：{msg['process']}，自 {msg.get('since') or '—'}）"
+        if msg.get("records"):
+            text += f"  本次已记录 {msg['records']} 段"
+        return text
+    if msg.get("disconnected"):
+        return "状态：记录进程已退出"
+    if msg.get("unavailable"):
+        return "状态：记录进程不可用，请稍后重试"
+    return "状态：未开始"
+
+
+def on_start(recorder: tracker.RecorderControl, status_var: tk.StringVar):
     try:
-        manager.start()
-        status_var.set("状态：记录中…")
+        status_var.set(format_state(recorder.start()))
     except Exception as e:
         messagebox.showerror("启动失败", str(e))
 
 
-def on_stop(manager: TrackerManager, status_var: tk.StringVar):
+def on_stop(recorder: tracker.RecorderControl, status_var: tk.StringVar):
     try:
-        manager.stop()
-        status_var.set("状态：已停止")
+        status_var.set(format_state(recorder.stop()))
     except Exception as e:
         messagebox.showerror("停止失败", str(e))
 
 
-def on_view(day_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
-    day = day_var.get().strip() or today_str()
-    path = os.path.join("data", f"{day}.csv")
-    df = stats.load_dataframe(path)
-    if df is None:
-        return
-    start = start_var.get().strip() or None
-    end = end_var.get().strip() or None
-    minutes = stats.compute_minutes_in_range(df, start, end)
-    stats.plot_minutes(minutes, day, save_dir=None, show=True)
+class BackgroundLoader:
+    """GUI 后台加载：任务在工作线程中执行，结果经 root.after 回到 Tk 主线程处理。
+
+    submit() 只保留最新的请求：新请求到来时，尚未开始的旧任务被取消，已在运行的旧任务
+    结果被丢弃，因此快速连续切换日期只会显示最后一次的结果。run() 提交的任务（如保存图表）
+    在独立的工作线程中执行，不参与合并，一定会执行并回调。
+    """
+
+    POLL_MS = 50
+
+    def __init__(self, root: tk.Tk, busy_var: tk.StringVar, progress=None):
+        self.root = root
+        self.busy_var = busy_var
+        self.progress = progress
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui-load")
+        self._job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui-job")
+        self._current = None  # (future, on_done, on_error, message)
+        self._jobs = []  # run() 提交的任务，同上
+        self._polling = False
+
+    def submit(self, func, on_done, on_error=None, message: str = "加载中…"):
+        if self._current is not None:
+            self._current[0].cancel()
+        self._current = (self._executor.submit(func), on_done, on_error, message)
+        self._start_polling()
+
+    def run(self, func, on_done, on_error=None, message: str = "处理中…"):
+        self._jobs.append((self._job_executor.submit(func), on_done, on_error, message))
+        self._start_polling()
+
+    def _start_polling(self):
+        self._set_busy(self._busy_message())
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+
+    def _busy_message(self) -> str:
+        pending = ([self._current] if self._current is not None else []) + self._jobs
+        return pending[0][3] if pending else ""
+
+    def _poll(self):
+        finished = [job for job in self._jobs if job[0].done()]
+        self._jobs = [job for job in self._jobs if not job[0].done()]
+        if self._current is not None and self._current[0].done():
+            finished.append(self._current)
+            self._current = None
+        self._set_busy(self._busy_message())
+        if self._current is not None or self._jobs:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+        for future, on_done, on_error, _ in finished:
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                (on_error or show_load_error)(e)
+                continue
+            on_done(result)
+
+    def _set_busy(self, message: str):
+        self.busy_var.set(message)
+        try:
+            self.root.configure(cursor="watch" if message else "")
+            if self.progress is not None:
+                if message:
+                    self.progress.start(10)
+                else:
+                    self.progress.stop()
+        except tk.TclError:
+            pass
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._job_executor.shutdown(wait=False, cancel_futures=True)
 
 
-def on_save(day_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
+def show_load_error(e: Exception):
+    if isinstance(e, ValueError):
+        messagebox.showerror("格式错误", "日期格式应为 YYYY-MM-DD，时间格式应为 HH:MM:SS")
+    else:
+        messagebox.showerror("加载失败", str(e))
+
+
+def read_selection(day_var: tk.StringVar, day_to_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
+    """在主线程读取界面选择，返回 (day, day_to, start, end)。"""
     day = day_var.get().strip() or today_str()
-    path = os.path.join("data", f"{day}.csv")
-    df = stats.load_dataframe(path)
-    if df is None:
-        return
-    start = start_var.get().strip() or None
-    end = end_var.get().strip() or None
-    minutes = stats.compute_minutes_in_range(df, start, end)
+    day_to = day_to_var.get().strip() or day
+    return day, day_to, start_var.get().strip() or None, end_var.get().strip() or None
+
+
+def load_minutes(day: str, day_to: str, start: str | None, end: str | None):
+    """（工作线程）加载并聚合；day_to 晚于 day 时按多日区间统计。返回 (minutes, hours, 标签)。
+
+    单日时通过 stats.DaySession 一次解析同时得到总计与小时分布；多日时 hours 为 None。
+    日期或时间格式错误时抛出 ValueError。
+    """
+    import stats
+
+    days = stats.day_range(day, day_to)
+    if len(days) == 1:
+        session = stats.DaySession(days[0], start, end)
+        return session.minutes(), session.hours(), days[0]
+    # 全天与整点区间由旁路缓存直接提供，历史日期无需重新解析 CSV
+    return stats.compute_minutes_for_days(days, start, end), None, f"{days[0]}_{days[-1]}"
+
 
+def _no_data(label: str):
+    messagebox.showinfo("无数据", f"{label.replace('_', ' ~ ')} 没有记录")
+
+
+def on_view(loader: BackgroundLoader, get_panel, day_var: tk.StringVar, day_to_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
+    """后台加载后在窗口内嵌的图表面板中就地更新柱状图。"""
+    selection = read_selection(day_var, day_to_var, start_var, end_var)
+
+    def done(result):
+        minutes, hours, label = result
+        if minutes.empty:
+            _no_data(label)
+            return
+        get_panel().show_minutes(minutes, label, hours)
+
+    loader.submit(lambda: load_minutes(*selection), done)
+
+
+def on_view_pie(loader: BackgroundLoader, get_panel, day_var: tk.StringVar, day_to_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
+    selection = read_selection(day_var, day_to_var, start_var, end_var)
+
+    def done(result):
+        minutes, _, label = result
+        if minutes.empty:
+            _no_data(label)
+            return
+        get_panel().show_pie(minutes, label)
+
+    loader.submit(lambda: load_minutes(*selection), done)
+
+
+def _save_chart(loader: BackgroundLoader, kind: str, selection):
     out_dir = filedialog.askdirectory(title="选择保存目录")
     if not out_dir:
         return
-    saved = stats.plot_minutes(minutes, day, save_dir=out_dir, show=False)
-    if saved:
-        messagebox.showinfo("已保存", f"已保存：{saved}")
 
-def on_view_pie(day_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
-    day = day_var.get().strip() or today_str()
-    path = os.path.join("data", f"{day}.csv")
-    df = stats.load_dataframe(path)
-    if df is None:
-        return
-    start = start_var.get().strip() or None
-    end = end_var.get().strip() or None
-    minutes = stats.compute_minutes_in_range(df, start, end)
-    stats.plot_pie(minutes, day, save_dir=None, show=True)
+    def job():
+        import stats
+
+        minutes, _, label = load_minutes(*selection)
+        if minutes.empty:
+            return None, label
+        # Agg 渲染不经过 pyplot，可在工作线程中完成
+        return stats.save_chart(minutes, label, out_dir, kind), label
+
+    def done(result):
+        saved, label = result
+        if saved is None:
+            _no_data(label)
+        else:
+            messagebox.showinfo("已保存", f"已保存：{saved}")
 
-def on_save_pie(day_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
+    # 保存不与视图刷新合并：之后切换视图不会取消保存，也不会丢掉“已保存”的提示
+    loader.run(job, done, message="保存中…")
+
+
+def on_save(loader: BackgroundLoader, day_var: tk.StringVar, day_to_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
+    _save_chart(loader, "bar", read_selection(day_var, day_to_var, start_var, end_var))
+
+
+def on_save_pie(loader: BackgroundLoader, day_var: tk.StringVar, day_to_var: tk.StringVar, start_var: tk.StringVar, end_var: tk.StringVar):
+    _save_chart(loader, "pie", read_selection(day_var, day_to_var, start_var, end_var))
+
+
+def on_compare_ranges(loader: BackgroundLoader, day_var: tk.StringVar):
+    """各时间段预设并排对比；所有时间段共用一次区间索引构建。"""
     day = day_var.get().strip() or today_str()
-    path = os.path.join("data", f"{day}.csv")
-    df = stats.load_dataframe(path)
-    if df is None:
-        return
-    start = start_var.get().strip() or None
-    end = end_var.get().strip() or None
-    minutes = stats.compute_minutes_in_range(df, start, end)
 
-    out_dir = filedialog.askdirectory(title="选择保存目录")
-    if not out_dir:
-        return
-    saved = stats.plot_pie(minutes, day, save_dir=out_dir, show=False)
-    if saved:
-        messagebox.showinfo("已保存", f"已保存：{saved}")
+    def job():
+        import stats
+
+        session = stats.DaySession(day)
+        if session.minutes().empty:
+            return None
+        ranges = {k: v for k, v in PRESET_RANGES.items() if k != "不限制"}
+        lines = []
+        for label, (start, end) in ranges.items():
+            minutes = session.minutes_in_range(start, end)
+            total = float(minutes.sum()) if not minutes.empty else 0.0
+            top = "，".join(f"{p} {m:.0f}" for p, m in minutes.head(3).items())
+            lines.append(f"{label}：{total:.1f} 分钟" + (f"\n    {top}" if top else ""))
+        return lines
+
+    def done(lines):
+        if lines is None:
+            _no_data(day)
+        else:
+            messagebox.showinfo(f"时段对比 — {day}", "\n".join(lines))
+
+    loader.submit(job, done)
 
 
 def on_open_data_folder():
@@ -149,34 +265,45 @@ def on_open_data_folder():
     os.startfile(os.path.abspath("data"))
 
 
-def on_quit(root: tk.Tk, manager: TrackerManager):
+def on_quit(root: tk.Tk, recorder: tracker.RecorderControl, loader: BackgroundLoader | None = None):
     try:
-        manager.stop()
+        # 本进程持锁时停止记录；记录进程是托盘时只断开连接，托盘继续记录
+        recorder.close()
     finally:
+        if loader is not None:
+            loader.shutdown()
         root.destroy()
 
 
 def main():
+    # 多日统计使用进程池；打包为 EXE 时需要
+    multiprocessing.freeze_support()
     root = tk.Tk()
     root.title("What did I do")
-    root.geometry("560x360")
+    root.geometry("900x780")
 
-    manager = TrackerManager()
+    # 记录由持有单写者锁的进程负责（通常是托盘）；GUI 经本地 IPC 控制并接收状态推送，
+    # 只有在没有记录进程时点击“开始记录”才在本进程内接管
+    states: queue.Queue = queue.Queue()
+    recorder = tracker.RecorderControl(host=False, on_state=states.put)
 
     frm = tk.Frame(root, padx=12, pady=12)
     frm.pack(fill=tk.BOTH, expand=True)
 
     status_var = tk.StringVar(value="状态：未开始")
     day_var = tk.StringVar(value=today_str())
+    day_to_var = tk.StringVar(value="")
 
     # Row 1: status
     tk.Label(frm, textvariable=status_var, anchor="w").pack(fill=tk.X)
+    live_var = tk.StringVar(value="今日至今：—")
+    tk.Label(frm, textvariable=live_var, anchor="w", fg="#555").pack(fill=tk.X)
 
     # Row 2: controls
     ctrl = tk.Frame(frm)
     ctrl.pack(fill=tk.X, pady=(8, 0))
-    tk.Button(ctrl, text="开始记录", command=lambda: on_start(manager, status_var)).pack(side=tk.LEFT)
-    tk.Button(ctrl, text="停止记录", command=lambda: on_stop(manager, status_var)).pack(side=tk.LEFT, padx=6)
+    tk.Button(ctrl, text="开始记录", command=lambda: on_start(recorder, status_var)).pack(side=tk.LEFT)
+    tk.Button(ctrl, text="停止记录", command=lambda: on_stop(recorder, status_var)).pack(side=tk.LEFT, padx=6)
     tk.Button(ctrl, text="打开数据文件夹", command=on_open_data_folder).pack(side=tk.RIGHT)
 
     # Row 3: day & time selection
@@ -184,34 +311,20 @@ def main():
     row3.pack(fill=tk.X, pady=(12, 0))
     tk.Label(row3, text="日期 YYYY-MM-DD：").pack(side=tk.LEFT)
     tk.Entry(row3, textvariable=day_var, width=12).pack(side=tk.LEFT)
+    tk.Label(row3, text=" 至（可选，多日统计）：").pack(side=tk.LEFT)
+    tk.Entry(row3, textvariable=day_to_var, width=12).pack(side=tk.LEFT)
 
     # 时间段选择下拉
     time_row = tk.Frame(frm)
     time_row.pack(fill=tk.X, pady=(8, 0))
     tk.Label(time_row, text="选择时间段：").pack(side=tk.LEFT)
     range_var = tk.StringVar(value="全天")
-    ranges = [
-        "全天",
-        "上午 (09:00-12:00)",
-        "下午 (13:00-18:00)",
-        "晚上 (18:00-23:00)",
-        "工作时段 (09:00-18:00)",
-        "不限制",
-        "自定义…",
-    ]
+    ranges = list(PRESET_RANGES) + ["自定义…"]
     range_box = tk.OptionMenu(time_row, range_var, *ranges)
     range_box.pack(side=tk.LEFT)
 
     def range_to_times(sel: str):
-        mapping = {
-            "全天": (None, None),
-            "不限制": (None, None),
-            "上午 (09:00-12:00)": ("09:00:00", "12:00:00"),
-            "下午 (13:00-18:00)": ("13:00:00", "18:00:00"),
-            "晚上 (18:00-23:00)": ("18:00:00", "23:00:00"),
-            "工作时段 (09:00-18:00)": ("09:00:00", "18:00:00"),
-        }
-        return mapping.get(sel, (None, None))
+        return PRESET_RANGES.get(sel, (None, None))
 
     # 自定义输入框（默认禁用）
     # 自定义时间：开始时间行
@@ -255,22 +368,76 @@ def main():
     # Row 4: stats buttons
     row4 = tk.Frame(frm)
     row4.pack(fill=tk.X, pady=(12, 0))
-    tk.Button(row4, text="查看图表", command=lambda: on_view(day_var, tk.StringVar(value=get_selected_times()[0]), tk.StringVar(value=get_selected_times()[1]))).pack(side=tk.LEFT)
-    tk.Button(row4, text="保存图表…", command=lambda: on_save(day_var, tk.StringVar(value=get_selected_times()[0]), tk.StringVar(value=get_selected_times()[1]))).pack(side=tk.LEFT, padx=6)
-    tk.Button(row4, text="查看饼图", command=lambda: on_view_pie(day_var, tk.StringVar(value=get_selected_times()[0]), tk.StringVar(value=get_selected_times()[1]))).pack(side=tk.LEFT, padx=6)
-    tk.Button(row4, text="保存饼图…", command=lambda: on_save_pie(day_var, tk.StringVar(value=get_selected_times()[0]), tk.StringVar(value=get_selected_times()[1]))).pack(side=tk.LEFT)
-
-    def refresh_status():
-        st = read_state()
-        if st == "running":
-            status_var.set("状态：记录中…")
-        else:
-            # 若本地 manager 在运行但状态文件未更新，也显示记录中
-            status_var.set("状态：记录中…" if manager.running else "状态：未开始")
-        root.after(1000, refresh_status)
+    busy_var = tk.StringVar(value="")
+    progress = ttk.Progressbar(row4, mode="indeterminate", length=80)
+    progress.pack(side=tk.RIGHT)
+    tk.Label(row4, textvariable=busy_var, fg="#555").pack(side=tk.RIGHT, padx=6)
+    loader = BackgroundLoader(root, busy_var, progress)
+    tk.Button(row4, text="查看图表", command=lambda: on_view(loader, get_panel, day_var, day_to_var, tk.StringVar(value=get_selected_times()[0]), tk.StringVar(value=get_selected_times()[1]))).pack(side=tk.LEFT)
+    tk.Button(row4, text="保存图表…", command=lambda: on_save(loader, day_var, day_to_var, tk.StringVar(value=get_selected_times()[0]), tk.StringVar(value=get_selected_times()[1]))).pack(side=tk.LEFT, padx=6)
+    tk.Button(row4, text="查看饼图", command=lambda: on_view_pie(loader, get_panel, day_var, day_to_var, tk.StringVar(value=get_selected_times()[0]), tk.StringVar(value=get_selected_times()[1]))).pack(side=tk.LEFT, padx=6)
+    tk.Button(row4, text="保存饼图…", command=lambda: on_save_pie(loader, day_var, day_to_var, tk.StringVar(value=get_selected_times()[0]), tk.StringVar(value=get_selected_times()[1]))).pack(side=tk.LEFT)
+    tk.Button(row4, text="时段对比", command=lambda: on_compare_ranges(loader, day_var)).pack(side=tk.LEFT, padx=6)
+
+    # Row 5: 内嵌图表面板（首次查看时才创建，启动时不加载 matplotlib）
+    chart_frame = tk.Frame(frm)
+    chart_frame.pack(fill=tk.BOTH, expand=True, pady=(12, 0))
+    panel = None
+
+    def get_panel():
+        nonlocal panel
+        if panel is None:
+            import chartpanel
+
+            panel = chartpanel.ChartPanel(chart_frame)
+            panel.widget.pack(fill=tk.BOTH, expand=True)
+        return panel
+
+    def drain_states():
+        # IPC 推送在后台线程到达，这里在 Tk 主线程中应用最新一条
+        latest = None
+        while True:
+            try:
+                latest = states.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            status_var.set(format_state(latest))
+            refresh_live(reschedule=False)
+            if latest.get("disconnected"):
+                root.after(RECONNECT_MS, reconnect)
+        root.after(STATE_DRAIN_MS, drain_states)
+
+    def reconnect():
+        # 尚无记录进程（或其已退出）时定期尝试订阅；连上后立即收到一次当前状态
+        if not recorder.connect():
+            root.after(RECONNECT_MS, reconnect)
+
+    live_reader = None
+
+    def refresh_live(reschedule: bool = True):
+        # 增量读取今日数据（CSV/binlog/SQLite），只解析新追加的记录，开销与刷新频率无关
+        nonlocal live_reader
+        source = live.today_source()
+        if live_reader is None or live_reader.source != source:
+            live_reader = live.open_reader(source)
+        try:
+            if live_reader.poll() or live_reader.rows == 0:
+                mins = live_reader.minutes()
+                if mins:
+                    top, top_m = next(iter(mins.items()))
+                    live_var.set(f"今日至今：{sum(mins.values()):.1f} 分钟（最多：{top} {top_m:.1f} 分钟）")
+                else:
+                    live_var.set("今日至今：暂无记录")
+        except Exception:
+            pass
+        if reschedule:
+            root.after(LIVE_REFRESH_MS, refresh_live)
 
-    refresh_status()
-    root.protocol("WM_DELETE_WINDOW", lambda: on_quit(root, manager))
+    drain_states()
+    reconnect()
+    refresh_live()
+    root.protocol("WM_DELETE_WINDOW", lambda: on_quit(root, recorder, loader))
     root.mainloop()
 
 
@@ -0,0 +1,365 @@
+"""性能测量脚本。
+
+子命令：
+- ``startup``：用 ``python -X importtime`` 记录托盘入口（tracker）等模块的导入耗时，
+  超出预算或带入 pandas/matplotlib 时以非零状态退出，可用于 CI 检查启动开销。
+- ``gen``：生成逼真的合成日 CSV（可配置行数、进程/标题基数、跨午夜与损坏行比例）。
+- ``run``：在临时目录中生成数据并测量加载、聚合、绘图与写入的吞吐量和峰值内存
+  （1k/100k/1M 行及一整年的日文件），结果写为 JSON；``--compare`` 与旧结果对比。
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STARTUP_BUDGET_MS = 250  # 托盘入口导入耗时预算（毫秒，含标准库）
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib")
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """在子进程中导入 module，返回 {模块名: 累计导入微秒}。"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else f"import {module} failed")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        # 格式：import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def cmd_startup(args) -> int:
+    failed = False
+    for module in args.modules:
+        profile = import_profile(module)
+        total_ms = profile.get(module, 0) / 1000
+        heavy = sorted({name.split(".")[0] for name in profile if name.split(".")[0] in HEAVY_MODULES})
+        slowest = sorted(
+            ((us, name) for name, us in profile.items() if name != module and "." not in name),
+            reverse=True,
+        )[:5]
+        print(f"{module}: {total_ms:.1f} ms (budget {args.budget} ms)")
+        for us, name in slowest:
+            print(f"    {name:<24} {us / 1000:8.1f} ms")
+        if heavy:
+            print(f"    heavy imports: {', '.join(heavy)}")
+            failed = True
+        if total_ms > args.budget:
+            failed = True
+    return 1 if failed else 0
+
+
+# ---- 合成数据 ----
+
+PROCESSES = [
+    "Code.exe", "chrome.exe", "msedge.exe", "explorer.exe", "WeChat.exe", "QQ.exe",
+    "WINWORD.EXE", "EXCEL.EXE", "POWERPNT.EXE", "WindowsTerminal.exe", "python.exe",
+    "Teams.exe", "slack.exe", "obsidian.exe", "notion.exe", "pycharm64.exe",
+    "steam.exe", "vlc.exe", "cloudmusic.exe", "Photoshop.exe",
+]
+MALFORMED_ROWS = [
+    ["25:61:00", "26:00:00"],  # 越界时间
+    ["", ""],  # 空时间
+    ["abc", "09:00"],  # 无法解析
+    ["9:05:03", "9:07:10"],  # 非定宽（合法，走慢路径）
+    ["12:00:00"],  # 缺列
+]
+
+
+def _process_names(n: int) -> list[str]:
+    names = PROCESSES[:n]
+    names += [f"app{i:04d}.exe" for i in range(len(names), n)]
+    return names
+
+
+def generate_day(
+    path: str,
+    rows: int,
+    processes: int = 20,
+    titles: int = 200,
+    midnight: float = 0.001,
+    malformed: float = 0.001,
+    seed: int | None = None,
+) -> int:
+    """写出一天的合成 CSV（tracker 的格式），返回写入的数据行数。
+
+    进程与标题按 Zipf 分布抽样；区间首尾相接铺满全天，时长服从指数分布；
+    按给定比例插入跨午夜（end < start）与损坏的行，标题中混入逗号、引号与换行。
+    """
+    rng = random.Random(seed)
+    names = _process_names(processes)
+    proc_weights = [1 / (i + 1) for i in range(len(names))]
+    title_pool = [
+        f"文档 {i} - 项目, \"草稿\"" if i % 17 == 0 else (f"第 {i} 页\n预览" if i % 53 == 0 else f"Window {i} - 项目")
+        for i in range(max(1, titles))
+    ]
+    title_weights = [1 / (i + 1) for i in range(len(title_pool))]
+    procs = rng.choices(names, weights=proc_weights, k=rows)
+    wins = rng.choices(title_pool, weights=title_weights, k=rows)
+
+    mean = 86400 / max(rows, 1)
+    cur = 0.0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["start_time", "end_time", "process", "window"])
+        batch = []
+        for i in range(rows):
+            r = rng.random()
+            if r < malformed:
+                bad = MALFORMED_ROWS[i % len(MALFORMED_ROWS)]
+                batch.append(bad + [procs[i], wins[i]] if len(bad) == 2 else list(bad))
+                continue
+            start = min(int(cur), 86399)
+            cur += rng.expovariate(1 / mean)
+            end = min(int(cur), 86399)
+            if r < malformed + midnight:
+                # 跨午夜：23 点多开始，次日凌晨结束
+                start, end = 86400 - rng.randint(1, 600), rng.randint(0, 600)
+            batch.append([_hms(start), _hms(end), procs[i], wins[i]])
+            if len(batch) >= 8192:
+                writer.writerows(batch)
+                batch = []
+        writer.writerows(batch)
+    return rows
+
+
+def _hms(sec: int) -> str:
+    return f"{sec // 3600:02d}:{sec // 60 % 60:02d}:{sec % 60:02d}"
+
+
+def generate_days(out_dir: str, first_day: str, days: int, rows: int, seed: int = 0, **kwargs) -> list[str]:
+    """从 first_day 起连续生成 days 个日文件，返回日期列表。"""
+    d0 = datetime.strptime(first_day, "%Y-%m-%d")
+    out = []
+    for i in range(days):
+        day = (d0 + timedelta(days=i)).strftime("%Y-%m-%d")
+        generate_day(os.path.join(out_dir, day + ".csv"), rows, seed=seed + i, **kwargs)
+        out.append(day)
+    return out
+
+
+def cmd_gen(args) -> int:
+    days = generate_days(
+        args.out,
+        args.first_day,
+        args.days,
+        args.rows,
+        seed=args.seed,
+        processes=args.processes,
+        titles=args.titles,
+        midnight=args.midnight,
+        malformed=args.malformed,
+    )
+    print(f"Wrote {len(days)} file(s) x {args.rows} rows into {args.out}")
+    return 0
+
+
+# ---- 基准测试 ----
+
+def measure(func, repeat: int = 1, setup=None) -> tuple[float, float]:
+    """运行 func，返回 (最快一次的秒数, 峰值 Python 内存 MB)。
+
+    耗时取 repeat 次未跟踪运行中的最快值；峰值内存由额外一次 tracemalloc 跟踪运行统计
+    （只含本进程，进程池子进程不计入）。setup 在每次运行前调用，不计时。
+    """
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1e6
+
+
+def _record(results: list, name: str, rows: int, seconds: float, peak_mb: float):
+    results.append(
+        {
+            "name": name,
+            "rows": rows,
+            "seconds": round(seconds, 6),
+            "rows_per_s": round(rows / seconds) if seconds > 0 else None,
+            "peak_mb": round(peak_mb, 2),
+        }
+    )
+    rate = f"{rows / seconds:>12,.0f} rows/s" if seconds > 0 else ""
+    print(f"{name:<34} {rows:>9,} rows {seconds * 1000:>10.1f} ms {rate} {peak_mb:>8.1f} MB")
+
+
+def run_suite(workdir: str, sizes: list[int], year_days: int, year_rows: int, repeat: int) -> list[dict]:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import stats
+    import tracker
+
+    results: list[dict] = []
+    data_dir = os.path.join(workdir, "data")
+    for n in sizes:
+        path = os.path.join(data_dir, f"bench-{n}.csv")
+        generate_day(path, n, seed=n)
+        df = stats.load_dataframe(path)
+        _record(results, "load_dataframe", n, *measure(lambda: stats.load_dataframe(path), repeat))
+        # compute_minutes 会缓存 duration 列，每次运行前去掉以测量完整计算
+        reset = lambda: df.drop(columns="duration", inplace=True, errors="ignore")
+        _record(results, "compute_minutes", n, *measure(lambda: stats.compute_minutes(df), repeat, setup=reset))
+        _record(results, "compute_minutes_in_range", n, *measure(lambda: stats.compute_minutes_in_range(df, "09:00:00", "17:30:00"), repeat))
+        _record(results, "compute_minutes_by_hour", n, *measure(lambda: stats.compute_minutes_by_hour(df), repeat))
+        _record(results, "IntervalIndex(build+query)", n, *measure(lambda: stats.IntervalIndex(df).minutes_in_range("09:00:00", "17:30:00"), repeat))
+        minutes = stats.compute_minutes(df)
+        assets = os.path.join(workdir, "assets")
+        _record(results, "plot_minutes(save)", n, *measure(lambda: stats.plot_minutes(minutes, f"bench-{n}", save_dir=assets, show=False)))
+
+    # 写入：逐条立即落盘与批量缓冲两种方式
+    writes = 1000
+    rows = [(_hms(i), _hms(i + 1), PROCESSES[i % len(PROCESSES)], f"Window {i}") for i in range(writes)]
+
+    def write_single():
+        for r in rows:
+            tracker.write_record(*r)
+
+    def write_batched():
+        w = tracker.RecordWriter()
+        for r in rows:
+            w.write(*r)
+        w.close()
+
+    _record(results, "tracker.write_record", writes, *measure(write_single, repeat))
+    _record(results, "RecordWriter(buffered)", writes, *measure(write_batched, repeat))
+
+    if year_days:
+        days = generate_days(data_dir, "2024-01-01", year_days, year_rows, seed=1000)
+        cache = os.path.join(data_dir, ".aggcache.json")
+        total = year_days * year_rows
+
+        def drop_cache():
+            if os.path.exists(cache):
+                os.remove(cache)
+
+        _record(results, "days:no-cache", total, *measure(lambda: stats.compute_minutes_for_days(days, use_cache=False)))
+        _record(results, "days:cache-cold", total, *measure(lambda: stats.compute_minutes_for_days(days), setup=drop_cache))
+        _record(results, "days:cache-warm", total, *measure(lambda: stats.compute_minutes_for_days(days), repeat))
+    return results
+
+
+def compare(results: list[dict], baseline_path: str, threshold: float) -> bool:
+    """与基线 JSON 对比耗时，返回是否存在超过 threshold 倍的退化。"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        base = {(r["name"], r["rows"]): r for r in json.load(f)["results"]}
+    regressed = False
+    print(f"\nvs {baseline_path}:")
+    for r in results:
+        old = base.get((r["name"], r["rows"]))
+        if not old or not old["seconds"]:
+            continue
+        ratio = r["seconds"] / old["seconds"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        regressed |= bool(flag)
+        print(f"{r['name']:<34} {r['rows']:>9,} rows  x{ratio:5.2f}{flag}")
+    return regressed
+
+
+def cmd_run(args) -> int:
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="wdid-bench-")
+    out = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    sys.path.insert(0, ROOT)
+    cwd = os.getcwd()
+    # core.DATA_DIR 为相对路径，切换到工作目录后所有读写都落在临时 data/ 下
+    os.chdir(workdir)
+    try:
+        results = run_suite(workdir, sizes, args.year_days, args.year_rows, args.repeat)
+    finally:
+        os.chdir(cwd)
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "commit": _git_commit(),
+        "results": results,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Wrote: {out}")
+    if baseline and compare(results, baseline, args.threshold):
+        return 1
+    return 0
+
+
+def _git_commit() -> str | None:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return proc.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="WhatDidIDo — 性能测量")
+    sub = p.add_subparsers(dest="command", required=True)
+    sp = sub.add_parser("startup", help="测量模块导入耗时并检查启动预算")
+    sp.add_argument("modules", nargs="*", default=["tracker"], help="要测量的模块（默认 tracker）")
+    sp.add_argument("--budget", type=float, default=STARTUP_BUDGET_MS, help="导入耗时预算（毫秒）")
+    sp.set_defaults(func=cmd_startup)
+
+    gp = sub.add_parser("gen", help="生成合成日 CSV")
+    gp.add_argument("--out", default="data", help="输出目录（默认 data）")
+    gp.add_argument("--first-day", default=datetime.now().strftime("%Y-%m-%d"), help="第一天 YYYY-MM-DD（默认今天）")
+    gp.add_argument("--days", type=int, default=1, help="连续生成的天数")
+    gp.add_argument("--rows", type=int, default=2000, help="每天的行数")
+    gp.add_argument("--processes", type=int, default=20, help="不同进程数")
+    gp.add_argument("--titles", type=int, default=200, help="不同窗口标题数")
+    gp.add_argument("--midnight", type=float, default=0.001, help="跨午夜行比例")
+    gp.add_argument("--malformed", type=float, default=0.001, help="损坏行比例")
+    gp.add_argument("--seed", type=int, default=0)
+    gp.set_defaults(func=cmd_gen)
+
+    rp = sub.add_parser("run", help="运行统计流水线基准测试并输出 JSON")
+    rp.add_argument("--sizes", default="1000,100000,1000000", help="单日行数，逗号分隔")
+    rp.add_argument("--year-days", type=int, default=365, help="多日测试的天数（0 跳过）")
+    rp.add_argument("--year-rows", type=int, default=2000, help="多日测试每天的行数")
+    rp.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最快）")
+    rp.add_argument("--output", default="bench-results.json", help="结果 JSON 路径")
+    rp.add_argument("--compare", help="与之前的结果 JSON 对比")
+    rp.add_argument("--threshold", type=float, default=1.5, help="耗时超过基线该倍数视为退化（退出码 1）")
+    rp.add_argument("--workdir", help="数据工作目录（默认临时目录，结束后删除）")
+    rp.add_argument("--keep", action="store_true", help="保留临时工作目录")
+    rp.set_defaults(func=cmd_run)
+    args = p.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
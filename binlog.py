@@ -0,0 +1,280 @@
+"""紧凑二进制日志：定宽记录 + 追加式字符串表。
+
+每天两个文件（与 CSV 同目录）：
+
+- ``YYYY-MM-DD.wdl``：16 字节文件头后为定宽记录 ``<iiII``
+  （start 秒, end 秒, process 字符串 id, window 字符串 id），每条 16 字节；
+- ``YYYY-MM-DD.wds``：字符串表，每项为 ``uint32 长度 + UTF-8 字节``，id 即出现序号。
+
+两个文件都只追加：先写字符串表再写记录，崩溃时末尾不完整的项在读取时忽略。
+记录文件可直接 mmap 后用 ``numpy.frombuffer`` 零拷贝读取。
+
+时间只存距当日零点的整数秒：纪元时间结构的 CSV 转换后可用 ``to-csv --schema epoch`` 还原
+（纪元毫秒的亚秒部分会被截去）；带额外列（如多机合并的 host 列）的 CSV 无法无损保存，拒绝转换。
+时间无法解析的行跳过并计数。
+
+命令行：``python binlog.py to-bin data/2025-12-15.csv`` / ``python binlog.py to-csv data/2025-12-15.wdl [--schema epoch]``
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import struct
+import sys
+
+from core import DATA_DIR, EPOCH_UNITS, HEADER as COLUMNS, SCHEMA_HEADERS, day_start_epoch, seconds_to_time, time_to_seconds
+
+MAGIC = b"WDIDLOG1"
+HEADER_SIZE = 16
+RECORD = struct.Struct("<iiII")
+STRING_LEN = struct.Struct("<I")
+_INT32_MIN, _INT32_MAX = -(2**31), 2**31 - 1
+LOG_EXT = ".wdl"
+STRINGS_EXT = ".wds"
+
+
+def log_path(day: str, data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, day + LOG_EXT)
+
+
+def strings_path(log: str) -> str:
+    return os.path.splitext(log)[0] + STRINGS_EXT
+
+
+def read_strings(path: str) -> list[str]:
+    """读取字符串表；末尾不完整的项（写入中断）忽略。"""
+    return read_strings_from(path)[0]
+
+
+def read_strings_from(path: str, offset: int = 0) -> tuple[list[str], int]:
+    """从字节偏移 offset 起读取完整的字符串表项，返回 (字符串列表, 已读到的偏移)。"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    out = []
+    pos = 0
+    size = len(data)
+    while pos + STRING_LEN.size <= size:
+        (n,) = STRING_LEN.unpack_from(data, pos)
+        end = pos + STRING_LEN.size + n
+        if end > size:
+            break
+        out.append(data[pos + STRING_LEN.size:end].decode("utf-8"))
+        pos = end
+    return out, offset + pos
+
+
+class BinlogAppender:
+    """以追加方式写入一天的二进制日志，进程/窗口字符串自动驻留到字符串表。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._strings = read_strings(strings_path(path))
+        self._ids = {s: i for i, s in enumerate(self._strings)}
+        self._new_strings = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._log = open(path, "ab")
+        self._str = open(strings_path(path), "ab")
+        if os.fstat(self._log.fileno()).st_size == 0:
+            self._log.write(MAGIC.ljust(HEADER_SIZE, b"\0"))
+            self._log.flush()
+
+    def _intern(self, value) -> int:
+        s = "" if value is None else str(value)
+        idx = self._ids.get(s)
+        if idx is None:
+            idx = len(self._strings)
+            self._strings.append(s)
+            self._ids[s] = idx
+            raw = s.encode("utf-8")
+            self._new_strings.append(STRING_LEN.pack(len(raw)) + raw)
+        return idx
+
+    def append_rows(self, rows) -> int:
+        """写入 ``(start, end, process, window)`` 行；start/end 可为 HH:MM:SS 或整数秒。
+
+        时间无法解析或超出范围的行跳过，返回实际写入的条数。
+        """
+        buf = bytearray()
+        count = 0
+        for start, end, process, window in rows:
+            try:
+                s = start if isinstance(start, int) else time_to_seconds(start)
+                e = end if isinstance(end, int) else time_to_seconds(end)
+            except (ValueError, AttributeError):
+                continue
+            if not (_INT32_MIN <= s <= _INT32_MAX and _INT32_MIN <= e <= _INT32_MAX):
+                continue
+            buf += RECORD.pack(s, e, self._intern(process), self._intern(window))
+            count += 1
+        if self._new_strings:
+            # 字符串必须先于引用它的记录落盘
+            self._str.write(b"".join(self._new_strings))
+            self._str.flush()
+            self._new_strings.clear()
+        self._log.write(buf)
+        self._log.flush()
+        return count
+
+    def close(self):
+        for f in (self._str, self._log):
+            try:
+                f.close()
+            except OSError:
+                pass
+
+
+def read_records(path: str):
+    """mmap 读取记录文件，返回 (records, strings)。records 为 numpy 结构化数组（只读视图）。"""
+    import numpy as np
+
+    dtype = np.dtype([("start", "<i4"), ("end", "<i4"), ("process", "<u4"), ("window", "<u4")])
+    strings = read_strings(strings_path(path))
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        count = max(0, (size - HEADER_SIZE) // RECORD.size)
+        if count == 0:
+            return np.empty(0, dtype=dtype), strings
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(MAGIC)] != MAGIC:
+        mm.close()
+        raise ValueError(f"Not a binlog file: {path}")
+    records = np.frombuffer(mm, dtype=dtype, count=count, offset=HEADER_SIZE)
+    # 字符串表可能因写入中断少于记录引用的 id，丢弃这些记录
+    limit = len(strings)
+    ok = (records["process"] < limit) & (records["window"] < limit)
+    if not ok.all():
+        records = records[ok]
+    return records, strings
+
+
+def load_dataframe(path: str):
+    """读取为与 CSV 相同列名的 DataFrame；start_time/end_time 为整数秒。"""
+    import numpy as np
+    import pandas as pd
+
+    records, strings = read_records(path)
+    table = np.array(strings, dtype=object)
+    return pd.DataFrame(
+        {
+            "start_time": records["start"].astype(np.int64),
+            "end_time": records["end"].astype(np.int64),
+            "process": table[records["process"]] if len(table) else np.empty(0, dtype=object),
+            "window": table[records["window"]] if len(table) else np.empty(0, dtype=object),
+        }
+    )
+
+
+class ConversionError(ValueError):
+    """输入无法无损转换为 binlog。"""
+
+
+def csv_to_binlog(src: str, dst: str | None = None) -> tuple[str, int]:
+    """将日 CSV 转换为二进制日志，返回 (目标路径, 跳过的行数)。
+
+    无表头 CSV 与纪元时间结构同样支持；时间无法解析的行跳过。先写临时文件，成功后才替换目标，
+    中途出错时原有的目标文件保持不变。带 process/window 以外额外列的 CSV 抛出 ConversionError。
+    """
+    dst = dst or os.path.splitext(src)[0] + LOG_EXT
+    tmp = dst + ".tmp"
+    unit = None
+    base = 0
+    skipped = 0
+    for p in (tmp, strings_path(tmp)):
+        if os.path.exists(p):
+            os.remove(p)
+    out = BinlogAppender(tmp)
+    try:
+        with open(src, "r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            batch = []
+            first = True
+            for row in reader:
+                if first:
+                    first = False
+                    if row[:2] == COLUMNS[:2] or row[:1] and row[0] in EPOCH_UNITS:
+                        if len(row) > len(COLUMNS):
+                            raise ConversionError(f"{src}: extra columns {row[len(COLUMNS):]} cannot be stored in binlog")
+                        if row[0] in EPOCH_UNITS:
+                            # 纪元结构：换算为距当日零点的秒数
+                            unit = EPOCH_UNITS[row[0]]
+                            base = day_start_epoch(os.path.basename(src)[:10])
+                        continue
+                if not row:
+                    continue
+                if len(row) > len(COLUMNS):
+                    raise ConversionError(f"{src}: row has more than {len(COLUMNS)} columns")
+                row = (row + [""] * 4)[:4]
+                if unit is not None:
+                    try:
+                        row[0] = int(row[0]) // unit - base
+                        row[1] = int(row[1]) // unit - base
+                    except ValueError:
+                        skipped += 1
+                        continue
+                batch.append(row)
+                if len(batch) >= 4096:
+                    skipped += len(batch) - out.append_rows(batch)
+                    batch = []
+            if batch:
+                skipped += len(batch) - out.append_rows(batch)
+    except BaseException:
+        out.close()
+        for p in (tmp, strings_path(tmp)):
+            if os.path.exists(p):
+                os.remove(p)
+        raise
+    out.close()
+    # 两个文件依次替换（转换是离线操作，不与记录器同时写同一天）
+    os.replace(strings_path(tmp), strings_path(dst))
+    os.replace(tmp, dst)
+    return dst, skipped
+
+
+def binlog_to_csv(src: str, dst: str | None = None, schema: str = "hms") -> str:
+    """将二进制日志还原为 tracker 写出格式的 CSV；schema 为 epoch/epoch_ms 时按文件名日期还原纪元时间。"""
+    dst = dst or os.path.splitext(src)[0] + ".csv"
+    records, strings = read_records(src)
+    if schema == "hms":
+        fmt = seconds_to_time
+    else:
+        base = day_start_epoch(os.path.basename(src)[:10])
+        unit = 1000 if schema == "epoch_ms" else 1
+
+        def fmt(sec):
+            return (base + sec) * unit
+
+    with open(dst, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SCHEMA_HEADERS[schema])
+        for s, e, p, w in records.tolist():
+            writer.writerow([fmt(s), fmt(e), strings[p], strings[w]])
+    return dst
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="WhatDidIDo — CSV 与二进制日志互转")
+    p.add_argument("command", choices=["to-bin", "to-csv"])
+    p.add_argument("src")
+    p.add_argument("dst", nargs="?")
+    p.add_argument("--schema", choices=sorted(SCHEMA_HEADERS), default="hms", help="to-csv 输出的时间结构（默认 hms）")
+    args = p.parse_args(argv)
+    if args.command == "to-bin":
+        try:
+            out, skipped = csv_to_binlog(args.src, args.dst)
+        except ConversionError as e:
+            raise SystemExit(str(e))
+        if skipped:
+            print(f"Skipped {skipped} row(s) with unparsable times")
+    else:
+        out = binlog_to_csv(args.src, args.dst, args.schema)
+    print(f"Wrote: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""按规则把 (进程, 窗口标题) 归类为项目/类别。
+
+窗口标题几乎各不相同，直接按 ``window`` 分组没有意义；这里用规则把它们归入少量类别，
+作为 stats 的第三种分组键（``by="category"``）。
+
+规则依次为 ``{"category": 类别, "process": 进程名或进程名列表（可选，忽略大小写）,
+"title": 模式（可选）, "kind": "literal" | "prefix" | "regex"}``，默认 literal（标题中包含
+该文本即命中）；regex 在标题中搜索（需要从标题开头匹配时用 prefix）。所有规则
+编译成一个组合正则，按规则顺序首个命中者生效；未命中时类别即进程名。结果按
+不同的 (进程, 标题) 缓存，整列分类时只对去重后的值做匹配。
+
+tracker 记录的进程名优先是可执行文件的 FileDescription（如 "Visual Studio Code"），取不到时才是
+exe 名（经 NAME_MAP 映射），因此默认规则同时列出两种写法。
+
+规则默认取 DEFAULT_RULES；存在 ``data/categories.json``（规则列表）时以其为准。
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from core import DATA_DIR
+
+RULES_FILE = os.path.join(DATA_DIR, "categories.json")
+MEMO_LIMIT = 200_000  # 缓存的不同 (进程, 标题) 数上限，超出后清空重建
+KINDS = ("literal", "prefix", "regex")
+
+DEFAULT_RULES = [
+    {"category": "编程", "process": ["Visual Studio Code", "Code.exe"]},
+    {"category": "编程", "process": ["PyCharm", "pycharm64.exe"]},
+    {"category": "编程", "process": ["Windows Terminal", "WindowsTerminal.exe"]},
+    {"category": "编程", "title": "GitHub"},
+    {"category": "编程", "title": "Stack Overflow"},
+    {"category": "邮件", "title": r"\bInbox\b|收件箱", "kind": "regex"},
+    {"category": "视频", "title": "YouTube"},
+    {"category": "视频", "title": "bilibili"},
+    {"category": "聊天", "process": ["微信", "WeChat", "WeChat.exe"]},
+    {"category": "聊天", "process": ["QQ", "QQ.exe"]},
+    {"category": "文档", "process": ["Microsoft Word", "WINWORD.EXE"]},
+    {"category": "文档", "process": ["Microsoft Excel", "EXCEL.EXE"]},
+    {"category": "文档", "process": ["Microsoft PowerPoint", "POWERPNT.EXE"]},
+]
+
+_SEP = "\x00"  # 进程与标题的分隔符，匹配键为 "进程\0标题"
+
+
+def _rule_pattern(rule: dict) -> str:
+    kind = rule.get("kind", "literal")
+    if kind not in KINDS:
+        raise ValueError(f"unknown rule kind: {kind!r}")
+    proc = rule.get("process")
+    if isinstance(proc, (list, tuple)):
+        head = "(?:" + "|".join(re.escape(p) for p in proc) + ")" if proc else f"[^{_SEP}]*"
+    else:
+        head = re.escape(proc) if proc else f"[^{_SEP}]*"
+    title = rule.get("title")
+    if not title:
+        tail = ""
+    elif kind == "literal":
+        tail = ".*?" + re.escape(title)
+    elif kind == "prefix":
+        tail = re.escape(title)
+    else:
+        tail = f".*?(?:{title})"
+    return head + _SEP + tail
+
+
+class Categorizer:
+    """由规则列表编译出的分类器。"""
+
+    def __init__(self, rules: list[dict]):
+        self.rules = list(rules)
+        for i, rule in enumerate(self.rules):
+            if not rule.get("category"):
+                raise ValueError(f"rule {i} has no category")
+        # 每条规则一个命名分组，整体锚定在开头：交替分支按顺序尝试，保证首条命中的规则生效
+        alternatives = "|".join(f"(?P<r{i}>{_rule_pattern(r)})" for i, r in enumerate(self.rules))
+        self._regex = re.compile(rf"\A(?:{alternatives})", re.IGNORECASE | re.DOTALL) if self.rules else None
+        self._categories = {f"r{i}": r["category"] for i, r in enumerate(self.rules)}
+        self._memo: dict[str, str] = {}
+
+    def _match(self, process, title) -> str:
+        key = f"{process}{_SEP}{'' if title is None or title != title else title}"
+        m = self._regex.match(key) if self._regex is not None else None
+        if m is None:
+            return str(process)
+        return self._categories[m.lastgroup]
+
+    def category(self, process, title) -> str:
+        """单条 (进程, 标题) 的类别。"""
+        cat = self._memo.get((process, title))
+        if cat is None:
+            cat = self._memo[(process, title)] = self._match(process, title)
+        return cat
+
+    def categorize(self, processes, titles) -> np.ndarray:
+        """整列分类：先按 (进程, 标题) 去重，只匹配未缓存的值，再按编号展开。"""
+        p_codes, p_uniques = pd.factorize(pd.Series(processes, copy=False), use_na_sentinel=False)
+        t_codes, t_uniques = pd.factorize(pd.Series(titles, copy=False), use_na_sentinel=False)
+        # 两列编号合成一个配对编号，再去重一次，得到全部不同的 (进程, 标题)
+        n = max(len(t_uniques), 1)
+        codes, pairs = pd.factorize(p_codes.astype(np.int64) * n + t_codes)
+        if len(self._memo) > MEMO_LIMIT:
+            self._memo.clear()
+        memo = self._memo
+        procs = np.asarray(p_uniques, dtype=object)[pairs // n]
+        wins = np.asarray(t_uniques, dtype=object)[pairs % n]
+        out = np.empty(len(pairs), dtype=object)
+        for i, key in enumerate(zip(procs.tolist(), wins.tolist())):
+            cat = memo.get(key)
+            if cat is None:
+                cat = memo[key] = self._match(*key)
+            out[i] = cat
+        return out[codes]
+
+
+def load_rules(path: str = RULES_FILE) -> list[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rules = json.load(f)
+    except FileNotFoundError:
+        return DEFAULT_RULES
+    if not isinstance(rules, list):
+        raise ValueError(f"{path}: expected a list of rules")
+    return rules
+
+
+_default = None  # (规则文件 mtime, Categorizer)
+
+
+def get_categorizer() -> Categorizer:
+    """按当前规则文件构建（并缓存）分类器；规则文件修改后自动重建。"""
+    global _default
+    try:
+        mtime = os.stat(RULES_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _default is None or _default[0] != mtime:
+        _default = (mtime, Categorizer(load_rules()))
+    return _default[1]
+
+
+def categorize(df: pd.DataFrame) -> np.ndarray:
+    """DataFrame 每条记录的类别（需 process 列，window 列可缺省）。"""
+    titles = df["window"] if "window" in df.columns else pd.Series([""] * len(df))
+    return get_categorizer().categorize(df["process"], titles)
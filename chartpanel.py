@@ -0,0 +1,168 @@
+"""GUI 内嵌图表面板。
+
+整个窗口生命周期只有一个 Figure 与一个 FigureCanvasTkAgg：切换日期/时间段时
+就地更新已有图元（柱高、刻度标签、饼图扇区与文字），不再每次点击新建 pyplot
+窗口，内存占用不随刷新次数增长。
+"""
+
+import math
+
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+import stats
+
+BAR_COLOR = "#4C9EEB"
+# 与 stats.draw_pie 保持一致的饼图参数
+PIE_START_ANGLE = 90
+PIE_RADIUS = 1.0
+PIE_LABEL_DISTANCE = 1.1
+PIE_PCT_DISTANCE = 0.6
+
+
+class ChartPanel:
+    """嵌入 Tk 容器的可复用图表面板：show_minutes 绘制柱状图，show_pie 绘制饼图。"""
+
+    def __init__(self, master):
+        stats._setup_fonts()
+        self.figure = Figure(figsize=(8, 4.5), dpi=100)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.ax = self.figure.add_subplot()
+        self.mode = None
+        self._bars = []
+        self._wedges = []
+        self._texts = []
+        self._autotexts = []
+        self._procs = []
+        self._hours = {}
+        self._annotation = None
+        self.canvas.mpl_connect("motion_notify_event", self._on_move)
+
+    def _reset(self, mode: str):
+        """切换图表类型时清空 Axes（仍复用同一 Figure 与画布）。"""
+        self.ax.cla()
+        self._bars = []
+        self._wedges, self._texts, self._autotexts = [], [], []
+        self._annotation = None
+        self.mode = mode
+        if mode == "bar":
+            self.figure.subplots_adjust(left=0.08, right=0.98, top=0.92, bottom=0.28)
+            self.ax.grid(axis="y", linestyle="--", alpha=0.3)
+            self.ax.set_xlabel("应用")
+            self.ax.set_ylabel("分钟")
+        else:
+            self.figure.subplots_adjust(left=0.05, right=0.95, top=0.9, bottom=0.05)
+
+    def show_minutes(self, minutes, day: str, hours: dict | None = None):
+        """就地更新柱状图；hours 为 {process: [(hour, minutes), ...]}，用于悬停提示。"""
+        if self.mode != "bar":
+            self._reset("bar")
+        ax = self.ax
+        n = len(minutes)
+        values = minutes.to_numpy(dtype=float)
+
+        # 复用已有柱子，不足时补建，多余的隐藏
+        if n > len(self._bars):
+            start = len(self._bars)
+            extra = ax.bar(np.arange(start, n), np.zeros(n - start), width=0.5, color=BAR_COLOR)
+            self._bars.extend(extra.patches)
+        for i, rect in enumerate(self._bars):
+            if i < n:
+                rect.set_height(values[i])
+                rect.set_visible(True)
+            else:
+                rect.set_height(0)
+                rect.set_visible(False)
+
+        ax.set_xticks(np.arange(n))
+        ax.set_xticklabels([stats.format_label(p) for p in minutes.index], rotation=30, ha="right")
+        ax.set_xlim(-0.5, max(n, 1) - 0.5)
+        ax.set_ylim(0, float(values.max()) * 1.05 if n and values.max() > 0 else 1)
+        ax.set_title(f"今日时间分布 — {day}")
+
+        self._procs = [str(p) for p in minutes.index]
+        self._hours = hours or {}
+        if self._annotation is not None:
+            self._annotation.set_visible(False)
+        self.canvas.draw_idle()
+
+    def show_pie(self, minutes, day: str):
+        """就地更新饼图；扇区数量变化时在同一 Axes 上重绘。"""
+        if self.mode != "pie":
+            self._reset("pie")
+        ax = self.ax
+        if len(minutes) != len(self._wedges):
+            ax.cla()
+            self._wedges, self._texts, self._autotexts = stats.draw_pie(ax, minutes, day)
+            self.canvas.draw_idle()
+            return
+
+        values = minutes.to_numpy(dtype=float)
+        total = values.sum()
+        fracs = values / total if total > 0 else np.zeros(len(values))
+        # 与 Axes.pie(counterclock=False) 相同的角度推算（单位：圈）
+        theta1 = PIE_START_ANGLE / 360.0
+        for frac, label, wedge, text, autotext in zip(
+            fracs, minutes.index, self._wedges, self._texts, self._autotexts
+        ):
+            theta2 = theta1 - frac
+            wedge.set_theta1(360.0 * min(theta1, theta2))
+            wedge.set_theta2(360.0 * max(theta1, theta2))
+            mid = math.pi * (theta1 + theta2)
+            x, y = math.cos(mid), math.sin(mid)
+            text.set_text(str(label))
+            text.set_position((PIE_LABEL_DISTANCE * PIE_RADIUS * x, PIE_LABEL_DISTANCE * PIE_RADIUS * y))
+            text.set_horizontalalignment("left" if x > 0 else "right")
+            autotext.set_text(f"{100.0 * frac:.1f}%")
+            autotext.set_position((PIE_PCT_DISTANCE * PIE_RADIUS * x, PIE_PCT_DISTANCE * PIE_RADIUS * y))
+            theta1 = theta2
+        ax.set_title(f"应用使用比例 — {day}")
+        self.canvas.draw_idle()
+
+    def clear(self, message: str = ""):
+        self._reset("empty")
+        self.ax.set_axis_off()
+        if message:
+            self.ax.text(0.5, 0.5, message, ha="center", va="center", transform=self.ax.transAxes)
+        self.canvas.draw_idle()
+
+    def _on_move(self, event):
+        if self.mode != "bar":
+            return
+        ax = self.ax
+        hit = None
+        if event.inaxes == ax:
+            for rect, proc in zip(self._bars, self._procs):
+                if rect.get_visible() and rect.contains(event)[0]:
+                    hit = (rect, proc)
+                    break
+        if hit is None:
+            if self._annotation is not None and self._annotation.get_visible():
+                self._annotation.set_visible(False)
+                self.canvas.draw_idle()
+            return
+
+        rect, proc = hit
+        hours = self._hours.get(proc)
+        if hours:
+            text = "\n".join(f"{h:02d}:00-{h:02d}:59：{m:.1f} 分钟" for h, m in hours)
+        else:
+            text = "无小时分布数据"
+        xy = (rect.get_x() + rect.get_width() / 2, rect.get_height())
+        if self._annotation is None:
+            self._annotation = ax.annotate(
+                text,
+                xy=xy,
+                xytext=(20, 20),
+                textcoords="offset points",
+                bbox=dict(boxstyle="round", fc="w", ec="#999", alpha=0.9),
+                arrowprops=dict(arrowstyle="->", color="#666"),
+                fontsize=9,
+            )
+        else:
+            self._annotation.set_text(text)
+            self._annotation.xy = xy
+            self._annotation.set_visible(True)
+        self.canvas.draw_idle()
@@ -0,0 +1,123 @@
+"""记录进程的崩溃检查点（仅标准库）。
+
+进行中的窗口区间只在 Tracker 内存里，崩溃、断电或强制注销会丢失它。这里把
+“当前打开的区间 + 尚未写出的暂存段 + 写入器中尚未写盘的缓冲”定期写入固定大小的槽位文件
+``data/recorder.slot``：文件只有两个 SLOT_SIZE 字节的槽位，交替原地覆盖（不追加），
+每个槽位带序号与 CRC 校验，写到一半断电时仍能读到另一个完整的槽位。
+每个检查点周期只有一次写入（只写实际负载，不补齐整个槽位），不会让写入器提前写盘；
+下次启动时由 tracker 读出并补写到日文件。
+"""
+
+import json
+import os
+import struct
+import time
+import zlib
+
+from core import DATA_DIR
+
+SLOT_FILE = os.path.join(DATA_DIR, "recorder.slot")
+SLOT_SIZE = 16384  # 单个槽位字节数（容纳写入器的一整批缓冲）
+INTERVAL = 30  # 检查点周期（秒）
+MAGIC = b"WDC2"  # 2：槽位加大并含写入器缓冲；旧版本的槽位不再读取
+_HEAD = struct.Struct("<4sQII")  # magic, 序号, crc32, 负载长度
+_TEXT_LIMITS = (200, 80, 20, 0)  # 负载超长时依次把字符串截到这些长度
+
+
+def _fit(state: dict) -> bytes:
+    """序列化 state；超出槽位时逐步截短其中的字符串，仍放不下时舍弃缓冲部分。"""
+    room = SLOT_SIZE - _HEAD.size
+    for candidate in (state, {k: v for k, v in state.items() if k != "buffered"}):
+        for limit in _TEXT_LIMITS:
+            data = json.dumps(_truncate(candidate, limit), ensure_ascii=False).encode("utf-8")
+            if len(data) <= room:
+                return data
+    return b"{}"
+
+
+def _truncate(value, limit: int):
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit]
+    if isinstance(value, list):
+        return [_truncate(v, limit) for v in value]
+    if isinstance(value, dict):
+        return {k: _truncate(v, limit) for k, v in value.items()}
+    return value
+
+
+class Checkpoint:
+    """双槽位的检查点文件。非线程安全：由采集线程独占写入。"""
+
+    def __init__(self, path: str = SLOT_FILE, interval: float = INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._f = None
+        self._seq = 0
+        self._last = 0.0
+
+    def _open(self):
+        if self._f is not None:
+            return self._f
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        f = open(self.path, "r+b" if os.path.exists(self.path) else "w+b")
+        if os.fstat(f.fileno()).st_size < 2 * SLOT_SIZE:
+            f.truncate(2 * SLOT_SIZE)
+        self._f = f
+        self._seq = max((seq for seq, _ in self._slots()), default=0)
+        return f
+
+    def _slots(self):
+        """两个槽位中校验通过的 (序号, 负载)。"""
+        f = self._f
+        out = []
+        for i in range(2):
+            f.seek(i * SLOT_SIZE)
+            raw = f.read(SLOT_SIZE)
+            if len(raw) < _HEAD.size:
+                continue
+            magic, seq, crc, length = _HEAD.unpack_from(raw)
+            body = raw[_HEAD.size:_HEAD.size + length]
+            if magic != MAGIC or len(body) != length or zlib.crc32(body) != crc:
+                continue
+            try:
+                out.append((seq, json.loads(body)))
+            except ValueError:
+                continue
+        return out
+
+    def read(self) -> dict | None:
+        """最新的有效检查点；文件不存在或两个槽位都损坏时返回 None。"""
+        if self._f is None and not os.path.exists(self.path):
+            return None
+        try:
+            self._open()
+            slots = self._slots()
+        except OSError:
+            return None
+        return max(slots, key=lambda s: s[0])[1] if slots else None
+
+    def write(self, state: dict | None):
+        """覆盖较旧的槽位；state 为 None 表示没有需要恢复的区间。"""
+        self._last = time.monotonic()
+        body = _fit(state or {})
+        try:
+            f = self._open()
+            self._seq += 1
+            f.seek((self._seq % 2) * SLOT_SIZE)
+            # 只写头部与负载：槽位中负载之后的旧字节由长度字段排除
+            f.write(_HEAD.pack(MAGIC, self._seq, zlib.crc32(body), len(body)) + body)
+            f.flush()
+            os.fsync(f.fileno())
+        except OSError:
+            pass
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last >= self.interval
+
+    def close(self):
+        if self._f is not None:
+            try:
+                self._f.close()
+            except OSError:
+                pass
+            self._f = None
@@ -0,0 +1,365 @@
+"""历史数据按月压缩与汇总表。
+
+已结束的日文件（CSV 或 binlog）折叠进 ``data/archive/YYYY-MM.csv.gz``（安装了 pyarrow
+时为 ``YYYY-MM.parquet``），同时维护 ``YYYY-MM.rollup.json``：每天 × 进程的总秒数与
+每小时 × 进程的秒数矩阵。月/年统计只读汇总表（几 KB），无需打开原始区间；
+``stats.load_dataframe`` 对已压缩的日期透明地从月分区读取。
+
+分区中 start_time/end_time 存为整数秒（无法解析的原始值记为 -1，统计时本就会被跳过）。
+
+命令行：``python compact.py``（压缩今天以前的全部日文件）/ ``python compact.py --month 2025-01 --keep``
+/ ``python compact.py --summary 2025-01``
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import binlog
+from core import DATA_DIR, existing_day_file, today_file
+
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+COLUMNS = ["day", "start_time", "end_time", "process", "window"]
+GZIP_EXT = ".csv.gz"
+PARQUET_EXT = ".parquet"
+ROLLUP_EXT = ".rollup.json"
+ROLLUP_VERSION = 1
+_DAY_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})(\.csv|\.wdl)$")
+
+_rollups: dict = {}  # rollup 路径 -> (mtime_ns, 内容)
+
+
+def has_parquet() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def archive_dir_for(path: str) -> str:
+    """日文件 path 所在数据目录对应的归档目录。"""
+    return os.path.join(os.path.dirname(path) or ".", "archive")
+
+
+def partition_path(month: str, archive_dir: str = ARCHIVE_DIR, fmt: str | None = None) -> str:
+    """月分区路径；fmt 为 None 时返回已存在的分区，都不存在时按是否安装 pyarrow 决定格式。"""
+    parquet = os.path.join(archive_dir, month + PARQUET_EXT)
+    gz = os.path.join(archive_dir, month + GZIP_EXT)
+    if fmt == "parquet":
+        return parquet
+    if fmt == "gzip":
+        return gz
+    for p in (parquet, gz):
+        if os.path.exists(p):
+            return p
+    return parquet if has_parquet() else gz
+
+
+def rollup_path(month: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, month + ROLLUP_EXT)
+
+
+def read_rollup(month: str, archive_dir: str = ARCHIVE_DIR) -> dict:
+    """读取月汇总表（按 mtime 缓存）；不存在时返回空表。"""
+    path = rollup_path(month, archive_dir)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {"version": ROLLUP_VERSION, "days": {}}
+    cached = _rollups.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    if data.get("version") != ROLLUP_VERSION:
+        data = {"version": ROLLUP_VERSION, "days": {}}
+    _rollups[path] = (mtime, data)
+    return data
+
+
+def rollup_entry(day: str, archive_dir: str = ARCHIVE_DIR) -> dict | None:
+    """某天的汇总条目 {"totals": {进程: 秒}, "hours": {进程: [24 个小时秒数]}}；未压缩时返回 None。"""
+    return read_rollup(day[:7], archive_dir)["days"].get(day)
+
+
+def is_compacted(day: str, archive_dir: str = ARCHIVE_DIR) -> bool:
+    return rollup_entry(day, archive_dir) is not None
+
+
+def load_month(month: str, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame | None:
+    path = partition_path(month, archive_dir)
+    if not os.path.exists(path):
+        return None
+    if path.endswith(PARQUET_EXT):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={"day": str}, encoding="utf-8")
+
+
+def load_day(day: str, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame | None:
+    """从月分区取出某天的记录，列与日 CSV 相同（时间为整数秒）。"""
+    df = load_month(day[:7], archive_dir)
+    if df is None:
+        return None
+    df = df[df["day"] == day].drop(columns="day").reset_index(drop=True)
+    return df if not df.empty else None
+
+
+def minutes_for_days(
+    days: list[str],
+    start: str | None,
+    end: str | None,
+    archive_dir: str = ARCHIVE_DIR,
+    by: str = "process",
+) -> list[dict]:
+    """已压缩日期的按进程（或 by 指定的键）用时 {process: minutes}（每月一个部分结果）。
+
+    按进程分组且全天或整点区间时直接由汇总表求得；否则每月只读一次分区并整体按区间裁剪。
+    """
+    import aggcache
+    import stats
+
+    if by == "process" and aggcache.hour_aligned(start, end):
+        return [aggcache.minutes_in_range(rollup_entry(d, archive_dir), start, end) for d in days]
+    partials = []
+    by_month: dict[str, set] = {}
+    for d in days:
+        by_month.setdefault(d[:7], set()).add(d)
+    for month, wanted in sorted(by_month.items()):
+        df = load_month(month, archive_dir)
+        if df is None:
+            continue
+        sub = df[df["day"].isin(wanted)]
+        if not sub.empty:
+            partials.append(stats.compute_minutes_in_range(sub.reset_index(drop=True), start, end, by).to_dict())
+    return partials
+
+
+def month_totals(month: str, archive_dir: str = ARCHIVE_DIR) -> pd.Series:
+    """整月按进程用时（分钟，降序），只读汇总表。"""
+    agg: dict[str, float] = {}
+    for entry in read_rollup(month, archive_dir)["days"].values():
+        for proc, sec in entry["totals"].items():
+            agg[proc] = agg.get(proc, 0.0) + sec / 60
+    return pd.Series(agg, dtype=float).sort_values(ascending=False)
+
+
+def daily_table(month: str, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """每天 × 进程的用时表（分钟），只读汇总表。"""
+    days = read_rollup(month, archive_dir)["days"]
+    table = pd.DataFrame({d: e["totals"] for d, e in sorted(days.items())}).T.fillna(0.0) / 60
+    return table
+
+
+def _day_rollup(df: pd.DataFrame) -> dict:
+    import stats
+
+    s, e, valid = stats._interval_arrays(df)
+    totals = pd.Series(np.where(valid, e - s, 0), index=df["process"].astype(str)).groupby(level=0).sum()
+    names, matrix = stats._hour_seconds(df, (s, e, valid))
+    return {
+        "totals": {str(p): int(sec) for p, sec in totals.items()},
+        "hours": {p: [int(round(x)) for x in matrix[i]] for i, p in enumerate(names)},
+    }
+
+
+def _to_partition_rows(day: str, df: pd.DataFrame) -> pd.DataFrame:
+    import stats
+
+    s, e, _ = stats._interval_arrays(df)
+    window = df["window"] if "window" in df.columns else pd.Series([None] * len(df), dtype=object)
+    out = pd.DataFrame(
+        {
+            "day": day,
+            "start_time": s,
+            "end_time": e,
+            "process": df["process"].to_numpy(dtype=object),
+            "window": window.to_numpy(dtype=object),
+        }
+    )
+    if "host" in df.columns:
+        # 多机合并的数据保留来源主机
+        out["host"] = df["host"].to_numpy(dtype=object)
+    return out
+
+
+def _replace_file(path: str, write):
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def raw_days(data_dir: str = DATA_DIR, before: str | None = None) -> list[str]:
+    """data_dir 中有原始日文件（CSV 或 binlog）且早于 before（默认今天）的日期。"""
+    before = before or datetime.now().strftime("%Y-%m-%d")
+    days = set()
+    try:
+        names = os.listdir(data_dir)
+    except OSError:
+        return []
+    for name in names:
+        m = _DAY_FILE.match(name)
+        if m and m.group(1) < before:
+            days.add(m.group(1))
+    return sorted(days)
+
+
+def compact_month(
+    month: str,
+    days: list[str],
+    keep_raw: bool = False,
+    fmt: str | None = None,
+    archive_dir: str = ARCHIVE_DIR,
+) -> list[str]:
+    """把 days（同属 month）的原始文件并入月分区并更新汇总表，返回已压缩的日期。
+
+    分区与汇总表都先写临时文件再原子替换；成功后才删除原始文件（keep_raw 时保留）。
+    已压缩过的日期若又出现原始文件（或以 keep_raw 重复压缩），以原始文件为准替换分区中
+    该日的记录并重建该日汇总，不会重复计入。
+    """
+    import stats
+
+    frames = []
+    done = []
+    for day in days:
+        path = existing_day_file(day)
+        if path is None:
+            continue
+        df = stats.load_dataframe(path)
+        if df is None:
+            # 空文件或无法识别的文件保持原样，不删除
+            continue
+        frames.append(_to_partition_rows(day, df))
+        done.append(day)
+    if not done:
+        return []
+
+    os.makedirs(archive_dir, exist_ok=True)
+    old = load_month(month, archive_dir)
+    if old is not None:
+        old = old[~old["day"].isin(done)]
+    merged = pd.concat(([old] if old is not None else []) + frames, ignore_index=True)
+    merged = merged.sort_values(["day"], kind="stable").reset_index(drop=True)
+
+    rollup = dict(read_rollup(month, archive_dir))
+    rollup["days"] = dict(rollup["days"])
+    for day in done:
+        rollup["days"][day] = _day_rollup(merged[merged["day"] == day].reset_index(drop=True))
+
+    target = partition_path(month, archive_dir, fmt)
+    if target.endswith(PARQUET_EXT):
+        _replace_file(target, lambda p: merged.to_parquet(p, index=False, compression="zstd"))
+    else:
+        _replace_file(target, lambda p: merged.to_csv(p, index=False, encoding="utf-8", compression="gzip"))
+    # 格式切换时删除另一种格式的旧分区，避免读到过期数据
+    for other in (partition_path(month, archive_dir, "parquet"), partition_path(month, archive_dir, "gzip")):
+        if other != target and os.path.exists(other):
+            os.remove(other)
+
+    def write_rollup(p):
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump(rollup, f, ensure_ascii=False, separators=(",", ":"))
+
+    _replace_file(rollup_path(month, archive_dir), write_rollup)
+
+    if not keep_raw:
+        for day in done:
+            log = binlog.log_path(day, DATA_DIR)
+            for p in (today_file(day), log, binlog.strings_path(log)):
+                if os.path.exists(p):
+                    os.remove(p)
+    return done
+
+
+def drop_days(month: str, days: list[str], archive_dir: str = ARCHIVE_DIR) -> list[str]:
+    """从月分区与汇总表中移除 days（同属 month），返回实际移除的日期。
+
+    这些日期的数据已整体改存别处（如 merge 写入 SQLite 库）时调用：统计优先读取汇总表，
+    留下的旧条目会遮住新数据。分区或汇总表不再含任何日期时删除文件。
+    """
+    rollup = read_rollup(month, archive_dir)
+    dropped = sorted(d for d in days if d in rollup["days"])
+    if not dropped:
+        return []
+
+    old = load_month(month, archive_dir)
+    target = partition_path(month, archive_dir)
+    if old is not None:
+        rest = old[~old["day"].isin(dropped)].reset_index(drop=True)
+        if rest.empty:
+            os.remove(target)
+        elif target.endswith(PARQUET_EXT):
+            _replace_file(target, lambda p: rest.to_parquet(p, index=False, compression="zstd"))
+        else:
+            _replace_file(target, lambda p: rest.to_csv(p, index=False, encoding="utf-8", compression="gzip"))
+
+    rollup = dict(rollup)
+    rollup["days"] = {d: e for d, e in rollup["days"].items() if d not in dropped}
+    path = rollup_path(month, archive_dir)
+    if not rollup["days"]:
+        os.remove(path)
+    else:
+        def write_rollup(p):
+            with open(p, "w", encoding="utf-8") as f:
+                json.dump(rollup, f, ensure_ascii=False, separators=(",", ":"))
+
+        _replace_file(path, write_rollup)
+    _rollups.pop(path, None)
+    return dropped
+
+
+def compact(
+    months: list[str] | None = None,
+    before: str | None = None,
+    keep_raw: bool = False,
+    fmt: str | None = None,
+) -> dict[str, list[str]]:
+    """压缩 before（默认今天）以前的全部原始日文件；months 限定只处理这些月份。"""
+    by_month: dict[str, list[str]] = {}
+    for day in raw_days(DATA_DIR, before):
+        if months is None or day[:7] in months:
+            by_month.setdefault(day[:7], []).append(day)
+    return {month: compact_month(month, days, keep_raw, fmt) for month, days in sorted(by_month.items())}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="WhatDidIDo — 历史数据按月压缩与汇总")
+    p.add_argument("--month", action="append", help="只压缩指定月份 YYYY-MM（可重复）")
+    p.add_argument("--keep", action="store_true", help="保留原始日文件")
+    p.add_argument("--format", choices=["auto", "gzip", "parquet"], default="auto", help="分区格式（auto：有 pyarrow 时用 parquet）")
+    p.add_argument("--summary", metavar="YYYY-MM", help="只打印该月汇总（读取汇总表）")
+    args = p.parse_args(argv)
+
+    if args.summary:
+        totals = month_totals(args.summary)
+        if totals.empty:
+            print(f"No rollup for {args.summary}")
+            return 0
+        print(f"{args.summary} 用时总计：{totals.sum():.1f} 分钟")
+        for proc, mins in totals.items():
+            print(f"    {proc:<32} {mins:10.1f}")
+        return 0
+
+    fmt = None if args.format == "auto" else args.format
+    if fmt == "parquet" and not has_parquet():
+        raise SystemExit("pyarrow is not installed")
+    result = compact(months=args.month, keep_raw=args.keep, fmt=fmt)
+    total = sum(len(days) for days in result.values())
+    for month, days in result.items():
+        if days:
+            print(f"{month}: {len(days)} day(s) -> {partition_path(month)}")
+    print(f"Compacted {total} day file(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""托盘、GUI 与统计共用的轻量基础：数据路径、CSV 结构与时间换算。
+
+只依赖标准库，托盘常驻进程导入它不会带入 pandas / matplotlib。
+"""
+
+import os
+import platform
+from datetime import datetime, timedelta
+
+DATA_DIR = "data"
+HEADER = ["start_time", "end_time", "process", "window"]
+# 可选的整数时间戳结构（表头不同，读取时据此识别）：纪元秒 / 纪元毫秒
+EPOCH_HEADER = ["start_ts", "end_ts", "process", "window"]
+EPOCH_MS_HEADER = ["start_ms", "end_ms", "process", "window"]
+SCHEMA_HEADERS = {"hms": HEADER, "epoch": EPOCH_HEADER, "epoch_ms": EPOCH_MS_HEADER}
+EPOCH_UNITS = {"start_ts": 1, "start_ms": 1000}  # 起始列名 -> 每秒的单位数
+# 一天的数据只覆盖 [00:00, 24:00]：结束早于开始的旧记录（跨午夜）与结束晚于 24:00 的记录都在 24:00 截断，
+# 次日部分属于次日（tracker 写入时已在零点拆分）。stats / stream / live / sqlstore 统一按此计算
+DAY_SECONDS = 24 * 3600
+
+
+def local_host() -> str:
+    """本机主机名；多机合并的数据带 host 列，没有该列的记录视为本机记录。"""
+    return platform.node() or "localhost"
+
+
+def today_file(date_str: str | None = None):
+    if date_str:
+        name = date_str + ".csv"
+    else:
+        name = datetime.now().strftime("%Y-%m-%d") + ".csv"
+    return os.path.join(DATA_DIR, name)
+
+
+def time_to_seconds(t):
+    h, m, s = map(int, t.split(":"))
+    return h * 3600 + m * 60 + s
+
+
+def seconds_to_time(sec: int) -> str:
+    return f"{sec // 3600:02d}:{sec // 60 % 60:02d}:{sec % 60:02d}"
+
+
+def day_start_epoch(day: str) -> int:
+    """本地时间 day 零点的纪元秒。"""
+    return int(datetime.strptime(day, "%Y-%m-%d").timestamp())
+
+
+def schema_of(header) -> str:
+    """由表头（列名序列）判断时间结构：hms / epoch / epoch_ms。"""
+    for name, cols in SCHEMA_HEADERS.items():
+        if list(header[:2]) == cols[:2]:
+            return name
+    return "hms"
+
+
+def day_range(date_from: str, date_to: str) -> list[str]:
+    """返回闭区间 [date_from, date_to] 内的所有日期字符串（YYYY-MM-DD）。"""
+    d0 = datetime.strptime(date_from, "%Y-%m-%d").date()
+    d1 = datetime.strptime(date_to, "%Y-%m-%d").date()
+    if d1 < d0:
+        d0, d1 = d1, d0
+    return [(d0 + timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+
+
+def existing_day_file(day: str) -> str | None:
+    """返回某天已存在的数据文件（优先 CSV，其次 binlog 二进制日志）。"""
+    import binlog
+
+    for path in (today_file(day), binlog.log_path(day, DATA_DIR)):
+        if os.path.exists(path):
+            return path
+    return None
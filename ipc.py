@@ -0,0 +1,268 @@
+"""记录进程的单写者锁与本地 IPC 通道（仅标准库）。
+
+- RecorderLock：``data/recorder.lock`` 上的排他文件锁，保证同一时刻只有一个进程
+  持有当日文件的写入器；进程退出（包括崩溃）时由操作系统自动释放。
+- Server / Client：127.0.0.1 上的 TCP 通道，每条消息为一行 JSON。持锁进程启动
+  Server 并把端口与随机令牌写入 ``data/recorder.json``；其他进程（GUI/另一个托盘）用 Client
+  发送 ``start``/``stop``/``clear``/``status`` 命令，或以 ``subscribe`` 订阅状态推送。
+  回环端口对本机所有进程开放，不带正确令牌（即读不到 recorder.json）的请求一律拒绝。
+"""
+
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+
+from core import DATA_DIR
+
+HOST = "127.0.0.1"
+LOCK_FILE = os.path.join(DATA_DIR, "recorder.lock")
+ENDPOINT_FILE = os.path.join(DATA_DIR, "recorder.json")
+TIMEOUT = 2.0
+
+
+def encode(msg: dict) -> bytes:
+    return (json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class RecorderLock:
+    """非阻塞排他文件锁。"""
+
+    def __init__(self, path: str = LOCK_FILE):
+        self.path = path
+        self._f = None
+
+    def acquire(self) -> bool:
+        if self._f is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        f = open(self.path, "a+b")
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._f = f
+        return True
+
+    def release(self):
+        if self._f is None:
+            return
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+        self._f.close()
+        self._f = None
+
+    @property
+    def held(self) -> bool:
+        return self._f is not None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server.owner
+        for line in self.rfile:
+            try:
+                msg = json.loads(line)
+                cmd = msg.get("cmd")
+            except (ValueError, AttributeError):
+                self.wfile.write(encode({"error": "bad request"}))
+                continue
+            if not server._authorized(msg):
+                self.wfile.write(encode({"error": "unauthorized"}))
+                return
+            if cmd == "subscribe":
+                # 订阅连接保持打开，此后只接收推送；对端关闭时 rfile 结束
+                server._subscribe(self.wfile)
+                self.request.settimeout(None)
+                try:
+                    for _ in self.rfile:
+                        pass
+                finally:
+                    server._unsubscribe(self.wfile)
+                return
+            try:
+                reply = server.handler(msg)
+            except Exception as e:
+                reply = {"error": str(e)}
+            self.wfile.write(encode(reply))
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = False
+
+
+class Server:
+    """持锁进程的命令/推送服务。handler(msg) 处理命令并返回回复（通常是当前状态）。"""
+
+    def __init__(self, handler, endpoint: str = ENDPOINT_FILE):
+        self.handler = handler
+        self.endpoint = endpoint
+        self.port = None
+        self.token = secrets.token_hex(16)
+        self._server = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def start(self) -> int:
+        self._server = _TCPServer((HOST, 0), _Handler)
+        self._server.owner = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        tmp = self.endpoint + ".tmp"
+        # 令牌文件仅当前用户可读（Windows 上由用户目录的权限保护）
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump({"port": self.port, "pid": os.getpid(), "token": self.token}, f)
+        os.replace(tmp, self.endpoint)
+        return self.port
+
+    def _authorized(self, msg: dict) -> bool:
+        token = msg.get("token")
+        return isinstance(token, str) and hmac.compare_digest(token, self.token)
+
+    def _subscribe(self, wfile):
+        with self._lock:
+            self._subscribers.append(wfile)
+        # 新订阅者立即收到一次当前状态
+        try:
+            self._send(wfile, encode(self.handler({"cmd": "status"})))
+        except Exception:
+            pass
+
+    def _unsubscribe(self, wfile):
+        with self._lock:
+            if wfile in self._subscribers:
+                self._subscribers.remove(wfile)
+
+    def _send(self, wfile, data: bytes):
+        with self._lock:
+            wfile.write(data)
+            wfile.flush()
+
+    def broadcast(self, msg: dict):
+        """向所有订阅者推送一条消息；写失败的连接移除。"""
+        data = encode(msg)
+        with self._lock:
+            alive = []
+            for wfile in self._subscribers:
+                try:
+                    wfile.write(data)
+                    wfile.flush()
+                    alive.append(wfile)
+                except OSError:
+                    pass
+            self._subscribers = alive
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        try:
+            with open(self.endpoint, "r", encoding="utf-8") as f:
+                if json.load(f).get("pid") == os.getpid():
+                    os.remove(self.endpoint)
+        except (OSError, ValueError):
+            pass
+
+
+class Client:
+    """连接持锁进程。request() 为一次性请求；subscribe() 在后台线程接收推送。"""
+
+    def __init__(self, endpoint: str = ENDPOINT_FILE):
+        self.endpoint = endpoint
+        self._sub = None
+
+    def _connect(self) -> tuple[socket.socket, str]:
+        """连接记录进程，返回 (socket, 令牌)。"""
+        with open(self.endpoint, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        port, token = int(info["port"]), str(info.get("token", ""))
+        return socket.create_connection((HOST, port), timeout=TIMEOUT), token
+
+    def request(self, cmd: str, **kwargs) -> dict:
+        """发送命令并返回回复；无记录进程时抛出 OSError。"""
+        try:
+            sock, token = self._connect()
+        except (ValueError, KeyError, TypeError) as e:
+            raise OSError(f"bad endpoint file: {e}")
+        with sock, sock.makefile("rwb") as f:
+            f.write(encode({"cmd": cmd, **kwargs, "token": token}))
+            f.flush()
+            line = f.readline()
+        if not line:
+            raise OSError("recorder closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def available(self) -> bool:
+        try:
+            self.request("status")
+            return True
+        except (OSError, ValueError, RuntimeError):
+            return False
+
+    def subscribe(self, on_message, on_close=None) -> bool:
+        """订阅状态推送；on_message/on_close 在后台线程中调用。连接失败返回 False。"""
+        try:
+            sock, token = self._connect()
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        sock.settimeout(None)
+        self._sub = sock
+
+        def reader():
+            try:
+                with sock.makefile("rwb") as f:
+                    f.write(encode({"cmd": "subscribe", "token": token}))
+                    f.flush()
+                    for line in f:
+                        try:
+                            on_message(json.loads(line))
+                        except ValueError:
+                            pass
+            except OSError:
+                pass
+            finally:
+                if self._sub is sock:
+                    self._sub = None
+                if on_close is not None:
+                    on_close()
+
+        threading.Thread(target=reader, daemon=True).start()
+        return True
+
+    def close(self):
+        sock, self._sub = self._sub, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
@@ -0,0 +1,249 @@
+"""今日实时文件的增量读取。
+
+tracker 持续向当日 CSV 追加记录；TailReader 记住上次读到的字节偏移与累计结果，
+每次只解析新追加的完整记录，适合 GUI 每隔几秒刷新“今日至今”的统计。
+HH:MM:SS 与纪元时间戳两种结构均可，由表头识别。
+
+其他存储格式同样增量读取：BinlogTailReader 只读新追加的定长记录与字符串表项，
+SqliteTailReader 只查询自增 id 大于上次的记录。``today_source()`` 按与 stats 相同的
+优先级（CSV、binlog、SQLite 库）选出今天数据所在的存储，``open_reader()`` 创建对应的读取器。
+"""
+
+import csv
+import io
+import os
+import re
+from contextlib import closing
+from datetime import datetime
+
+import binlog
+import core
+from core import DAY_SECONDS, EPOCH_UNITS, SCHEMA_HEADERS, day_start_epoch, time_to_seconds as _seconds
+
+_FINGERPRINT = 64  # 用偏移前若干字节判断文件是否被重写（如“清除今日数据”）
+
+
+class TailReader:
+    """增量读取单个日 CSV，维护按进程的总秒数与逐小时秒数。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.rows = 0
+        self.totals: dict[str, float] = {}
+        self.hours: dict[str, list[float]] = {}
+        self._fingerprint = b""
+        self._unit = None  # 纪元结构时每秒的单位数；None 表示 HH:MM:SS
+        self._base = 0
+
+    def poll(self) -> bool:
+        """读取新追加的完整记录，返回累计结果是否有变化。"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            changed = self.rows > 0
+            self.reset()
+            return changed
+
+        rescanned = False
+        with open(self.path, "rb") as f:
+            if size < self.offset or not self._same_prefix(f):
+                # 文件被截断或重写：从头重新统计
+                self.reset()
+                rescanned = True
+            if size == self.offset:
+                return rescanned
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+
+        consumed = self._consume(chunk)
+        if consumed:
+            self.offset += consumed
+            with open(self.path, "rb") as f:
+                f.seek(max(0, self.offset - _FINGERPRINT))
+                self._fingerprint = f.read(self.offset - f.tell())
+        return rescanned or consumed > 0
+
+    def _same_prefix(self, f) -> bool:
+        if not self._fingerprint:
+            return True
+        f.seek(self.offset - len(self._fingerprint))
+        return f.read(len(self._fingerprint)) == self._fingerprint
+
+    def _consume(self, chunk: bytes) -> int:
+        """解析 chunk 中的完整记录，返回已消费的字节数；末尾不完整的行留待下次。"""
+        consumed = 0
+        record = []
+        quotes = 0
+        pos = 0
+        while True:
+            nl = chunk.find(b"\n", pos)
+            if nl < 0:
+                break
+            line = chunk[pos:nl + 1]
+            pos = nl + 1
+            record.append(line)
+            quotes += line.count(b'"')
+            if quotes % 2:
+                # 引号内的换行（窗口标题含换行），继续拼接下一行
+                continue
+            self._add(b"".join(record))
+            consumed = pos
+            record = []
+            quotes = 0
+        return consumed
+
+    def _add(self, raw: bytes):
+        try:
+            row = next(csv.reader(io.StringIO(raw.decode("utf-8"), newline="")))
+        except (StopIteration, UnicodeDecodeError, csv.Error):
+            return
+        if len(row) < 3:
+            return
+        if any(row[:2] == header[:2] for header in SCHEMA_HEADERS.values()):
+            self._set_schema(row[0])
+            return
+        try:
+            if self._unit is None:
+                s = _seconds(row[0])
+                e = _seconds(row[1])
+            else:
+                s = int(row[0]) // self._unit - self._base
+                e = int(row[1]) // self._unit - self._base
+        except ValueError:
+            return
+        if s < 0 or e < 0:
+            return
+        self._add_interval(s, e, row[2])
+
+    def _add_interval(self, s: int, e: int, proc: str):
+        """累加一条区间（两端非负）；与 stats 相同，限制在当天 [0, 24:00]，跨午夜的旧记录计到 24:00。"""
+        if e < s:
+            e = DAY_SECONDS
+        s, e = min(s, DAY_SECONDS), min(e, DAY_SECONDS)
+        self.rows += 1
+        self.totals[proc] = self.totals.get(proc, 0.0) + (e - s)
+        buckets = self.hours.setdefault(proc, [0.0] * 24)
+        cur = s
+        while cur < e:
+            hour = cur // 3600
+            seg_end = min(e, (hour + 1) * 3600)
+            buckets[hour] += seg_end - cur
+            cur = seg_end
+
+    def _set_schema(self, start_col: str):
+        self._unit = EPOCH_UNITS.get(start_col)
+        if self._unit is not None:
+            m = re.search(r"\d{4}-\d{2}-\d{2}", os.path.basename(self.path))
+            self._base = day_start_epoch(m.group(0)) if m else 0
+
+    def minutes(self) -> dict[str, float]:
+        """{process: minutes}，按用时降序。"""
+        return {
+            p: sec / 60
+            for p, sec in sorted(self.totals.items(), key=lambda kv: kv[1], reverse=True)
+        }
+
+
+class BinlogTailReader(TailReader):
+    """增量读取单个二进制日志（见 binlog.py）：只解析新追加的完整记录，字符串表同样只读新增的项。"""
+
+    def reset(self):
+        super().reset()
+        self._strings: list[str] = []
+        self._strings_offset = 0
+
+    def _consume(self, chunk: bytes) -> int:
+        pos = 0
+        if self.offset == 0:
+            if len(chunk) < binlog.HEADER_SIZE or not chunk.startswith(binlog.MAGIC):
+                return 0
+            pos = binlog.HEADER_SIZE
+        new, self._strings_offset = binlog.read_strings_from(binlog.strings_path(self.path), self._strings_offset)
+        self._strings += new
+        limit = len(self._strings)
+        size = binlog.RECORD.size
+        while pos + size <= len(chunk):
+            s, e, p, w = binlog.RECORD.unpack_from(chunk, pos)
+            if p >= limit or w >= limit:
+                # 引用的字符串尚未写完整，留待下次
+                break
+            if s >= 0 and e >= 0:
+                self._add_interval(s, e, self._strings[p])
+            pos += size
+        return pos
+
+
+class SqliteTailReader(TailReader):
+    """SQLite 存储中某天的增量读取：只查询 id 大于上次的记录；该天记录被删除或替换时重新统计。"""
+
+    def __init__(self, path: str, day: str):
+        self.day = day
+        super().__init__(path)
+
+    def reset(self):
+        super().reset()
+        self._last_id = 0
+        self._seen = 0  # 已读取的行数（含无效行），用于发现删除
+
+    def poll(self) -> bool:
+        import sqlstore
+
+        conn = sqlstore.connect_readonly(self.path)
+        if conn is None:
+            changed = self.rows > 0
+            self.reset()
+            return changed
+        rescanned = False
+        with closing(conn):
+            (kept,) = conn.execute(
+                "SELECT COUNT(*) FROM intervals WHERE day = ? AND id <= ?", (self.day, self._last_id)
+            ).fetchone()
+            if kept != self._seen:
+                self.reset()
+                rescanned = True
+            rows = conn.execute(
+                'SELECT id, start, "end", process FROM intervals WHERE day = ? AND id > ? ORDER BY id',
+                (self.day, self._last_id),
+            ).fetchall()
+        for rid, s, e, proc in rows:
+            self._last_id = rid
+            self._seen += 1
+            if proc is not None and s >= 0 and e >= 0:
+                self._add_interval(s, e, proc)
+        return rescanned or bool(rows)
+
+
+def today_source(day: str | None = None) -> tuple[str, str, str]:
+    """今天（或 day）的数据所在的存储 (类型, 路径, 日期)：CSV 优先，其次 binlog，再次 SQLite 库。
+
+    都不存在时为 CSV（记录开始后文件出现）。存储变化时返回值随之变化，调用方据此换用读取器。
+    """
+    import sqlstore
+
+    day = day or datetime.now().strftime("%Y-%m-%d")
+    path = core.today_file(day)
+    if not os.path.exists(path):
+        log = binlog.log_path(day, core.DATA_DIR)
+        if os.path.exists(log):
+            return "binlog", log, day
+        db = sqlstore.db_path_for(path)
+        if os.path.exists(db):
+            return "sqlite", db, day
+    return "csv", path, day
+
+
+def open_reader(source: tuple[str, str, str]) -> TailReader:
+    """为 today_source() 的结果创建增量读取器；读取器的 source 属性记录它对应的存储。"""
+    kind, path, day = source
+    if kind == "binlog":
+        reader = BinlogTailReader(path)
+    elif kind == "sqlite":
+        reader = SqliteTailReader(path, day)
+    else:
+        reader = TailReader(path)
+    reader.source = source
+    return reader
@@ -0,0 +1,249 @@
+"""多台机器的数据目录合并为一条时间线。
+
+各工作站把自己的 data/ 同步到共享目录后：
+``python merge.py alice=/share/alice/data bob=/share/bob/data``（主机名省略时取目录名，
+目录名为 data 时取上一级目录名）。每一天：
+
+- 各来源分块读出一天（``stream.iter_chunks``，日 CSV / binlog / 月分区 / SQLite 均可），整天按开始时间排序
+  （补写的检查点、手工编辑等会让文件不完全有序），再用 ``heapq.merge`` 做 k 路归并；内存与单个来源
+  一天的记录数成正比，字符串列之外只占每条十几个字节
+- 每条记录带来源主机（host 列）；来源本身已是合并结果时沿用记录里的 host
+- 去重：与其他来源已输出的同一 (进程, 标题) 重叠的部分视为重复（同一份数据被同步进了多个目录），
+  裁掉重叠部分，完全被覆盖则丢弃；时间相同时先列出的来源优先。同一来源内的记录原样保留
+- 结果替换输出存储中这一天的数据：默认写入 data/，格式取 tracker 的 ``STORAGE_FORMAT`` /
+  ``TIME_SCHEMA``。CSV 先写临时文件再替换，输出目录本身也可以作为来源之一；写入 SQLite 库时
+  这一天同时移出输出目录的日文件、月分区与汇总表，各统计路径都只会读到库中的合并结果
+- 今天的数据跳过：记录器仍在追加写入今天的文件，替换它会丢失合并期间写入的记录
+  （Windows 上文件被占用时替换直接失败）
+
+各天在进程池中并行合并。之后 ``stats.py --by host`` 按来源主机统计。
+"""
+
+import argparse
+import csv
+import heapq
+import os
+import sys
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+import binlog
+import compact
+import sqlstore
+import stream
+from core import DATA_DIR, SCHEMA_HEADERS, day_start_epoch, seconds_to_time
+
+PRUNE_KEYS = 4096  # 去重表超过该键数时清理已不可能再重叠的键
+
+
+def parse_root(spec: str) -> tuple[str, str]:
+    """``host=path`` 或 ``path`` -> (host, path)。"""
+    host, sep, path = spec.partition("=")
+    if not sep or not host or os.path.exists(spec):
+        path = spec
+        norm = os.path.normpath(os.path.abspath(spec))
+        host = os.path.basename(norm)
+        if host == os.path.basename(DATA_DIR):
+            host = os.path.basename(os.path.dirname(norm))
+    return host, path
+
+
+def root_days(root: str) -> set[str]:
+    """某个数据目录中有数据的全部日期：原始日文件、月分区与 SQLite 库。"""
+    days = set(compact.raw_days(root, before="9999-12-31"))
+    archive = os.path.join(root, "archive")
+    try:
+        names = os.listdir(archive)
+    except OSError:
+        names = []
+    for name in names:
+        if name.endswith(compact.ROLLUP_EXT):
+            days.update(compact.read_rollup(name[: -len(compact.ROLLUP_EXT)], archive)["days"])
+    days.update(sqlstore.stored_days(sqlstore.db_path_for(os.path.join(root, "_"))))
+    return days
+
+
+def source_rows(root: str, host: str, day: str, chunk_rows: int = stream.CHUNK_ROWS):
+    """逐条产出某来源某天的 (start, end, process, window, host)，按 start 升序（相同时保持文件顺序）。
+
+    分块读取后整天排序：文件通常按时间追加，但检查点补写等会产生乱序的行。
+    """
+    import stats
+
+    parts = []
+    path = os.path.join(root, day + ".csv")
+    for chunk in stream.iter_chunks(path, ("process", "window", "host"), chunk_rows):
+        s, e, valid = stats._interval_arrays(chunk)
+        valid &= chunk["process"].notna().to_numpy()
+        if not valid.any():
+            continue
+        parts.append(
+            (
+                s[valid],
+                e[valid],
+                chunk["process"].astype(str).to_numpy(dtype=object)[valid],
+                chunk["window"].to_numpy(dtype=object)[valid],
+                chunk["host"].fillna(host).astype(str).to_numpy(dtype=object)[valid],
+            )
+        )
+    if not parts:
+        return
+    s, e, procs, wins, hosts = (np.concatenate(col) for col in zip(*parts))
+    del parts
+    order = np.argsort(s, kind="stable")
+    for lo in range(0, len(order), chunk_rows):
+        idx = order[lo:lo + chunk_rows]
+        for row in zip(s[idx].tolist(), e[idx].tolist(), procs[idx].tolist(), wins[idx].tolist(), hosts[idx].tolist()):
+            if row[3] != row[3]:
+                # 缺失的标题（NaN）统一为 None
+                row = row[:3] + (None,) + row[4:]
+            yield row
+
+
+def dedup(rows):
+    """去掉与其他来源已输出的同一 (进程, 标题) 重叠的部分。
+
+    rows 为按 start 升序的 (start, end, process, window, host, 来源序号)，产出不含来源序号的行。
+    """
+    covered: dict[tuple, tuple[int, int]] = {}  # (进程, 标题) -> (已输出的最晚结束秒数, 来源序号)
+    limit = PRUNE_KEYS
+    for s, e, p, w, h, src in rows:
+        key = (p, w)
+        end, owner = covered.get(key, (None, src))
+        if owner != src and end > s:
+            s = end
+        if e <= s:
+            continue
+        covered[key] = (e, src) if end is None or e >= end else (end, owner)
+        yield s, e, p, w, h
+        if len(covered) > limit:
+            # 之后的记录开始时间都不早于 s，结束在 s 之前的键不会再重叠
+            covered = {k: v for k, v in covered.items() if v[0] > s}
+            limit = max(PRUNE_KEYS, 2 * len(covered))
+
+
+def merged_rows(roots: list[tuple[str, str]], day: str, chunk_rows: int = stream.CHUNK_ROWS):
+    """某天全部来源的 k 路归并 + 去重结果（生成器）。"""
+    sources = [_tagged(source_rows(root, host, day, chunk_rows), i) for i, (host, root) in enumerate(roots)]
+    return dedup(heapq.merge(*sources, key=lambda row: row[0]))
+
+
+def _tagged(rows, src: int):
+    for row in rows:
+        yield row + (src,)
+
+
+def _write_csv(path: str, day: str, rows, schema: str) -> int:
+    if schema == "hms":
+        fmt = seconds_to_time
+    else:
+        base = day_start_epoch(day)
+        unit = 1000 if schema == "epoch_ms" else 1
+
+        def fmt(sec):
+            return (base + sec) * unit
+
+    count = 0
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SCHEMA_HEADERS[schema] + ["host"])
+        for s, e, p, w, h in rows:
+            writer.writerow([fmt(s), fmt(e), p, w, h])
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def merge_day(day: str, roots: list[tuple[str, str]], out_dir: str, fmt: str, schema: str) -> int:
+    """合并一天并写入输出存储，返回写出的条数（进程池任务）。"""
+    rows = merged_rows(roots, day)
+    csv_path = os.path.join(out_dir, day + ".csv")
+    if fmt == "sqlite":
+        conn = sqlstore.connect(sqlstore.db_path_for(csv_path))
+        try:
+            count = sqlstore.replace_day(conn, day, rows)
+        finally:
+            conn.close()
+        # 这一天已整体写入数据库：移除输出目录里的日文件，否则统计会优先读取它们
+        log = binlog.log_path(day, out_dir)
+        for p in (csv_path, log, binlog.strings_path(log)):
+            if os.path.exists(p):
+                os.remove(p)
+        return count
+    os.makedirs(out_dir, exist_ok=True)
+    count = _write_csv(csv_path, day, rows, schema)
+    log = binlog.log_path(day, out_dir)
+    for p in (log, binlog.strings_path(log)):
+        # 同一天的 binlog 会在 CSV 缺失时被读到，已并入 CSV 后删除
+        if os.path.exists(p):
+            os.remove(p)
+    return count
+
+
+def merge(
+    roots: list[tuple[str, str]],
+    days: list[str] | None = None,
+    out_dir: str = DATA_DIR,
+    fmt: str | None = None,
+    schema: str | None = None,
+    workers: int | None = None,
+) -> dict[str, int]:
+    """合并 roots 中 days（默认全部日期）的数据，返回 {日期: 写出条数}。今天总是跳过。"""
+    import stats
+    import tracker
+
+    fmt = fmt or tracker.STORAGE_FORMAT
+    schema = schema or tracker.TIME_SCHEMA
+    if fmt == "binlog":
+        raise ValueError("binlog records have no host field; merge into csv or sqlite storage")
+    if days is None:
+        days = sorted(set().union(*(root_days(root) for _, root in roots)))
+    today = datetime.now().strftime("%Y-%m-%d")
+    days = [d for d in days if d != today]
+    if not days:
+        return {}
+    counts = stats._map_files(partial(merge_day, roots=roots, out_dir=out_dir, fmt=fmt, schema=schema), days, workers)
+    if fmt == "sqlite":
+        # 统计优先读取月汇总表：已压缩的日期移出分区与汇总表，否则会遮住库中的合并结果。
+        # 在主进程中按月处理，避免并行任务同时改写同一个月的文件
+        archive = compact.archive_dir_for(os.path.join(out_dir, days[0] + ".csv"))
+        by_month: dict[str, list[str]] = {}
+        for day in days:
+            by_month.setdefault(day[:7], []).append(day)
+        for month, month_days in sorted(by_month.items()):
+            compact.drop_days(month, month_days, archive)
+    return dict(zip(days, counts))
+
+
+def main(argv=None):
+    from core import day_range
+
+    p = argparse.ArgumentParser(description="WhatDidIDo — 合并多台机器的数据目录")
+    p.add_argument("roots", nargs="+", metavar="[HOST=]DIR", help="数据目录，可用 host=目录 指定主机名")
+    p.add_argument("--out", default=DATA_DIR, help="输出目录（默认 data）")
+    p.add_argument("--format", choices=["csv", "sqlite"], default=None, help="输出格式（默认 tracker 的 STORAGE_FORMAT）")
+    p.add_argument("--from", dest="date_from", help="只合并该日期及以后 YYYY-MM-DD")
+    p.add_argument("--to", dest="date_to", help="只合并该日期及以前 YYYY-MM-DD")
+    p.add_argument("--workers", type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    args = p.parse_args(argv)
+
+    roots = [parse_root(spec) for spec in args.roots]
+    days = sorted(set().union(*(root_days(root) for _, root in roots)))
+    if args.date_from or args.date_to:
+        wanted = set(day_range(args.date_from or days[0], args.date_to or days[-1])) if days else set()
+        days = [d for d in days if d in wanted]
+    try:
+        result = merge(roots, days, args.out, args.format, workers=args.workers)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    for host, root in roots:
+        print(f"{host}: {root}")
+    print(f"Merged {len(result)} day(s), {sum(result.values())} interval(s) -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
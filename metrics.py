@@ -0,0 +1,207 @@
+"""托盘记录器的轻量埋点：计数器与延迟直方图。
+
+由 ``tracker.METRICS_ENABLED`` 开启；关闭时 Tracker/RecordWriter 的各埋点处只做一次
+``is None`` 判断，不产生额外开销。开启后快照定期追加到滚动的 ``data/metrics.jsonl``，
+也可经 IPC 的 ``metrics`` 命令实时查询。
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from core import DATA_DIR
+
+METRICS_FILE = os.path.join(DATA_DIR, "metrics.jsonl")
+MAX_BYTES = 1024 * 1024  # 单个指标文件上限，超过后滚动
+BACKUPS = 3  # 保留的历史文件数（metrics.jsonl.1 ~ .3）
+EXPORT_INTERVAL = 60  # 导出间隔（秒）
+HOURS_KEPT = 48  # “每小时记录数”保留的小时数
+
+
+class Histogram:
+    """以 2 的幂（微秒）分桶的延迟直方图，分位数为所在桶的上界。"""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets: dict[int, int] = {}
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        b = int(seconds * 1e6).bit_length()
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """近似分位数（秒）。"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                return min((1 << b) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p90_ms": round(self.quantile(0.9) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class MetricsFile:
+    """按体积滚动的 JSONL 指标文件。"""
+
+    def __init__(self, path: str = METRICS_FILE, max_bytes: int = MAX_BYTES, backups: int = BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def write(self, snapshot: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        try:
+            if os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+        except OSError:
+            pass
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class Metrics:
+    """计数器、延迟直方图与每小时记录数；线程安全。sink 为导出目标（如 MetricsFile）。"""
+
+    def __init__(self, sink=None, export_interval: float = EXPORT_INTERVAL):
+        self.sink = sink
+        self.export_interval = export_interval
+        self.counters: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self.hourly: dict[str, int] = {}
+        self.last_error = None
+        self._last_exc = None  # 最近计数的异常对象，避免同一异常在多层捕获处重复计数
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._last_export = time.monotonic()
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    def error(self, where: str, exc: BaseException):
+        """记录一次被吞掉的异常。
+
+        同一异常对象只计一次，计在最先记录它的位置：如 timed 包装的窗口探测抛出的异常
+        计为 errors.resolve，随后被采集循环捕获时不再计入 errors.loop。
+        """
+        with self._lock:
+            if exc is self._last_exc:
+                return
+            self._last_exc = exc
+            key = f"errors.{where}"
+            self.counters[key] = self.counters.get(key, 0) + 1
+            self.last_error = f"{datetime.now():%H:%M:%S} {where}: {type(exc).__name__}: {exc}"
+
+    def record(self, when: datetime | None = None):
+        """计一条写出的记录到所在小时。"""
+        key = (when or datetime.now()).strftime("%Y-%m-%d %H")
+        with self._lock:
+            self.hourly[key] = self.hourly.get(key, 0) + 1
+            if len(self.hourly) > HOURS_KEPT:
+                for old in sorted(self.hourly)[:-HOURS_KEPT]:
+                    del self.hourly[old]
+
+    def timed(self, name: str, func):
+        """包装 func：记录每次调用耗时，异常计入 errors.<name> 后照常抛出。"""
+
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                self.error(name, e)
+                raise
+            finally:
+                self.observe(name, time.perf_counter() - t0)
+
+        return wrapper
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            intervals = self.counters.get("intervals", 0)
+            rows = self.counters.get("rows", 0)
+            return {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "uptime_s": round(time.time() - self.started),
+                "counters": dict(self.counters),
+                # 窗口/标题变化次数与实际写出行数之比：归一化、合并与去抖的效果
+                "coalescing_ratio": round(intervals / rows, 2) if rows else None,
+                "latency": {k: h.snapshot() for k, h in self.histograms.items()},
+                "records_per_hour": dict(self.hourly),
+                "last_error": self.last_error,
+            }
+
+    def maybe_export(self):
+        """距上次导出超过 export_interval 时写出一次快照。"""
+        if self.sink is None or time.monotonic() - self._last_export < self.export_interval:
+            return
+        self.export()
+
+    def export(self):
+        self._last_export = time.monotonic()
+        if self.sink is None:
+            return
+        try:
+            self.sink.write(self.snapshot())
+        except OSError:
+            pass
+
+
+def main():
+    """打印正在运行的记录进程的埋点快照：``python metrics.py``。"""
+    import ipc
+
+    try:
+        snap = ipc.Client().request("metrics")
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Recorder not reachable: {e}")
+        return 1
+    if not snap.get("enabled"):
+        print("Metrics are disabled (set tracker.METRICS_ENABLED = True).")
+        return 0
+    print(json.dumps(snap, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
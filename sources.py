@@ -0,0 +1,204 @@
+"""前台窗口事件源：Tracker 通过它得知“当前窗口变了”。
+
+所有事件源都实现 ``next(timeout) -> WindowEvent | None``：阻塞直到窗口发生变化
+（返回事件）或超时（返回 None，供 Tracker 做定期刷写等维护）；事件源结束时抛出
+StopIteration，Tracker 随即退出采集循环。
+
+- WinEventSource：Windows 前台切换/标题变化钩子（SetWinEventHook），空闲时零轮询；
+- AdaptivePollingSource：自适应轮询，稳定期逐步放宽间隔，切换后立即收紧；
+- PollingSource：固定间隔轮询（旧行为）；
+- FakeSource：按给定序列回放事件，用于在任意平台上确定性地测试记录流程。
+"""
+
+import ctypes
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+
+class WindowEvent(NamedTuple):
+    time: datetime
+    process: str
+    window: str
+
+
+_UNSET = object()
+
+
+class AdaptivePollingSource:
+    """自适应轮询：窗口刚变化时以 min_interval 轮询，之后每次未变化按 backoff 倍放宽到 max_interval。"""
+
+    def __init__(
+        self,
+        probe,
+        min_interval: float = 0.5,
+        max_interval: float = 5.0,
+        backoff: float = 1.5,
+        sleep=time.sleep,
+        clock=datetime.now,
+    ):
+        self.probe = probe
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self.polls = 0
+        self._sleep = sleep
+        self._clock = clock
+        self._last = _UNSET
+
+    def next(self, timeout: float) -> WindowEvent | None:
+        waited = 0.0
+        while True:
+            if self._last is not _UNSET:
+                step = min(self.interval, timeout - waited)
+                if step <= 0:
+                    return None
+                self._sleep(step)
+                waited += step
+            self.polls += 1
+            current = self.probe()
+            if current != self._last:
+                self._last = current
+                self.interval = self.min_interval
+                return WindowEvent(self._clock(), *current)
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    def close(self):
+        pass
+
+
+class PollingSource(AdaptivePollingSource):
+    """固定间隔轮询（与最初的 CHECK_INTERVAL 行为一致）。"""
+
+    def __init__(self, probe, interval: float = 2.0, **kwargs):
+        super().__init__(probe, min_interval=interval, max_interval=interval, backoff=1.0, **kwargs)
+
+
+class FakeSource:
+    """回放预先给定的 (time, process, window) 序列；序列耗尽后 next() 抛出 StopIteration。
+
+    序列中的 None 表示一次无窗口变化的超时（空闲 tick）。
+    """
+
+    def __init__(self, events):
+        self._events = [None if e is None else WindowEvent(*e) for e in events]
+        self.closed = False
+
+    def next(self, timeout: float) -> WindowEvent | None:
+        if not self._events:
+            raise StopIteration
+        return self._events.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WINEVENT_OUTOFCONTEXT = 0x0000
+OBJID_WINDOW = 0
+WM_QUIT = 0x0012
+
+
+class WinEventSource:
+    """基于 SetWinEventHook 的推送式事件源（仅 Windows）。
+
+    钩子在专用线程中安装并运行消息循环，回调只把“有变化”的信号放入队列；
+    next() 取到信号后再调用 probe 读取进程名与标题。超时时也探测一次，
+    作为漏掉事件时的兜底。
+    """
+
+    def __init__(self, probe, clock=datetime.now):
+        self.probe = probe
+        self._clock = clock
+        self._signals: queue.Queue = queue.Queue()
+        self._last = _UNSET
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        if self._error is not None:
+            raise self._error
+
+    def _pump(self):
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        proc_type = ctypes.WINFUNCTYPE(
+            None,
+            wintypes.HANDLE,
+            wintypes.DWORD,
+            wintypes.HWND,
+            wintypes.LONG,
+            wintypes.LONG,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )
+
+        def callback(_hook, event, hwnd, id_object, _id_child, _thread, _time):
+            if event == EVENT_OBJECT_NAMECHANGE and (
+                id_object != OBJID_WINDOW or hwnd != user32.GetForegroundWindow()
+            ):
+                return
+            self._signals.put(self._clock())
+
+        self._callback = proc_type(callback)  # 保持引用，避免被回收
+        hooks = []
+        try:
+            self._thread_id = kernel32.GetCurrentThreadId()
+            for event in (EVENT_SYSTEM_FOREGROUND, EVENT_OBJECT_NAMECHANGE):
+                hook = user32.SetWinEventHook(event, event, 0, self._callback, 0, 0, WINEVENT_OUTOFCONTEXT)
+                if not hook:
+                    raise OSError("SetWinEventHook failed")
+                hooks.append(hook)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+
+    def next(self, timeout: float) -> WindowEvent | None:
+        if self._last is _UNSET:
+            when = self._clock()
+        else:
+            try:
+                when = self._signals.get(timeout=timeout)
+            except queue.Empty:
+                when = None
+            # 合并短时间内连续到达的信号，以最早的时间为准
+            while not self._signals.empty():
+                self._signals.get_nowait()
+        current = self.probe()
+        if current == self._last:
+            return None
+        self._last = current
+        return WindowEvent(when or self._clock(), *current)
+
+    def close(self):
+        if self._thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread_id = None
+
+
+def default_source(probe):
+    """Windows 上优先使用前台钩子，失败或其他平台回退到自适应轮询。"""
+    if sys.platform == "win32":
+        try:
+            return WinEventSource(probe)
+        except Exception:
+            pass
+    return AdaptivePollingSource(probe)
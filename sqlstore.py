@@ -0,0 +1,373 @@
+"""可选 SQLite 存储：全部区间存于一个数据库，按日/跨日统计下推为 SQL 聚合。
+
+数据库为 ``data/whatdidido.db``（WAL 模式）。表 ``intervals`` 每行一个区间：
+``day``（YYYY-MM-DD）、``start``/``end``（距当日零点的整数秒，与 stats 相同限制在 [0, 24:00]；
+早期版本导入的跨午夜记录 end 可能超过 24:00，查询时一律截断）、
+``process``、``window``、``host``（多机合并的来源主机，本机记录为 NULL）；索引 ``(day, start)`` 与 ``(process, day)``。表 ``imports`` 记录
+由日文件导入的日期及导入时源文件的 (size, mtime)，文件之后又被追加时不再视为最新。
+
+tracker 中设 ``STORAGE_FORMAT = "sqlite"`` 后按批在单个事务中插入；stats 对库中已有
+（且不比日文件旧）的日期直接执行 ``SUM(MIN(end, :e) - MAX(start, :s)) ... GROUP BY``，
+跨数月的统计也只是一次走索引的查询。
+
+命令行：``python sqlstore.py import``（导入 data/ 下全部日文件）/ ``python sqlstore.py import data/2025-12-15.csv --remove``
+/ ``python sqlstore.py total Code.exe --from 2025-10-01 --to 2025-12-31``
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from urllib.request import pathname2url
+
+from core import DATA_DIR, DAY_SECONDS, day_range, existing_day_file, local_host, time_to_seconds
+
+DB_FILE = os.path.join(DATA_DIR, "whatdidido.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS intervals (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    "end" INTEGER NOT NULL,
+    process TEXT,
+    window TEXT,
+    host TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_intervals_day_start ON intervals (day, start);
+CREATE INDEX IF NOT EXISTS ix_intervals_process ON intervals (process, day);
+CREATE TABLE IF NOT EXISTS imports (
+    day TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL
+);
+"""
+
+_INSERT_HOST = 'INSERT INTO intervals (day, start, "end", process, window, host) VALUES (?, ?, ?, ?, ?, ?)'
+# 截断到 24:00 的结束时间；区间与 [:s, :e] 的重叠秒数（:e 不超过 24:00）
+_END = f'MIN("end", {DAY_SECONDS})'
+_CLIPPED = 'MIN("end", :e) - MAX(start, :s)'
+_GROUP_COLUMNS = {"process": "process", "window": "COALESCE(window, '')", "host": "COALESCE(host, :host)"}
+
+
+def connect(path: str = DB_FILE) -> sqlite3.Connection:
+    """打开（必要时创建）数据库：WAL 日志、NORMAL 同步，读者不阻塞写入者。
+
+    连接可跨线程使用（记录器的写入由 RecordWriter 的锁串行化）。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    if not _has_host(conn):
+        # 旧版本建的库没有 host 列
+        conn.execute("ALTER TABLE intervals ADD COLUMN host TEXT")
+    return conn
+
+
+def db_path_for(path: str) -> str:
+    """日文件 path 所在数据目录中的数据库文件。"""
+    return os.path.join(os.path.dirname(path) or ".", os.path.basename(DB_FILE))
+
+
+def connect_readonly(path: str) -> sqlite3.Connection | None:
+    """只读打开已有的数据库（不建表、不改日志模式）；不存在时返回 None。
+
+    统计与合并只读取，不应对记录器正在写入的库执行 DDL 或获取写锁。
+    """
+    if not os.path.exists(path):
+        return None
+    uri = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=10, check_same_thread=False)
+
+
+def _group_key(conn: sqlite3.Connection, by: str) -> str:
+    if by == "host" and not _has_host(conn):
+        # 旧版本建的库没有 host 列：全部是本机记录
+        return ":host"
+    return _GROUP_COLUMNS[by]
+
+
+def _has_host(conn: sqlite3.Connection) -> bool:
+    return "host" in {row[1] for row in conn.execute("PRAGMA table_info(intervals)")}
+
+
+def insert_rows(conn: sqlite3.Connection, day: str, rows):
+    """在一个事务中插入 (start 秒, end 秒, process, window) 行。"""
+    with conn:
+        conn.executemany(
+            'INSERT INTO intervals (day, start, "end", process, window) VALUES (?, ?, ?, ?, ?)',
+            ((day, s, e, p, w) for s, e, p, w in rows),
+        )
+
+
+def replace_day(conn: sqlite3.Connection, day: str, rows, batch_rows: int = 10_000) -> int:
+    """用 (start, end, process, window, host) 行替换某天的记录，返回写入条数。
+
+    rows 可以是生成器：按 batch_rows 条一个事务分批插入（第一个事务同时删除旧记录），
+    写锁每次只持有一小段时间，其他进程可以穿插写入。
+    """
+    count = 0
+    batch = []
+    first = True
+    for row in rows:
+        batch.append((day, *row))
+        if len(batch) >= batch_rows:
+            count += _insert_batch(conn, day, batch, first)
+            batch, first = [], False
+    if batch or first:
+        count += _insert_batch(conn, day, batch, first)
+    return count
+
+
+def _insert_batch(conn: sqlite3.Connection, day: str, batch: list, first: bool) -> int:
+    with conn:
+        if first:
+            conn.execute("DELETE FROM intervals WHERE day = ?", (day,))
+            conn.execute("DELETE FROM imports WHERE day = ?", (day,))
+        conn.executemany(_INSERT_HOST, batch)
+    return len(batch)
+
+
+def delete_day(day: str, path: str = DB_FILE):
+    """删除某天的全部区间（清除今日数据）。"""
+    if not os.path.exists(path):
+        return
+    with closing(connect(path)) as conn, conn:
+        conn.execute("DELETE FROM intervals WHERE day = ?", (day,))
+        conn.execute("DELETE FROM imports WHERE day = ?", (day,))
+
+
+def _signature(path: str) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def covered_days(days: list[str], path: str = DB_FILE) -> set[str]:
+    """days 中可直接由数据库回答的日期。
+
+    日文件存在时要求它已导入且导入后未再改动；日文件不存在时库中有记录即可。
+    """
+    conn = connect_readonly(path)
+    if conn is None or not days:
+        return set()
+    with closing(conn):
+        first, last = min(days), max(days)
+        imported = dict(
+            ((d, (size, mtime)) for d, size, mtime in conn.execute(
+                "SELECT day, size, mtime FROM imports WHERE day BETWEEN ? AND ?", (first, last)
+            ))
+        )
+        present = {d for (d,) in conn.execute("SELECT DISTINCT day FROM intervals WHERE day BETWEEN ? AND ?", (first, last))}
+    out = set()
+    for d in days:
+        file = existing_day_file(d)
+        if file is None:
+            if d in present:
+                out.add(d)
+        elif imported.get(d) == _signature(file):
+            out.add(d)
+    return out
+
+
+def stored_days(path: str = DB_FILE) -> list[str]:
+    """库中有记录的全部日期（升序）。"""
+    conn = connect_readonly(path)
+    if conn is None:
+        return []
+    with closing(conn):
+        return [d for (d,) in conn.execute("SELECT DISTINCT day FROM intervals ORDER BY day")]
+
+
+def _day_filter(days: list[str]) -> tuple[str, dict]:
+    """连续日期用 BETWEEN（走 (day, start) 索引的范围扫描），否则用 IN。返回 (条件, 命名参数)。"""
+    first, last = min(days), max(days)
+    if sorted(set(days)) == day_range(first, last):
+        return "day BETWEEN :d0 AND :d1", {"d0": first, "d1": last}
+    params = {f"d{i}": d for i, d in enumerate(sorted(set(days)))}
+    return f"day IN ({', '.join(':' + k for k in params)})", params
+
+
+def _bounds(start: str | None, end: str | None) -> tuple[int, int]:
+    start_s = time_to_seconds(start) if start else 0
+    # 与 stats 相同：一天只统计到 24:00
+    end_s = min(time_to_seconds(end), DAY_SECONDS) if end else DAY_SECONDS
+    return start_s, end_s
+
+
+def minutes_for_days(
+    days: list[str],
+    start: str | None = None,
+    end: str | None = None,
+    by: str = "process",
+    path: str = DB_FILE,
+) -> dict[str, float]:
+    """days 内每天 [start, end] 区间的用时 {键: 分钟}，裁剪与求和都在 SQL 中完成。
+
+    by="category" 时先按 (进程, 标题) 聚合，再只对去重后的组合分类。
+    """
+    if by != "category" and by not in _GROUP_COLUMNS:
+        raise ValueError(f"unknown grouping key: {by!r}")
+    conn = connect_readonly(path)
+    if conn is None or not days:
+        return {}
+    where, params = _day_filter(days)
+    start_s, end_s = _bounds(start, end)
+    with closing(conn):
+        keys = "process, COALESCE(window, '')" if by == "category" else _group_key(conn, by)
+        sql = (
+            f"SELECT {keys}, SUM({_CLIPPED}) FROM intervals "
+            f'WHERE {where} AND process IS NOT NULL AND "end" > :s AND start < :e '
+            f"GROUP BY {keys}"
+        )
+        rows = conn.execute(sql, {"s": start_s, "e": end_s, "host": local_host(), **params}).fetchall()
+    if by == "category":
+        import categories
+
+        cats = categories.get_categorizer().categorize([r[0] for r in rows], [r[1] for r in rows])
+        agg: dict[str, float] = {}
+        for cat, row in zip(cats.tolist(), rows):
+            agg[cat] = agg.get(cat, 0.0) + row[2] / 60.0
+        return agg
+    return {str(key): sec / 60.0 for key, sec in rows}
+
+
+def hour_seconds(day: str, by: str = "process", path: str = DB_FILE) -> dict[str, list[float]]:
+    """某天按键的逐小时秒数 {键: [秒数, ...]}，GROUP BY 键与小时。
+
+    落在同一小时内的区间（绝大多数）直接按 start / 3600 分组；只有跨小时的区间才与小时表连接拆分。
+    24 个桶；结束时间截断到 24:00，与 stats._hour_matrix 相同。
+    """
+    if by not in _GROUP_COLUMNS:
+        raise ValueError(f"unknown grouping key: {by!r}")
+    conn = connect_readonly(path)
+    if conn is None:
+        return {}
+    with closing(conn):
+        keys = _group_key(conn, by)
+        where = f"day = :day AND process IS NOT NULL AND {_END} > start"
+        sql = (
+            "WITH RECURSIVE hours(h) AS (SELECT 0 UNION ALL SELECT h + 1 FROM hours WHERE h + 1 < 24) "
+            "SELECT k, h, SUM(sec) FROM ("
+            f"SELECT {keys} AS k, start / 3600 AS h, {_END} - start AS sec FROM intervals "
+            f"WHERE {where} AND start / 3600 = ({_END} - 1) / 3600 "
+            "UNION ALL "
+            f"SELECT {keys}, h, MIN({_END}, (h + 1) * 3600) - MAX(start, h * 3600) "
+            f"FROM intervals JOIN hours ON start < (h + 1) * 3600 AND {_END} > h * 3600 "
+            f"WHERE {where} AND start / 3600 < ({_END} - 1) / 3600"
+            ") GROUP BY k, h"
+        )
+        rows = conn.execute(sql, {"day": day, "host": local_host()}).fetchall()
+    out: dict[str, list[float]] = {}
+    for key, h, sec in rows:
+        out.setdefault(str(key), [0.0] * 24)[h] = float(sec)
+    return out
+
+
+def day_entry(day: str, path: str = DB_FILE) -> dict:
+    """某天的按进程汇总，格式同 aggcache 条目（totals 与 hours，单位秒）。"""
+    hours = hour_seconds(day, path=path)
+    return {"totals": {p: float(sum(v)) for p, v in hours.items()}, "hours": hours}
+
+
+def load_day(day: str, path: str = DB_FILE):
+    """某天的全部区间，列与日 CSV 相同（时间为整数秒）；库中没有时返回 None。"""
+    import pandas as pd
+
+    conn = connect_readonly(path)
+    if conn is None:
+        return None
+    with closing(conn):
+        host = "host" if _has_host(conn) else "NULL AS host"
+        df = pd.read_sql_query(
+            f'SELECT start AS start_time, "end" AS end_time, process, window, {host} FROM intervals '
+            "WHERE day = ? ORDER BY start, id",
+            conn,
+            params=(day,),
+        )
+    return df if not df.empty else None
+
+
+def import_day(conn: sqlite3.Connection, day: str, src: str) -> int:
+    """把一个日文件（CSV 或 binlog）导入数据库，替换该日已有的记录，返回导入条数。"""
+    import numpy as np
+    import stats
+
+    df = stats.load_dataframe(src)
+    rows = []
+    if df is not None:
+        s, e, valid = stats._interval_arrays(df)
+        valid &= df["process"].notna().to_numpy()
+        def text(col):
+            values = df[col] if col in df.columns else [None] * len(df)
+            return [None if v is None or v != v else str(v) for v in values]
+
+        windows, hosts = text("window"), text("host")
+        idx = np.nonzero(valid)[0]
+        procs = df["process"].astype(str).to_numpy(dtype=object)
+        rows = [(day, int(s[i]), int(e[i]), procs[i], windows[i], hosts[i]) for i in idx.tolist()]
+    size, mtime = _signature(src)
+    with conn:
+        conn.execute("DELETE FROM intervals WHERE day = ?", (day,))
+        conn.executemany(_INSERT_HOST, rows)
+        conn.execute("INSERT OR REPLACE INTO imports (day, size, mtime) VALUES (?, ?, ?)", (day, size, mtime))
+    return len(rows)
+
+
+def import_files(paths: list[str] | None = None, remove: bool = False, path: str = DB_FILE) -> dict[str, int]:
+    """导入日文件（默认 data/ 下的全部日 CSV/binlog），返回 {日期: 条数}。
+
+    remove 时导入成功后删除原文件（二进制日志连同字符串表）。
+    """
+    import binlog
+    import compact
+
+    if paths is None:
+        paths = [existing_day_file(d) for d in compact.raw_days(DATA_DIR, before="9999-12-31")]
+    result = {}
+    with closing(connect(path)) as conn:
+        for src in paths:
+            day = os.path.splitext(os.path.basename(src))[0]
+            result[day] = import_day(conn, day, src)
+            if remove:
+                extra = [binlog.strings_path(src)] if src.endswith(binlog.LOG_EXT) else []
+                for p in [src] + extra:
+                    if os.path.exists(p):
+                        os.remove(p)
+    return result
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="WhatDidIDo — SQLite 存储：导入与查询")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    ip = sub.add_parser("import", help="把日文件导入数据库（默认 data/ 下全部日文件）")
+    ip.add_argument("files", nargs="*", help="要导入的日 CSV/binlog 文件")
+    ip.add_argument("--remove", action="store_true", help="导入后删除原日文件")
+    tp = sub.add_parser("total", help="某进程在日期区间内的总用时")
+    tp.add_argument("process")
+    tp.add_argument("--from", dest="date_from", required=True, help="起始日期 YYYY-MM-DD")
+    tp.add_argument("--to", dest="date_to", required=True, help="结束日期 YYYY-MM-DD")
+    args = p.parse_args(argv)
+
+    if args.cmd == "import":
+        result = import_files(args.files or None, remove=args.remove)
+        print(f"Imported {sum(result.values())} interval(s) from {len(result)} day file(s) into {DB_FILE}")
+        return 0
+
+    conn = connect_readonly(DB_FILE)
+    if conn is None:
+        raise SystemExit(f"No database: {DB_FILE}")
+    with closing(conn):
+        (sec,) = conn.execute(
+            f"SELECT COALESCE(SUM({_END} - start), 0) FROM intervals "
+            f"WHERE process = ? AND day BETWEEN ? AND ? AND {_END} > start",
+            (args.process, args.date_from, args.date_to),
+        ).fetchone()
+    print(f"{args.process} {args.date_from}..{args.date_to}：{sec / 60:.1f} 分钟")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
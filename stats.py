@@ -1,26 +1,28 @@
 import argparse
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 from pandas.errors import EmptyDataError
-from matplotlib import rcParams
 import textwrap
 from typing import Dict, List, Tuple
 
-
-def today_file(date_str: str | None = None):
-    if date_str:
-        name = date_str + ".csv"
-    else:
-        name = datetime.now().strftime("%Y-%m-%d") + ".csv"
-    return os.path.join("data", name)
+import aggcache
+import binlog
+import categories
+import compact
+import sqlstore
+import stream
+# 路径与时间工具在 core 中，此处导入以保留 stats.today_file 等名称；
+# matplotlib 仅在绘图函数内按需导入，纯文本统计不加载 pyplot
+from core import DAY_SECONDS, EPOCH_UNITS, day_range, day_start_epoch, existing_day_file, local_host, time_to_seconds, today_file
 
 
-def time_to_seconds(t):
-    h, m, s = map(int, t.split(":"))
-    return h * 3600 + m * 60 + s
+GROUP_KEYS = ("process", "window", "category", "host")
 
 
 def parse_args():
@@ -28,10 +30,16 @@ def parse_args():
     g = p.add_mutually_exclusive_group()
     g.add_argument("--date", help="分析指定日期 YYYY-MM-DD（默认今天）")
     g.add_argument("--file", help="直接指定 CSV 文件路径")
+    g.add_argument("--from", dest="date_from", help="多日统计：起始日期 YYYY-MM-DD")
+    p.add_argument("--to", dest="date_to", help="多日统计：结束日期 YYYY-MM-DD（默认今天）")
+    p.add_argument("--workers", type=int, default=None, help="多日统计的并行进程数（默认 CPU 核数）")
     p.add_argument("--save", nargs="?", const="assets", default=None, help="保存图到目录（可选：目录路径，默认 assets）")
     p.add_argument("--start", help="起始时间 HH:MM:SS（可选）")
     p.add_argument("--end", help="结束时间 HH:MM:SS（可选）")
     p.add_argument("--pie", action="store_true", help="生成饼形图显示比例（默认柱状图）")
+    p.add_argument("--by", choices=GROUP_KEYS, default="process", help="分组键：process 进程（默认）/ window 窗口标题 / category 规则类别（见 categories.py）/ host 来源主机（见 merge.py）")
+    p.add_argument("--batch", action="store_true", help="配合 --from/--to：逐日批量渲染柱状图与饼图到 --save 目录（无窗口）")
+    p.add_argument("--force", action="store_true", help="批量渲染时忽略已是最新的 PNG，全部重新生成")
     return p.parse_args()
 
 
@@ -44,10 +52,50 @@ def resolve_path(args) -> tuple[str, str]:
         path = today_file(day)
     return path, day
 
+
+def resolve_days(args) -> list[str] | None:
+    """解析 --from/--to；未指定多日区间时返回 None。"""
+    if not args.date_from and not args.date_to:
+        return None
+    if args.date or args.file:
+        raise SystemExit("--to 不能与 --date/--file 同时使用")
+    date_to = args.date_to or datetime.now().strftime("%Y-%m-%d")
+    date_from = args.date_from or date_to
+    return day_range(date_from, date_to)
+
+
 def load_dataframe(path: str) -> pd.DataFrame | None:
     if not os.path.exists(path):
-        print(f"No data file: {path}")
-        return None
+        # CSV 不存在时回退到同名二进制日志
+        alt = os.path.splitext(path)[0] + binlog.LOG_EXT
+        if path.endswith(".csv") and os.path.exists(alt):
+            path = alt
+        else:
+            # 已压缩的日期从月分区读取
+            day = os.path.splitext(os.path.basename(path))[0]
+            archive = compact.archive_dir_for(path)
+            if path.endswith(".csv") and compact.is_compacted(day, archive):
+                df = compact.load_day(day, archive)
+                if df is not None:
+                    return df
+            # 再回退到 SQLite 存储
+            if path.endswith(".csv"):
+                df = sqlstore.load_day(day, sqlstore.db_path_for(path))
+                if df is not None:
+                    return df
+            print(f"No data file: {path}")
+            return None
+
+    if path.endswith(binlog.LOG_EXT):
+        try:
+            df = binlog.load_dataframe(path)
+        except ValueError as e:
+            print(e)
+            return None
+        if df.empty:
+            print(f"No rows to summarize in: {path}")
+            return None
+        return df
 
     try:
         df = pd.read_csv(path, encoding="utf-8")
@@ -59,6 +107,7 @@ def load_dataframe(path: str) -> pd.DataFrame | None:
         print(f"No rows to summarize in: {path}")
         return None
 
+    df = _from_epoch(df, path)
     required = {"start_time", "end_time", "process"}
     missing = required - set(df.columns)
     if missing:
@@ -81,223 +130,678 @@ def load_dataframe(path: str) -> pd.DataFrame | None:
 
     return df
 
-def compute_minutes(df: pd.DataFrame) -> pd.Series:
-    if "duration" not in df.columns:
-        df["duration"] = df.apply(
-            lambda r: time_to_seconds(r["end_time"]) - time_to_seconds(r["start_time"]),
-            axis=1,
+def _from_epoch(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    """纪元时间结构（start_ts/end_ts 或 start_ms/end_ms）换算为距当日零点的整数秒 start_time/end_time。
+
+    时间列由 read_csv 直接解析为 int64；日期取自文件名，否则取首条记录的本地日期。
+    无法解析的值记为 -1。旧的 HH:MM:SS 结构原样返回。
+    """
+    for start_col, unit in EPOCH_UNITS.items():
+        end_col = start_col.replace("start", "end")
+        if start_col in df.columns and end_col in df.columns:
+            break
+    else:
+        return df
+
+    def column(name):
+        col = df[name]
+        if pd.api.types.is_integer_dtype(col.dtype):
+            return col.to_numpy(dtype=np.int64) // unit, np.ones(len(col), dtype=bool)
+        num = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float)
+        ok = np.isfinite(num)
+        return np.where(ok, num, 0).astype(np.int64) // unit, ok
+
+    s, s_ok = column(start_col)
+    e, e_ok = column(end_col)
+    m = re.search(r"\d{4}-\d{2}-\d{2}", os.path.basename(path))
+    if m:
+        base = day_start_epoch(m.group(0))
+    elif s_ok.any():
+        base = day_start_epoch(datetime.fromtimestamp(int(s[s_ok][0])).strftime("%Y-%m-%d"))
+    else:
+        base = 0
+    out = df.drop(columns=[start_col, end_col])
+    out.insert(0, "start_time", np.where(s_ok, s - base, -1))
+    out.insert(1, "end_time", np.where(e_ok, e - base, -1))
+    return out
+
+
+def _seconds_array(values) -> np.ndarray:
+    """将一列 HH:MM:SS 字符串一次性解析为整数秒数组；无法解析的值记为 -1。"""
+    col = pd.Series(values, copy=False)
+    if pd.api.types.is_integer_dtype(col.dtype):
+        # binlog 等格式已是整数秒
+        return col.to_numpy(dtype=np.int64)
+    n = len(col)
+    out = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return out
+
+    # 快速路径：定宽 8 字节 ASCII，直接按字节做数字运算
+    pending = np.ones(n, dtype=bool)
+    try:
+        # 多留 1 字节，超长值不会被截断后误判为合法
+        raw = np.asarray(col.to_numpy(dtype=object), dtype="S9")
+        widths = np.char.str_len(raw)
+        b = raw.view(np.uint8).reshape(n, 9)[:, :8].astype(np.int64) - 48
+        digits = b[:, [0, 1, 3, 4, 6, 7]]
+        ok = (
+            (widths == 8)
+            & (b[:, 2] == 10)  # ":" 的 ASCII 为 58
+            & (b[:, 5] == 10)
+            & ((digits >= 0) & (digits <= 9)).all(axis=1)
         )
+        secs = (b[:, 0] * 10 + b[:, 1]) * 3600 + (b[:, 3] * 10 + b[:, 4]) * 60 + b[:, 6] * 10 + b[:, 7]
+        out[ok] = secs[ok]
+        pending = ~ok
+    except (UnicodeEncodeError, ValueError, TypeError):
+        pass
+
+    # 回退：非定宽（如 9:05:03）或非字符串，按 ":" 拆分后整体转换
+    if pending.any():
+        rest = col[pending].astype(str).str.split(":", expand=True)
+        if rest.shape[1] == 3:
+            nums = rest.apply(pd.to_numeric, errors="coerce")
+            whole = (nums == nums.round()).all(axis=1)
+            secs = (nums[0] * 3600 + nums[1] * 60 + nums[2]).where(whole)
+            out[pending] = secs.fillna(-1).astype(np.int64).to_numpy()
+    return out
+
+
+def _interval_arrays(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (start_s, end_s, valid)：整数秒数组与“两端均可解析”的掩码。
+
+    时间限制在当天 [0, 24:00]（见 core.DAY_SECONDS）：旧格式中跨午夜的记录 end < start
+    计到 24:00 为止，不再被丢弃；晚于 24:00 的端点截断到 24:00。
+    """
+    s = _seconds_array(df["start_time"])
+    e = _seconds_array(df["end_time"])
+    valid = (s >= 0) & (e >= 0)
+    e = np.where(valid & (e < s), DAY_SECONDS, e)
+    return np.minimum(s, DAY_SECONDS), np.minimum(e, DAY_SECONDS), valid
+
+
+def _process_codes(values) -> Tuple[np.ndarray, List[str]]:
+    """按首次出现顺序为 str(process) 编号，返回 (codes, names)。"""
+    codes, uniques = pd.factorize(pd.Series(values, copy=False), use_na_sentinel=False)
+    names = [str(u) for u in uniques]
+    # 不同原始值可能 str 后相同（如 1 与 "1"），再归并一次
+    name_codes, name_uniques = pd.factorize(pd.Index(names, dtype=object))
+    return name_codes[codes], [str(n) for n in name_uniques]
+
+
+def group_by(df: pd.DataFrame, by: str = "process") -> pd.DataFrame:
+    """把分组键写入 process 列（浅拷贝），下游聚合函数无需区分分组方式；by 为 process 时原样返回。"""
+    if by == "process":
+        return df
+    if by == "window":
+        keys = df["window"].fillna("").astype(str) if "window" in df.columns else ""
+    elif by == "category":
+        keys = categories.categorize(df)
+    elif by == "host":
+        # 合并数据带 host 列；没有该列的记录来自本机
+        keys = df["host"].fillna(local_host()).astype(str) if "host" in df.columns else local_host()
+    else:
+        raise ValueError(f"unknown grouping key: {by!r}")
+    out = df.assign(process=keys)
+    return out.drop(columns="duration") if "duration" in out.columns else out
+
+
+def compute_minutes(df: pd.DataFrame, by: str = "process") -> pd.Series:
+    df = group_by(df, by)
+    if "duration" not in df.columns:
+        s, e, valid = _interval_arrays(df)
+        df["duration"] = np.where(valid, e - s, 0)
     summary = df.groupby("process")["duration"].sum().sort_values(ascending=False)
     minutes = summary / 60
     return minutes
 
-def compute_minutes_in_range(df: pd.DataFrame, start: str | None, end: str | None) -> pd.Series:
-    """按给定时间区间裁剪每条记录，仅统计与区间重叠的部分时长（分钟），并按进程聚合。"""
+def compute_minutes_in_range(df: pd.DataFrame, start: str | None, end: str | None, by: str = "process") -> pd.Series:
+    """按给定时间区间裁剪每条记录，仅统计与区间重叠的部分时长（分钟），并按进程（或 by 指定的键）聚合。"""
     if start is None and end is None:
-        return compute_minutes(df)
+        return compute_minutes(df, by)
+    df = group_by(df, by)
 
     start_s = time_to_seconds(start) if start else 0
     end_s = time_to_seconds(end) if end else 24 * 3600
 
-    rows = []
-    for _, r in df.iterrows():
-        s = time_to_seconds(r["start_time"])
-        e = time_to_seconds(r["end_time"])
-        if e < s:
-            continue
-        # 计算与区间 [start_s, end_s] 的重叠部分
-        overlap_s = max(s, start_s)
-        overlap_e = min(e, end_s)
-        if overlap_e > overlap_s:
-            rows.append((r["process"], (overlap_e - overlap_s) / 60.0))
-
-    if not rows:
+    s, e, valid = _interval_arrays(df)
+    valid &= e >= s
+    # 计算与区间 [start_s, end_s] 的重叠部分
+    overlap = np.clip(e, None, end_s) - np.clip(s, start_s, None)
+    keep = valid & (overlap > 0)
+    if not keep.any():
         return pd.Series(dtype=float)
-    agg = {}
-    for proc, mins in rows:
-        agg[proc] = agg.get(proc, 0.0) + mins
-    return pd.Series(agg).sort_values(ascending=False)
 
-def compute_minutes_by_hour(df: pd.DataFrame) -> Dict[str, List[Tuple[int, float]]]:
+    procs = df["process"].to_numpy(dtype=object)[keep]
+    agg = pd.Series(overlap[keep], index=pd.Index(procs, dtype=object))
+    agg = agg.groupby(level=0, sort=False, dropna=False).sum() / 60.0
+    agg.index.name = None
+    return agg.sort_values(ascending=False)
+
+class IntervalIndex:
+    """单日区间的前缀和索引：一次构建，任意 [start, end] 的按进程用时只需二分查找加一次相减。
+
+    每个进程的累计用时 f_p(t)（[0, t] 内的活跃秒数）是分段线性函数，断点为该进程
+    各记录的起止时刻。所有进程的断点以 ``进程编号 * _SPAN + 秒`` 编码到同一有序数组，
+    因此一次 ``np.searchsorted`` 即可同时查询全部进程。
+    """
+
+    _SPAN = 1 << 32
+
+    def __init__(self, df: pd.DataFrame, arrays=None):
+        s, e, valid = arrays if arrays is not None else _interval_arrays(df)
+        valid = valid & (e >= s)
+        codes, uniques = pd.factorize(df["process"].to_numpy(dtype=object)[valid], use_na_sentinel=False)
+        self.processes = list(uniques)
+        s, e = s[valid], e[valid]
+
+        # 起点 +1、终点 -1；同一断点的变化量合并
+        keys = np.concatenate([codes * self._SPAN + s, codes * self._SPAN + e])
+        delta = np.concatenate([np.ones(len(s), dtype=np.int64), -np.ones(len(e), dtype=np.int64)])
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        # 每个进程的变化量之和为 0，故跨进程做全局累加仍然正确
+        self._slope = np.cumsum(np.bincount(inverse, weights=delta, minlength=len(self._keys)).astype(np.int64))
+        gaps = np.diff(self._keys) * self._slope[:-1] if len(self._keys) else np.zeros(0, dtype=np.int64)
+        self._cum = np.concatenate([[0], np.cumsum(gaps)]).astype(np.int64)
+        self._codes = np.arange(len(self.processes), dtype=np.int64)
+
+    def _cumulative(self, t: int) -> np.ndarray:
+        """每个进程在 [0, t] 内的累计秒数（相差一个与 t 无关的基数）。"""
+        q = self._codes * self._SPAN + min(max(int(t), 0), self._SPAN - 1)
+        k = np.searchsorted(self._keys, q, side="right") - 1
+        k = np.clip(k, 0, None)
+        out = self._cum[k] + self._slope[k] * (q - self._keys[k])
+        # 早于第一个断点时累计为 0
+        return np.where(q >= self._keys[0], out, 0)
+
+    def seconds_in_range(self, start_s: int, end_s: int) -> np.ndarray:
+        """[start_s, end_s] 区间内每个进程的秒数（与 self.processes 对齐）。"""
+        if not self.processes or end_s <= start_s:
+            return np.zeros(len(self.processes), dtype=np.int64)
+        return self._cumulative(end_s) - self._cumulative(start_s)
+
+    def minutes_in_range(self, start: str | None, end: str | None) -> pd.Series:
+        """与 compute_minutes_in_range 相同的区间裁剪语义；未指定端点按全天处理。"""
+        start_s = time_to_seconds(start) if start else 0
+        end_s = time_to_seconds(end) if end else 24 * 3600
+        secs = self.seconds_in_range(start_s, end_s)
+        keep = secs > 0
+        if not keep.any():
+            return pd.Series(dtype=float)
+        procs = pd.Index(self.processes, dtype=object)[keep]
+        return pd.Series(secs[keep] / 60.0, index=procs).sort_values(ascending=False)
+
+    def sliding_minutes(self, window_s: int, step_s: int, start_s: int = 0, end_s: int = 24 * 3600) -> pd.DataFrame:
+        """滑动窗口用时矩阵（行：窗口起点秒，列：进程，值：分钟）。"""
+        starts = np.arange(start_s, max(start_s, end_s - window_s) + 1, step_s)
+        rows = [self.seconds_in_range(int(t), int(t) + window_s) / 60.0 for t in starts]
+        return pd.DataFrame(rows, index=starts, columns=pd.Index(self.processes, dtype=object))
+
+
+def compute_minutes_for_ranges(
+    df: pd.DataFrame,
+    ranges: Dict[str, Tuple[str | None, str | None]],
+) -> Dict[str, pd.Series]:
+    """一次构建 IntervalIndex，计算多个时间段各自的按进程用时。"""
+    index = IntervalIndex(df)
+    return {label: index.minutes_in_range(start, end) for label, (start, end) in ranges.items()}
+
+
+def _hour_seconds(
+    df: pd.DataFrame,
+    arrays=None,
+    start_s: int | None = None,
+    end_s: int | None = None,
+) -> Tuple[List[str], np.ndarray]:
+    """按小时拆分每条记录，返回 (进程名列表, 秒数矩阵[进程, 小时])。
+
+    给定 start_s/end_s 时先将记录裁剪到该区间；arrays 为已解析的 _interval_arrays 结果。
+    """
+    s, e, valid = arrays if arrays is not None else _interval_arrays(df)
+    # 容错：若时间倒序或无法解析，跳过
+    valid = valid & (e >= s)
+    if start_s is not None or end_s is not None:
+        if start_s is not None:
+            s = np.maximum(s, start_s)
+        if end_s is not None:
+            e = np.minimum(e, end_s)
+        valid &= e > s
+    if not valid.any():
+        return [], np.zeros((0, 24))
+    return _hour_matrix(s[valid], e[valid], df["process"].to_numpy(dtype=object)[valid])
+
+
+def _hour_matrix(s: np.ndarray, e: np.ndarray, procs) -> Tuple[List[str], np.ndarray]:
+    """已筛选的有效区间（在 [0, 24:00] 内，见 _interval_arrays）按小时拆分，返回 (进程名列表, 秒数矩阵[进程, 24])。"""
+    if not len(s):
+        return [], np.zeros((0, 24))
+    codes, names = _process_codes(procs)
+
+    # 将区间拆分到每个小时边界（以本地当天 0 点为起点）：
+    # 每条记录跨越 first..last 小时，展开为逐小时的片段后一次性累加
+    first = s // 3600
+    last = np.where(e > s, (e - 1) // 3600, first - 1)
+    spans = last - first + 1
+    row = np.repeat(np.arange(len(s)), spans)
+    offset = np.arange(len(row)) - np.repeat(np.cumsum(spans) - spans, spans)
+    hour = first[row] + offset
+    seg = np.minimum(e[row], (hour + 1) * 3600) - np.maximum(s[row], hour * 3600)
+
+    n_hours = 24
+    matrix = np.bincount(
+        codes[row] * n_hours + hour,
+        weights=seg,
+        minlength=len(names) * n_hours,
+    ).reshape(len(names), n_hours)
+    return names, matrix
+
+
+def compute_minutes_by_hour(df: pd.DataFrame, by: str = "process") -> Dict[str, List[Tuple[int, float]]]:
     """按小时聚合每个进程的用时（分钟）。返回 {process: [(hour, minutes), ...]}。
     小时取 start_time 所在小时，以记录跨度拆分到跨越的各小时桶。
     """
-    # 先确保有 duration
-    if "duration" not in df.columns:
-        df["duration"] = df.apply(
-            lambda r: time_to_seconds(r["end_time"]) - time_to_seconds(r["start_time"]),
-            axis=1,
-        )
+    names, matrix = _hour_seconds(group_by(df, by))
+    totals = matrix / 60.0
 
-    buckets: Dict[str, Dict[int, float]] = {}
-    for _, row in df.iterrows():
-        start_s = time_to_seconds(row["start_time"])  # 秒
-        end_s = time_to_seconds(row["end_time"])      # 秒
-        proc = str(row["process"])
-        if end_s < start_s:
-            # 容错：若时间倒序，跳过
-            continue
-        if proc not in buckets:
-            buckets[proc] = {}
-
-        # 将区间拆分到每个小时边界（以本地当天 0 点为起点）
-        cur = start_s
-        while cur < end_s:
-            hour_start = (cur // 3600) * 3600
-            hour_end = hour_start + 3600
-            seg_end = min(end_s, hour_end)
-            seg_minutes = (seg_end - cur) / 60.0
-            hour = int(hour_start // 3600)
-            buckets[proc][hour] = buckets[proc].get(hour, 0.0) + seg_minutes
-            cur = seg_end
-
-    # 排序并转换为列表
+    # 排序并转换为列表；过滤掉接近 0 的值
     result: Dict[str, List[Tuple[int, float]]] = {}
-    for proc, hm in buckets.items():
-        # 过滤掉接近 0 的值并按小时排序
-        items = [(h, m) for h, m in sorted(hm.items()) if m > 0.01]
-        result[proc] = items
+    for code, proc in enumerate(names):
+        hours = np.nonzero(totals[code] > 0.01)[0]
+        result[proc] = [(int(h), float(totals[code, h])) for h in hours]
     return result
 
-def plot_minutes(
-    minutes: pd.Series,
-    day: str,
-    save_dir: str | None = None,
-    show: bool = True,
-    block: bool = True,
-) -> str | None:
-    if minutes.empty:
-        print("No durations to plot.")
-        return None
+def _partial_minutes(path: str, start: str | None, end: str | None, by: str = "process") -> Dict[str, float]:
+    """进程池任务：流式读取单个日文件并聚合为 {process: minutes}，不构建完整 DataFrame。"""
+    agg = stream.Totals()
+    if start or end:
+        start_s = time_to_seconds(start) if start else 0
+        end_s = time_to_seconds(end) if end else 24 * 3600
+        stream.aggregate(path, stream.Clip(agg, start_s, end_s), by)
+    else:
+        stream.aggregate(path, agg, by)
+    return {k: sec / 60.0 for k, sec in agg.result().items()}
 
-    # 应用名友好映射与自动换行
-    friendly_map = {
-        # 浏览器与通用
-        "Code.exe": "Visual Studio Code",
-        "chrome.exe": "Google Chrome",
-        "msedge.exe": "Microsoft Edge",
-        "firefox.exe": "Mozilla Firefox",
-        "explorer.exe": "文件资源管理器",
-        "notepad.exe": "记事本",
-        "cmd.exe": "命令提示符",
-        "powershell.exe": "Windows PowerShell",
-        "WindowsTerminal.exe": "Windows Terminal",
-        "python.exe": "Python",
-        "git.exe": "Git",
-
-        # Office 与效率
-        "WINWORD.EXE": "Microsoft Word",
-        "EXCEL.EXE": "Microsoft Excel",
-        "POWERPNT.EXE": "Microsoft PowerPoint",
-        "OUTLOOK.EXE": "Microsoft Outlook",
-        "notion.exe": "Notion",
-        "obsidian.exe": "Obsidian",
-        "Typora.exe": "Typora",
-
-        # 即时通信与协作
-        "WeChat.exe": "微信",
-        "QQ.exe": "QQ",
-        "TIM.exe": "TIM",
-        "DingTalk.exe": "钉钉",
-        "WeCom.exe": "企业微信",
-        "slack.exe": "Slack",
-        "Teams.exe": "Microsoft Teams",
-
-        # 开发工具
-        "idea64.exe": "IntelliJ IDEA",
-        "pycharm64.exe": "PyCharm",
-        "clion64.exe": "CLion",
-        "rider64.exe": "Rider",
-        "devenv.exe": "Visual Studio",
-
-        # 设计与多媒体
-        "Photoshop.exe": "Adobe Photoshop",
-        "Illustrator.exe": "Adobe Illustrator",
-        "AfterFX.exe": "Adobe After Effects",
-        "Premiere.exe": "Adobe Premiere Pro",
-        "Audition.exe": "Adobe Audition",
-        "blender.exe": "Blender",
-        "vlc.exe": "VLC",
-        "potplayer.exe": "PotPlayer",
-        "mpv.exe": "MPV",
-        "AppleMusic.exe":"Apple Music",
-        "Xmind.exe":"Xmind",
-
-        # 游戏与平台
-        "steam.exe": "Steam",
-        "Battle.net.exe": "Battle.net",
-        "RiotClientServices.exe": "Riot 客户端",
-        "LeagueClient.exe": "英雄联盟",
-        "wegame.exe":"Wegame",
-
-        # 远程与邮件
-        "mstsc.exe": "远程桌面",
-        "thunderbird.exe": "Thunderbird",
-
-        # 版本控制与客户端
-        "GitHubDesktop.exe": "GitHub Desktop",
-        "SourceTree.exe": "Sourcetree",
-        "Fork.exe": "Fork",
-
-        # 压缩与文件
-        "7zFM.exe": "7-Zip",
-        "WinRAR.exe": "WinRAR",
-
-        # 系统与服务
-        "explorer.exe": "Windows 桌面/文件管理器",
-        "svchost.exe": "系统服务宿主",
-        "services.exe": "服务管理器",
-        "lsass.exe": "本地安全机构",
-        "winlogon.exe": "登录管理",
-        "csrss.exe": "客户端/服务器运行时",
-        "taskmgr.exe": "任务管理器",
-        "System": "内核进程",
-
-        # 安全与云盘等国产软件
-        "360safe.exe": "360 安全卫士",
-        "ZhuDongFangYu.exe": "360 主动防御",
-        "360tray.exe": "360 托盘",
-        "baidunetdisk.exe": "百度网盘",
-        "AliyunDrive.exe": "阿里云盘",
-        "Tencentdl.exe": "腾讯下载器",
-        "Thunder.exe": "迅雷",
-        "wpscloudsvr.exe": "WPS 云服务",
-        "HuorongTray.exe": "火绒托盘",
-        "HuorongDaemon.exe": "火绒后台",
-
-        # 多媒体与直播
-        "vlc.exe": "VLC 播放器",
-        "potplayer.exe": "PotPlayer",
-        "QQMusic.exe": "QQ 音乐",
-        "cloudmusic.exe": "网易云音乐",
-        "iTunes.exe": "iTunes",
-        "obs64.exe": "OBS Studio",
-
-        # 游戏平台
-        "steam.exe": "Steam",
-        "EpicGamesLauncher.exe": "Epic 游戏平台",
-
-        #工具
-        "clash-verge.exe":"Clash Verge"
+
+def _cache_entry(path: str, df: pd.DataFrame | None, arrays=None) -> dict:
+    """由已加载的 DataFrame 生成 aggcache 条目（全天总计与小时桶，单位秒）。"""
+    size, mtime = aggcache.file_signature(path) or (0, 0)
+    entry = {"size": size, "mtime": mtime, "totals": {}, "hours": {}}
+    if df is None:
+        return entry
+    entry["totals"] = {str(p): float(m * 60) for p, m in compute_minutes(df).items()}
+    names, matrix = _hour_seconds(df, arrays)
+    entry["hours"] = {proc: matrix[i].tolist() for i, proc in enumerate(names)}
+    return entry
+
+
+def _build_cache_entry(path: str) -> dict:
+    """进程池任务：流式读取单个日文件生成 aggcache 条目（与 _cache_entry 结果相同）。"""
+    size, mtime = aggcache.file_signature(path) or (0, 0)
+    totals, hours = stream.Totals(), stream.HourBuckets()
+    stream.aggregate(path, stream.Fanout(totals, hours))
+    return {
+        "size": size,
+        "mtime": mtime,
+        "totals": {p: float(sec) for p, sec in totals.result().items()},
+        "hours": hours.result(),
     }
 
-    def format_label(name: str, width: int = 14) -> str:
-        label = friendly_map.get(str(name), str(name))
-        return "\n".join(textwrap.wrap(label, width=width, break_long_words=True))
 
-    # 原始索引保留用于悬停映射
-    original_index = list(minutes.index)
-    minutes.index = [format_label(x) for x in original_index]
+def _map_files(func, paths: List[str], workers: int | None) -> list:
+    """在进程池中对每个文件执行 func；单文件或单进程时直接在本进程执行。"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(paths)))
+    if workers == 1:
+        return [func(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+def compute_minutes_for_days(
+    days: List[str],
+    start: str | None = None,
+    end: str | None = None,
+    workers: int | None = None,
+    use_cache: bool = True,
+    by: str = "process",
+) -> pd.Series:
+    """跨多日按进程（或 by 指定的键）聚合用时（分钟）。每个日文件在进程池中独立加载并部分聚合，最后合并。
+
+    按进程分组时，全天或整点区间优先由 aggcache 旁路缓存提供，仅对缺失/过期的日文件重新解析；
+    已压缩进月分区的日期由 compact 汇总表提供；SQLite 库中已有（且不比日文件旧）的日期
+    合并为一次 SQL 聚合查询。
+    """
+    in_db = sqlstore.covered_days(days)
+    paths, archived = [], []
+    for d in days:
+        if d in in_db:
+            continue
+        p = existing_day_file(d)
+        if p:
+            paths.append(p)
+        elif compact.is_compacted(d):
+            archived.append(d)
+    if not paths and not archived and not in_db:
+        return pd.Series(dtype=float)
+
+    if not paths:
+        partials = []
+    elif use_cache and by == "process" and aggcache.hour_aligned(start, end):
+        cache = aggcache.AggCache()
+        entries = {p: cache.get(p) for p in paths}
+        stale = [p for p, entry in entries.items() if entry is None]
+        for p, entry in zip(stale, _map_files(_build_cache_entry, stale, workers)):
+            cache.put(p, entry)
+            entries[p] = entry
+        cache.save()
+        partials = [aggcache.minutes_in_range(entries[p], start, end) for p in paths]
+    else:
+        partials = _map_files(partial(_partial_minutes, start=start, end=end, by=by), paths, workers)
+    if archived:
+        partials.extend(compact.minutes_for_days(archived, start, end, by=by))
+    if in_db:
+        partials.append(sqlstore.minutes_for_days(sorted(in_db), start, end, by=by))
+
+    agg: Dict[str, float] = {}
+    for part in partials:
+        for proc, mins in part.items():
+            agg[proc] = agg.get(proc, 0.0) + mins
+    if not agg:
+        return pd.Series(dtype=float)
+    return pd.Series(agg).sort_values(ascending=False)
+
+
+def day_source(day: str, path: str | None = None) -> str | None:
+    """某天数据所在的文件：日 CSV / binlog、已压缩日期的月汇总表或 SQLite 库；没有数据时返回 None。
+
+    顺序与 load_dataframe / DaySession 相同；path 为该天的日文件路径（默认在 data/ 下查找）。
+    """
+    path = path or existing_day_file(day) or today_file(day)
+    if os.path.exists(path):
+        return path
+    if not path.endswith(".csv"):
+        return None
+    alt = os.path.splitext(path)[0] + binlog.LOG_EXT
+    if os.path.exists(alt):
+        return alt
+    archive = compact.archive_dir_for(path)
+    if compact.is_compacted(day, archive):
+        return compact.rollup_path(day[:7], archive)
+    db = sqlstore.db_path_for(path)
+    return db if day in sqlstore.covered_days([day], db) else None
+
 
+class DaySession:
+    """单日分析会话：数据文件至多解析一次，柱状图、饼图与悬停提示共用同一份结果。
+
+    总计、区间用时与小时分布按需计算并缓存；全天或整点区间优先取自 aggcache，
+    此时完全不解析数据文件。
+    """
+
+    def __init__(
+        self,
+        day: str,
+        start: str | None = None,
+        end: str | None = None,
+        path: str | None = None,
+        use_cache: bool = True,
+        by: str = "process",
+    ):
+        self.day = day
+        self.start = start
+        self.end = end
+        self.path = path or existing_day_file(day) or today_file(day)
+        self.use_cache = use_cache
+        self.by = by
+        self._df = None
+        self._loaded = False
+        self._arrays = None
+        self._index = None
+        self._entry = None
+        self._ranges: Dict[Tuple[str | None, str | None], pd.Series] = {}
+        self._hours = None
+
+    @property
+    def df(self) -> pd.DataFrame | None:
+        if not self._loaded:
+            df = load_dataframe(self.path)
+            self._df = group_by(df, self.by) if df is not None else None
+            self._loaded = True
+        return self._df
+
+    @property
+    def loaded(self) -> bool:
+        """数据文件是否已经解析（由缓存或汇总表回答时为 False）。"""
+        return self._loaded
+
+    @property
+    def arrays(self):
+        if self._arrays is None and self.df is not None:
+            self._arrays = _interval_arrays(self.df)
+        return self._arrays
+
+    @property
+    def index(self) -> IntervalIndex | None:
+        if self._index is None and self.df is not None:
+            self._index = IntervalIndex(self.df, self.arrays)
+        return self._index
+
+    def _cached_entry(self) -> dict | None:
+        """当前文件的 aggcache 条目；缺失或过期时由本会话的 DataFrame 重建。
+
+        日文件已压缩时直接使用月汇总表中的条目，日期在 SQLite 库中时由 SQL 聚合得到。
+        缓存按进程聚合，其他分组键不使用。
+        """
+        if self.by != "process":
+            return None
+        if self._entry is None and not os.path.exists(self.path):
+            src = day_source(self.day, self.path)
+            if src is not None and src.endswith(compact.ROLLUP_EXT):
+                self._entry = compact.rollup_entry(self.day, compact.archive_dir_for(self.path))
+            elif src is not None and src == sqlstore.db_path_for(self.path):
+                self._entry = sqlstore.day_entry(self.day, src)
+        if self._entry is None and self.use_cache and os.path.exists(self.path):
+            cache = aggcache.AggCache()
+            entry = cache.get(self.path)
+            if entry is None and self._loaded:
+                entry = _cache_entry(self.path, self.df, self.arrays)
+            elif entry is None:
+                # 尚未加载 DataFrame：流式聚合即可，不必读入整份文件
+                entry = _build_cache_entry(self.path)
+                cache.put(self.path, entry)
+            cache.save()
+            self._entry = entry
+        return self._entry
+
+    def minutes(self) -> pd.Series:
+        """会话区间内按进程用时（分钟，降序）。"""
+        return self.minutes_in_range(self.start, self.end)
+
+    def minutes_in_range(self, start: str | None, end: str | None) -> pd.Series:
+        """任意区间的按进程用时，语义同 compute_minutes_in_range；结果按区间缓存。"""
+        key = (start or None, end or None)
+        if key not in self._ranges:
+            entry = self._cached_entry() if aggcache.hour_aligned(start, end) else None
+            if entry is not None:
+                agg = aggcache.minutes_in_range(entry, start, end)
+                result = pd.Series(agg, dtype=float).sort_values(ascending=False)
+            elif self.df is None:
+                result = pd.Series(dtype=float)
+            elif not start and not end:
+                result = compute_minutes(self.df)
+            else:
+                result = self.index.minutes_in_range(start, end)
+            self._ranges[key] = result
+        return self._ranges[key]
+
+    def hours(self) -> Dict[str, List[Tuple[int, float]]]:
+        """会话区间内每个进程的逐小时用时，格式同 compute_minutes_by_hour。"""
+        if self._hours is not None:
+            return self._hours
+        start_s = time_to_seconds(self.start) if self.start else None
+        end_s = time_to_seconds(self.end) if self.end else None
+        entry = self._cached_entry() if aggcache.hour_aligned(self.start, self.end) else None
+        if entry is not None:
+            names = list(entry["hours"])
+            # 早期的压缩汇总可能含 24 点之后的桶，按当天 [0, 24:00] 截断
+            matrix = np.array([entry["hours"][p] for p in names], dtype=float).reshape(len(names), -1)[:, :24]
+            h0 = start_s // 3600 if start_s is not None else 0
+            h1 = end_s // 3600 if end_s is not None else matrix.shape[1]
+            matrix[:, :h0] = 0
+            matrix[:, h1:] = 0
+        elif self.df is not None:
+            names, matrix = _hour_seconds(self.df, self.arrays, start_s, end_s)
+        else:
+            names, matrix = [], np.zeros((0, 24))
+
+        totals = matrix / 60.0
+        result: Dict[str, List[Tuple[int, float]]] = {}
+        for code, proc in enumerate(names):
+            hours = np.nonzero(totals[code] > 0.01)[0]
+            if len(hours):
+                result[proc] = [(int(h), float(totals[code, h])) for h in hours]
+        self._hours = result
+        return result
+
+
+# 应用名友好映射与自动换行
+FRIENDLY_NAMES = {
+    # 浏览器与通用
+    "Code.exe": "Visual Studio Code",
+    "chrome.exe": "Google Chrome",
+    "msedge.exe": "Microsoft Edge",
+    "firefox.exe": "Mozilla Firefox",
+    "explorer.exe": "文件资源管理器",
+    "notepad.exe": "记事本",
+    "cmd.exe": "命令提示符",
+    "powershell.exe": "Windows PowerShell",
+    "WindowsTerminal.exe": "Windows Terminal",
+    "python.exe": "Python",
+    "git.exe": "Git",
+
+    # Office 与效率
+    "WINWORD.EXE": "Microsoft Word",
+    "EXCEL.EXE": "Microsoft Excel",
+    "POWERPNT.EXE": "Microsoft PowerPoint",
+    "OUTLOOK.EXE": "Microsoft Outlook",
+    "notion.exe": "Notion",
+    "obsidian.exe": "Obsidian",
+    "Typora.exe": "Typora",
+
+    # 即时通信与协作
+    "WeChat.exe": "微信",
+    "QQ.exe": "QQ",
+    "TIM.exe": "TIM",
+    "DingTalk.exe": "钉钉",
+    "WeCom.exe": "企业微信",
+    "slack.exe": "Slack",
+    "Teams.exe": "Microsoft Teams",
+
+    # 开发工具
+    "idea64.exe": "IntelliJ IDEA",
+    "pycharm64.exe": "PyCharm",
+    "clion64.exe": "CLion",
+    "rider64.exe": "Rider",
+    "devenv.exe": "Visual Studio",
+
+    # 设计与多媒体
+    "Photoshop.exe": "Adobe Photoshop",
+    "Illustrator.exe": "Adobe Illustrator",
+    "AfterFX.exe": "Adobe After Effects",
+    "Premiere.exe": "Adobe Premiere Pro",
+    "Audition.exe": "Adobe Audition",
+    "blender.exe": "Blender",
+    "vlc.exe": "VLC",
+    "potplayer.exe": "PotPlayer",
+    "mpv.exe": "MPV",
+    "AppleMusic.exe":"Apple Music",
+    "Xmind.exe":"Xmind",
+
+    # 游戏与平台
+    "steam.exe": "Steam",
+    "Battle.net.exe": "Battle.net",
+    "RiotClientServices.exe": "Riot 客户端",
+    "LeagueClient.exe": "英雄联盟",
+    "wegame.exe":"Wegame",
+
+    # 远程与邮件
+    "mstsc.exe": "远程桌面",
+    "thunderbird.exe": "Thunderbird",
+
+    # 版本控制与客户端
+    "GitHubDesktop.exe": "GitHub Desktop",
+    "SourceTree.exe": "Sourcetree",
+    "Fork.exe": "Fork",
+
+    # 压缩与文件
+    "7zFM.exe": "7-Zip",
+    "WinRAR.exe": "WinRAR",
+
+    # 系统与服务
+    "explorer.exe": "Windows 桌面/文件管理器",
+    "svchost.exe": "系统服务宿主",
+    "services.exe": "服务管理器",
+    "lsass.exe": "本地安全机构",
+    "winlogon.exe": "登录管理",
+    "csrss.exe": "客户端/服务器运行时",
+    "taskmgr.exe": "任务管理器",
+    "System": "内核进程",
+
+    # 安全与云盘等国产软件
+    "360safe.exe": "360 安全卫士",
+    "ZhuDongFangYu.exe": "360 主动防御",
+    "360tray.exe": "360 托盘",
+    "baidunetdisk.exe": "百度网盘",
+    "AliyunDrive.exe": "阿里云盘",
+    "Tencentdl.exe": "腾讯下载器",
+    "Thunder.exe": "迅雷",
+    "wpscloudsvr.exe": "WPS 云服务",
+    "HuorongTray.exe": "火绒托盘",
+    "HuorongDaemon.exe": "火绒后台",
+
+    # 多媒体与直播
+    "vlc.exe": "VLC 播放器",
+    "potplayer.exe": "PotPlayer",
+    "QQMusic.exe": "QQ 音乐",
+    "cloudmusic.exe": "网易云音乐",
+    "iTunes.exe": "iTunes",
+    "obs64.exe": "OBS Studio",
+
+    # 游戏平台
+    "steam.exe": "Steam",
+    "EpicGamesLauncher.exe": "Epic 游戏平台",
+
+    #工具
+    "clash-verge.exe":"Clash Verge"
+}
+
+
+
+def format_label(name: str, width: int = 14) -> str:
+    label = FRIENDLY_NAMES.get(str(name), str(name))
+    return "\n".join(textwrap.wrap(label, width=width, break_long_words=True))
+
+
+def _setup_fonts():
     # 设置中文字体与美化样式
     try:
+        from matplotlib import rcParams
+
         rcParams["font.sans-serif"] = ["Microsoft YaHei", "SimHei", "Segoe UI", "Arial"]
         rcParams["axes.unicode_minus"] = False
     except Exception:
         pass
 
-    plt.figure(figsize=(10, 6))
-    ax = minutes.plot(kind="bar", color="#4C9EEB")
+
+def draw_minutes(ax, minutes: pd.Series, day: str) -> List[str]:
+    """在给定 Axes 上绘制柱状图，返回各柱的显示标签。不依赖 pyplot 全局状态。"""
+    labels = [format_label(x) for x in minutes.index]
+    x = np.arange(len(labels))
+    ax.bar(x, minutes.to_numpy(dtype=float), width=0.5, color="#4C9EEB")
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels)
     ax.grid(axis="y", linestyle="--", alpha=0.3)
     ax.set_xlabel("应用")
     ax.set_ylabel("分钟")
@@ -305,21 +809,60 @@ def plot_minutes(
     ax.tick_params(axis="x", labelrotation=30)
     for tick in ax.get_xticklabels():
         tick.set_horizontalalignment("right")
-    plt.tight_layout()
+    return labels
+
+
+def draw_pie(ax, minutes: pd.Series, day: str):
+    """在给定 Axes 上绘制饼图。不依赖 pyplot 全局状态。"""
+    result = ax.pie(
+        list(minutes.values),
+        labels=list(minutes.index),
+        autopct=lambda p: f"{p:.1f}%",
+        startangle=90,
+        counterclock=False,
+        wedgeprops={"linewidth": 1, "edgecolor": "white"},
+        textprops={"fontsize": 10},
+    )
+    ax.set_title(f"应用使用比例 — {day}")
+    return result
+
+
+def plot_minutes(
+    minutes: "pd.Series | DaySession",
+    day: str | None = None,
+    save_dir: str | None = None,
+    show: bool = True,
+    block: bool = True,
+) -> str | None:
+    """绘制柱状图。传入 DaySession 时悬停提示显示同一区间的小时分布（不再重新读文件）。"""
+    session = minutes if isinstance(minutes, DaySession) else None
+    if session is not None:
+        minutes = session.minutes()
+        day = day or session.day
+    if minutes.empty:
+        print("No durations to plot.")
+        return None
+
+    import matplotlib.pyplot as plt
+
+    # 原始索引保留用于悬停映射
+    original_index = list(minutes.index)
+
+    _setup_fonts()
+    fig = plt.figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    labels = draw_minutes(ax, minutes, day)
+    fig.tight_layout()
 
     # 悬停提示：显示该应用在各小时的用时分布
     hover_annotation = None
     try:
-        # 为悬停显示准备映射（使用原始进程名）
-        # 需要原始 DataFrame 来计算小时分布；尝试从调用方上下文获取最近加载的数据不现实
-        # 因此这里通过读取当天文件再计算（与主流程一致）。
-        df_path = today_file(day)
-        df_hover = load_dataframe(df_path)
-        per_hour = compute_minutes_by_hour(df_hover) if df_hover is not None else {}
+        # 小时分布来自与柱状图同一会话、同一区间的数据；仅传入 Series 时无分布可显示
+        per_hour = session.hours() if session is not None else {}
 
         # 进程名映射到友好标签后的文本，建立从绘图标签到原进程名的反向映射
         label_to_proc = {}
-        for orig, lbl in zip(original_index, minutes.index):
+        for orig, lbl in zip(original_index, labels):
             label_to_proc[str(lbl)] = str(orig)
 
         def format_hours(proc: str) -> str:
@@ -339,7 +882,7 @@ def plot_minutes(
                     ax.figure.canvas.draw_idle()
                 return
             # 命中测试：找到靠近鼠标的柱子
-            for rect, lbl in zip(ax.patches, minutes.index):
+            for rect, lbl in zip(ax.patches, labels):
                 contains, _ = rect.contains(event)
                 if contains:
                     proc = label_to_proc.get(str(lbl), str(lbl))
@@ -377,7 +920,7 @@ def plot_minutes(
         out_dir = save_dir if save_dir else "assets"
         os.makedirs(out_dir, exist_ok=True)
         saved_path = os.path.join(out_dir, f"{day}.png")
-        plt.savefig(saved_path, dpi=220, bbox_inches="tight")
+        fig.savefig(saved_path, dpi=220, bbox_inches="tight")
         print(f"Saved figure: {saved_path}")
 
     if show:
@@ -392,47 +935,38 @@ def plot_minutes(
                 plt.pause(0.001)
             except Exception:
                 pass
+    else:
+        # 仅保存时立即释放，避免 GUI 中反复保存累积 pyplot 图形
+        plt.close(fig)
     return saved_path
 
 def plot_pie(
-    minutes: pd.Series,
-    day: str,
+    minutes: "pd.Series | DaySession",
+    day: str | None = None,
     save_dir: str | None = None,
     show: bool = True,
     block: bool = True,
 ) -> str | None:
+    if isinstance(minutes, DaySession):
+        day = day or minutes.day
+        minutes = minutes.minutes()
     if minutes.empty:
         print("No durations to plot.")
         return None
 
-    # 字体设置
-    try:
-        rcParams["font.sans-serif"] = ["Microsoft YaHei", "SimHei", "Segoe UI", "Arial"]
-        rcParams["axes.unicode_minus"] = False
-    except Exception:
-        pass
+    import matplotlib.pyplot as plt
 
-    labels = list(minutes.index)
-    values = list(minutes.values)
-    plt.figure(figsize=(8, 8))
-    patches, texts, autotexts = plt.pie(
-        values,
-        labels=labels,
-        autopct=lambda p: f"{p:.1f}%",
-        startangle=90,
-        counterclock=False,
-        wedgeprops={"linewidth": 1, "edgecolor": "white"},
-        textprops={"fontsize": 10},
-    )
-    plt.title(f"应用使用比例 — {day}")
-    plt.tight_layout()
+    _setup_fonts()
+    fig = plt.figure(figsize=(8, 8))
+    draw_pie(fig.add_subplot(), minutes, day)
+    fig.tight_layout()
 
     saved_path = None
     if save_dir is not None:
         out_dir = save_dir if save_dir else "assets"
         os.makedirs(out_dir, exist_ok=True)
         saved_path = os.path.join(out_dir, f"{day}_pie.png")
-        plt.savefig(saved_path, dpi=220, bbox_inches="tight")
+        fig.savefig(saved_path, dpi=220, bbox_inches="tight")
         print(f"Saved pie: {saved_path}")
 
     if show:
@@ -445,29 +979,129 @@ def plot_pie(
                 plt.pause(0.001)
             except Exception:
                 pass
+    else:
+        plt.close(fig)
     return saved_path
 
 
+def save_chart(minutes: pd.Series, day: str, out_dir: str, kind: str = "bar") -> str:
+    """在 Agg 画布上渲染并保存柱状图（kind="bar"）或饼图（kind="pie"），返回文件路径。
+
+    不经过 pyplot，可在工作线程或子进程中调用；文件名与 plot_minutes/plot_pie 保存的一致。
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    _setup_fonts()
+    os.makedirs(out_dir, exist_ok=True)
+    fig = Figure(figsize=(10, 6) if kind == "bar" else (8, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if kind == "bar":
+        draw_minutes(ax, minutes, day)
+        path = os.path.join(out_dir, f"{day}.png")
+    else:
+        draw_pie(ax, minutes, day)
+        path = os.path.join(out_dir, f"{day}_pie.png")
+    fig.tight_layout()
+    fig.savefig(path, dpi=220, bbox_inches="tight")
+    return path
+
+
+def _render_day(day: str, out_dir: str, force: bool = False) -> List[str]:
+    """进程池任务：在 Agg 画布上渲染单日柱状图与饼图，不经过 pyplot。
+
+    PNG 已比数据文件新时跳过（已压缩或存入 SQLite 的日期比较汇总表或数据库的修改时间）；
+    返回本次写出的文件列表。
+    """
+    src = day_source(day)
+    if src is None:
+        return []
+    src_mtime = os.path.getmtime(src)
+    targets = {
+        "bar": os.path.join(out_dir, f"{day}.png"),
+        "pie": os.path.join(out_dir, f"{day}_pie.png"),
+    }
+    todo = {
+        kind: path
+        for kind, path in targets.items()
+        if force or not (os.path.exists(path) and os.path.getmtime(path) >= src_mtime)
+    }
+    if not todo:
+        return []
+    minutes = DaySession(day, use_cache=False).minutes()
+    if minutes.empty:
+        return []
+    return [save_chart(minutes, day, out_dir, kind) for kind in todo]
+
+
+def render_batch(days: List[str], out_dir: str = "assets", workers: int | None = None, force: bool = False) -> int:
+    """批量渲染日期范围内每天的柱状图与饼图（进程池并行），返回写出的文件数。"""
+    days = [d for d in days if day_source(d)]
+    if not days:
+        print("No data files in range.")
+        return 0
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(days)))
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_render_day, d, out_dir, force): d for d in days}
+        for i, fut in enumerate(as_completed(futures), 1):
+            day = futures[fut]
+            try:
+                paths = fut.result()
+            except Exception as e:
+                print(f"[{i}/{len(days)}] {day} failed: {e}")
+                continue
+            written += len(paths)
+            print(f"[{i}/{len(days)}] {day} " + ("rendered" if paths else "up to date"))
+    print(f"Rendered {written} file(s) into {out_dir}")
+    return written
+
+
 def main():
     args = parse_args()
-    path, day = resolve_path(args)
+    days = resolve_days(args)
 
-    df = load_dataframe(path)
-    if df is None:
+    if args.batch:
+        if days is None:
+            days = [resolve_path(args)[1]]
+        render_batch(days, args.save or "assets", workers=args.workers, force=args.force)
         return 0
 
-    minutes = compute_minutes_in_range(df, args.start, args.end)
+    if days is not None:
+        day = days[0] if len(days) == 1 else f"{days[0]}_{days[-1]}"
+        minutes = compute_minutes_for_days(days, args.start, args.end, workers=args.workers, by=args.by)
+        if minutes.empty:
+            print(f"No data in {days[0]} ~ {days[-1]}")
+            return 0
+    else:
+        path, day = resolve_path(args)
+        session = DaySession(day, args.start, args.end, path=path, by=args.by)
+        # 先取结果再判断有无数据：全天/整点区间可直接由 aggcache、月汇总或 SQLite 回答，不解析数据文件
+        minutes = session.minutes()
+        if minutes.empty:
+            if not session.loaded:
+                # 已解析文件时 load_dataframe 已说明原因
+                print(f"No data in {day}")
+            return 0
+
     total = float(minutes.sum()) if not minutes.empty else 0.0
-    if args.start or args.end:
+    if days is not None and len(days) > 1:
+        print(f"{days[0]} ~ {days[-1]} 用时总计：{total:.1f} 分钟")
+    elif args.start or args.end:
         print(f"区间用时总计：{total:.1f} 分钟")
     else:
         print(f"今日用时总计：{total:.1f} 分钟")
 
     save_dir = args.save if args.save is not None else None
+    target = minutes if days is not None else session
     if args.pie:
-        plot_pie(minutes, day, save_dir=save_dir, show=True)
+        plot_pie(target, day, save_dir=save_dir, show=True)
     else:
-        plot_minutes(minutes, day, save_dir=save_dir, show=True)
+        plot_minutes(target, day, save_dir=save_dir, show=True)
     return 0
 
 
@@ -0,0 +1,247 @@
+"""只需要聚合结果时的流式读取：峰值内存与文件大小无关。
+
+``stats.load_dataframe`` 会把整份日文件（包括很长的 ``window`` 列）读成一个
+DataFrame；这里按 CHUNK_ROWS 行分块读取，只取聚合需要的列，每块解析出的区间
+依次送入可组合的聚合器后即丢弃：
+
+- Totals：按键累计秒数
+- HourBuckets：按键的逐小时秒数
+- Clip(inner, start_s, end_s)：先把区间裁剪到 [start_s, end_s] 再交给 inner
+- TopK(inner, k)：取 inner 结果中用时最多的 k 个键
+- Fanout(*aggs)：一次读取同时喂给多个聚合器
+
+``aggregate(path, agg, by=...)`` 支持日 CSV（HH:MM:SS / 纪元时间 / 无表头）、
+binlog 与已压缩的日期；语义与 stats 中的 DataFrame 聚合一致。
+"""
+
+import csv
+import heapq
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.errors import EmptyDataError
+
+import binlog
+from core import HEADER, local_host, schema_of
+
+CHUNK_ROWS = 64 * 1024  # 每块行数；峰值内存约与此成正比
+
+
+class Totals:
+    """按键累计秒数。"""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+
+    def update(self, s: np.ndarray, e: np.ndarray, keys: np.ndarray):
+        if not len(s):
+            return
+        agg = pd.Series(e - s, index=pd.Index(keys, dtype=object)).groupby(level=0, sort=False).sum()
+        seconds = self.seconds
+        for key, sec in zip(agg.index.tolist(), agg.tolist()):
+            seconds[key] = seconds.get(key, 0) + sec
+
+    def result(self) -> dict[str, float]:
+        return self.seconds
+
+    def minutes(self) -> pd.Series:
+        """{键: 分钟} 的 Series，按用时降序。"""
+        if not self.seconds:
+            return pd.Series(dtype=float)
+        return (pd.Series(self.seconds, dtype=float) / 60.0).sort_values(ascending=False)
+
+
+class HourBuckets:
+    """按键的逐小时秒数（24 个桶）。"""
+
+    def __init__(self):
+        self.hours: dict[str, np.ndarray] = {}
+
+    def update(self, s: np.ndarray, e: np.ndarray, keys: np.ndarray):
+        import stats
+
+        names, matrix = stats._hour_matrix(s, e, keys)
+        for i, name in enumerate(names):
+            cur = self.hours.get(name)
+            if cur is None:
+                self.hours[name] = matrix[i].copy()
+            else:
+                cur += matrix[i]
+
+    def result(self) -> dict[str, list[float]]:
+        """{键: [24 个小时秒数]}。"""
+        return {k: v.tolist() for k, v in self.hours.items()}
+
+
+class Clip:
+    """把区间裁剪到 [start_s, end_s]，只把有重叠的部分交给 inner。"""
+
+    def __init__(self, inner, start_s: int = 0, end_s: int = 24 * 3600):
+        self.inner = inner
+        self.start_s = start_s
+        self.end_s = end_s
+
+    def update(self, s: np.ndarray, e: np.ndarray, keys: np.ndarray):
+        s = np.maximum(s, self.start_s)
+        e = np.minimum(e, self.end_s)
+        keep = e > s
+        self.inner.update(s[keep], e[keep], keys[keep])
+
+    def result(self):
+        return self.inner.result()
+
+
+class TopK:
+    """inner（通常为 Totals）结果中用时最多的 k 个键。"""
+
+    def __init__(self, inner, k: int = 10):
+        self.inner = inner
+        self.k = k
+
+    def update(self, s: np.ndarray, e: np.ndarray, keys: np.ndarray):
+        self.inner.update(s, e, keys)
+
+    def result(self) -> list[tuple[str, float]]:
+        return heapq.nlargest(self.k, self.inner.result().items(), key=lambda kv: kv[1])
+
+
+class Fanout:
+    """同一批区间喂给多个聚合器。"""
+
+    def __init__(self, *aggs):
+        self.aggs = aggs
+
+    def update(self, s: np.ndarray, e: np.ndarray, keys: np.ndarray):
+        for agg in self.aggs:
+            agg.update(s, e, keys)
+
+    def result(self) -> list:
+        return [agg.result() for agg in self.aggs]
+
+
+def _peek_header(path: str) -> list[str] | None:
+    """CSV 首行；文件为空时返回 None。"""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), None)
+
+
+def _csv_chunks(path: str, columns: list[str], chunk_rows: int):
+    """分块读取 CSV 的时间列与 columns 列；表头只检查一次，无表头文件不再二次读取。"""
+    import stats
+
+    header = _peek_header(path)
+    if header is None:
+        return
+    schema = schema_of(header)
+    if schema != "hms":
+        cols = [header[0], header[1]]
+        names = None
+    elif {"start_time", "end_time", "process"} <= set(header):
+        cols = ["start_time", "end_time"]
+        names = None
+    else:
+        # 无表头 CSV：按默认列顺序命名
+        cols = ["start_time", "end_time"]
+        names = HEADER
+    wanted = cols + [c for c in columns if c in (names or header)]
+    try:
+        reader = pd.read_csv(
+            path,
+            header=None if names is not None else 0,
+            names=names,
+            usecols=wanted,
+            dtype={c: str for c in columns},
+            chunksize=chunk_rows,
+            encoding="utf-8",
+        )
+        for chunk in reader:
+            if schema != "hms":
+                chunk = stats._from_epoch(chunk, path)
+            for c in columns:
+                if c not in chunk.columns:
+                    chunk[c] = None
+            yield chunk
+    except EmptyDataError:
+        return
+
+
+def _binlog_chunks(path: str, columns: list[str], chunk_rows: int):
+    records, strings = binlog.read_records(path)
+    table = np.array(strings, dtype=object)
+    for i in range(0, len(records), chunk_rows):
+        part = records[i:i + chunk_rows]
+        data = {"start_time": part["start"].astype(np.int64), "end_time": part["end"].astype(np.int64)}
+        for c in columns:
+            # binlog 记录只有 process/window 两个字符串列
+            data[c] = table[part[c]] if c in part.dtype.names else None
+        yield pd.DataFrame(data)
+
+
+def iter_chunks(path: str, columns=("process",), chunk_rows: int = CHUNK_ROWS):
+    """逐块产出含 start_time/end_time 与 columns 列的 DataFrame。
+
+    CSV 不存在时回退到同名 binlog，再回退到已压缩的月分区或 SQLite 库（按天读出，只占一天的内存）。
+    """
+    columns = list(columns)
+    if not os.path.exists(path):
+        alt = os.path.splitext(path)[0] + binlog.LOG_EXT
+        if path.endswith(".csv") and os.path.exists(alt):
+            path = alt
+        else:
+            import compact
+
+            day = os.path.splitext(os.path.basename(path))[0]
+            archive = compact.archive_dir_for(path)
+            if path.endswith(".csv") and compact.is_compacted(day, archive):
+                df = compact.load_day(day, archive)
+            elif path.endswith(".csv"):
+                import sqlstore
+
+                df = sqlstore.load_day(day, sqlstore.db_path_for(path))
+            else:
+                df = None
+            if df is not None:
+                for c in columns:
+                    # 与 CSV / binlog 分块相同：缺少的列（如单机数据没有 host）补为空
+                    if c not in df.columns:
+                        df[c] = None
+                yield df
+            return
+    if path.endswith(binlog.LOG_EXT):
+        yield from _binlog_chunks(path, columns, chunk_rows)
+    else:
+        yield from _csv_chunks(path, columns, chunk_rows)
+
+
+def _keys(chunk: pd.DataFrame, by: str) -> np.ndarray:
+    if by == "process":
+        return chunk["process"].astype(str).to_numpy(dtype=object)
+    if by == "window":
+        return chunk["window"].fillna("").astype(str).to_numpy(dtype=object)
+    if by == "category":
+        import categories
+
+        return categories.categorize(chunk)
+    if by == "host":
+        return chunk["host"].fillna(local_host()).astype(str).to_numpy(dtype=object)
+    raise ValueError(f"unknown grouping key: {by!r}")
+
+
+def aggregate(path: str, agg, by: str = "process", chunk_rows: int = CHUNK_ROWS):
+    """把 path 中的全部有效区间流式送入 agg，返回 agg。
+
+    与 stats.compute_minutes 相同：时间无法解析或进程为空的记录跳过，
+    时间限制在当天 [0, 24:00]（旧格式中 end < start 的记录计到 24:00）。
+    """
+    import stats
+
+    columns = {"process": ["process"], "host": ["process", "host"]}.get(by, ["process", "window"])
+    for chunk in iter_chunks(path, columns, chunk_rows):
+        s, e, valid = stats._interval_arrays(chunk)
+        valid &= chunk["process"].notna().to_numpy()
+        if not valid.any():
+            continue
+        chunk = chunk[valid]
+        agg.update(s[valid], e[valid], _keys(chunk, by))
+    return agg
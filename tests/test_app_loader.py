@@ -0,0 +1,106 @@
+"""app.pyw 的 BackgroundLoader：视图请求只保留最新的一个，保存任务不被合并或取消。"""
+
+import importlib.machinery
+import importlib.util
+import os
+import threading
+import time
+
+import pytest
+
+
+def _load_app():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.pyw")
+    loader = importlib.machinery.SourceFileLoader("app_gui", path)
+    spec = importlib.util.spec_from_loader("app_gui", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+app = _load_app()
+
+
+class FakeRoot:
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, fn):
+        self.pending.append(fn)
+
+    def configure(self, **kwargs):
+        pass
+
+    def pump(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            fn = self.pending.pop(0)
+            fn()
+            time.sleep(0.005)
+        assert not self.pending
+
+
+class FakeVar:
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+
+@pytest.fixture
+def loader():
+    root = FakeRoot()
+    busy = FakeVar()
+    bl = app.BackgroundLoader(root, busy)
+    yield bl, root, busy
+    bl.shutdown()
+
+
+def test_views_coalesce(loader):
+    bl, root, busy = loader
+    gate = threading.Event()
+    shown = []
+    bl.submit(lambda: gate.wait(5) and "first", shown.append)
+    bl.submit(lambda: "second", shown.append)
+    bl.submit(lambda: "third", shown.append)
+    gate.set()
+    root.pump()
+    assert shown == ["third"]
+    assert busy.value == ""
+
+
+def test_save_survives_later_views(loader):
+    bl, root, busy = loader
+    gate = threading.Event()
+    saved, shown = [], []
+    bl.run(lambda: gate.wait(5) and "saved.png", saved.append, message="保存中…")
+    assert busy.value == "保存中…"
+    bl.submit(lambda: "view 1", shown.append)
+    bl.submit(lambda: "view 2", shown.append)
+    gate.set()
+    root.pump()
+    assert saved == ["saved.png"]
+    assert shown == ["view 2"]
+    assert busy.value == ""
+
+
+def test_queued_saves_all_run(loader):
+    bl, root, _ = loader
+    saved = []
+    for i in range(3):
+        bl.run(lambda i=i: i, saved.append)
+    root.pump()
+    assert saved == [0, 1, 2]
+
+
+def test_job_error_reported(loader):
+    bl, root, _ = loader
+    errors = []
+
+    def fail():
+        raise OSError("disk full")
+
+    bl.run(fail, lambda r: None, on_error=errors.append)
+    root.pump()
+    assert isinstance(errors[0], OSError)
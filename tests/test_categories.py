@@ -0,0 +1,42 @@
+"""categories：默认规则同时匹配 tracker 记录的程序描述名与 exe 名。"""
+
+import pytest
+
+from categories import DEFAULT_RULES, Categorizer
+from tracker import NAME_MAP
+
+
+@pytest.fixture
+def cat():
+    return Categorizer(DEFAULT_RULES)
+
+
+@pytest.mark.parametrize(
+    "process,expected",
+    [
+        ("Visual Studio Code", "编程"),
+        ("Code.exe", "编程"),
+        ("code.exe", "编程"),
+        ("Microsoft Word", "文档"),
+        ("微信", "聊天"),
+        ("Notepad", "Notepad"),
+        ("Visual Studio Code - Insiders", "Visual Studio Code - Insiders"),  # 进程名整体匹配
+    ],
+)
+def test_process_names(cat, process, expected):
+    assert cat.category(process, "untitled") == expected
+
+
+def test_name_map_names_are_covered(cat):
+    assert cat.category(NAME_MAP["Code.exe"], "x") == "编程"
+
+
+def test_title_rules_and_order(cat):
+    assert cat.category("Google Chrome", "owner/repo - GitHub") == "编程"
+    assert cat.category("Google Chrome", "Inbox (3) - Gmail") == "邮件"
+    assert cat.category("Google Chrome", None) == "Google Chrome"
+
+
+def test_categorize_column(cat):
+    out = cat.categorize(["Visual Studio Code", "Google Chrome", "Visual Studio Code"], ["a", "YouTube", "b"])
+    assert out.tolist() == ["编程", "视频", "编程"]
@@ -0,0 +1,49 @@
+"""ipc：令牌校验；RecorderControl 在记录进程不可达时报告不可用。"""
+
+import json
+import socket
+
+import pytest
+
+import ipc
+import tracker
+
+
+@pytest.fixture
+def server(tmp_path):
+    srv = ipc.Server(lambda msg: {"type": "state", "cmd": msg["cmd"]}, endpoint=str(tmp_path / "recorder.json"))
+    srv.start()
+    yield srv
+    srv.close()
+
+
+def _raw(port, msg):
+    with socket.create_connection((ipc.HOST, port), timeout=ipc.TIMEOUT) as sock, sock.makefile("rwb") as f:
+        f.write(ipc.encode(msg))
+        f.flush()
+        return json.loads(f.readline())
+
+
+def test_client_sends_token(server):
+    assert ipc.Client(server.endpoint).request("status") == {"type": "state", "cmd": "status"}
+
+
+@pytest.mark.parametrize("extra", [{}, {"token": "0" * 32}, {"token": None}])
+def test_request_without_token_is_rejected(server, extra):
+    assert _raw(server.port, {"cmd": "clear", **extra}) == {"error": "unauthorized"}
+    assert _raw(server.port, {"cmd": "subscribe", **extra}) == {"error": "unauthorized"}
+
+
+def test_stale_token_is_rejected(server, tmp_path):
+    stale = tmp_path / "stale.json"
+    stale.write_text(json.dumps({"port": server.port, "pid": 0, "token": "stale"}), encoding="utf-8")
+    with pytest.raises(RuntimeError, match="unauthorized"):
+        ipc.Client(str(stale)).request("clear")
+
+
+def test_call_reports_unavailable(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracker.RecorderControl, "_host", lambda self: False)
+    monkeypatch.setattr(tracker.time, "sleep", lambda s: None)
+    recorder = tracker.RecorderControl(host=False)
+    recorder.client = ipc.Client(str(tmp_path / "recorder.json"))
+    assert recorder.clear_today() == {"type": "state", "running": False, "unavailable": True}
@@ -0,0 +1,102 @@
+"""live：CSV / binlog / SQLite 三种存储的增量读取与今日存储的选择。"""
+
+import pytest
+
+import binlog
+import core
+import live
+import sqlstore
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+DAY = "2025-12-01"
+
+
+def test_csv_tail(data_dir):
+    path = data_dir / f"{DAY}.csv"
+    path.write_text("start_time,end_time,process,window\r\n09:00:00,09:10:00,Code.exe,a\r\n", encoding="utf-8")
+    reader = live.open_reader(live.today_source(DAY))
+    assert isinstance(reader, live.TailReader) and reader.source[0] == "csv"
+    assert reader.poll() and reader.minutes() == {"Code.exe": 10.0}
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        f.write("09:10:00,09:40:00,chrome.exe,b\r\n09:40:00,09:4")  # 末尾不完整
+    assert reader.poll()
+    assert reader.minutes() == {"chrome.exe": 30.0, "Code.exe": 10.0}
+    assert not reader.poll()
+
+
+def test_binlog_tail(data_dir):
+    log = binlog.log_path(DAY, str(data_dir))
+    out = binlog.BinlogAppender(log)
+    out.append_rows([(9 * 3600, 9 * 3600 + 600, "Code.exe", "a")])
+    source = live.today_source(DAY)
+    assert source == ("binlog", log, DAY)
+    reader = live.open_reader(source)
+    assert reader.poll() and reader.minutes() == {"Code.exe": 10.0}
+    assert not reader.poll()
+    out.append_rows([(10 * 3600, 10 * 3600 + 1800, "chrome.exe", "b"), (11 * 3600, 11 * 3600 + 60, "Code.exe", "a")])
+    assert reader.poll()
+    assert reader.minutes() == {"chrome.exe": 30.0, "Code.exe": 11.0}
+    assert reader.hours["chrome.exe"][10] == 1800
+    out.close()
+
+
+def test_binlog_tail_waits_for_strings(data_dir):
+    log = binlog.log_path(DAY, str(data_dir))
+    out = binlog.BinlogAppender(log)
+    out.append_rows([(0, 60, "Code.exe", "a")])
+    out.close()
+    # 记录已写入但引用的字符串表项还不完整（写入中断）
+    with open(log, "ab") as f:
+        f.write(binlog.RECORD.pack(60, 120, 5, 6))
+    reader = live.BinlogTailReader(log)
+    reader.poll()
+    assert reader.rows == 1
+    assert reader.offset == binlog.HEADER_SIZE + binlog.RECORD.size
+
+
+def test_binlog_recreated(data_dir):
+    log = binlog.log_path(DAY, str(data_dir))
+    out = binlog.BinlogAppender(log)
+    out.append_rows([(0, 600, "Code.exe", "a"), (600, 1200, "Code.exe", "a")])
+    out.close()
+    reader = live.BinlogTailReader(log)
+    reader.poll()
+    # 清除今日数据：日志被删除后重建
+    for p in (log, binlog.strings_path(log)):
+        (data_dir / p).unlink()
+    out = binlog.BinlogAppender(log)
+    out.append_rows([(0, 60, "chrome.exe", "b"), (60, 120, "chrome.exe", "b"), (120, 180, "Teams.exe", "c")])
+    out.close()
+    assert reader.poll()
+    assert reader.minutes() == {"chrome.exe": 2.0, "Teams.exe": 1.0}
+
+
+def test_sqlite_tail(data_dir):
+    db = sqlstore.db_path_for(str(data_dir / f"{DAY}.csv"))
+    conn = sqlstore.connect(db)
+    sqlstore.insert_rows(conn, DAY, [(0, 600, "Code.exe", "a")])
+    sqlstore.insert_rows(conn, "2025-11-30", [(0, 6000, "Code.exe", "a")])
+    source = live.today_source(DAY)
+    assert source == ("sqlite", db, DAY)
+    reader = live.open_reader(source)
+    assert reader.poll() and reader.minutes() == {"Code.exe": 10.0}
+    assert not reader.poll()
+    sqlstore.insert_rows(conn, DAY, [(600, 2400, "chrome.exe", "b")])
+    assert reader.poll() and reader.minutes() == {"chrome.exe": 30.0, "Code.exe": 10.0}
+    conn.close()
+    sqlstore.delete_day(DAY, db)
+    assert reader.poll() and reader.minutes() == {}
+
+
+def test_source_prefers_csv(data_dir):
+    assert live.today_source(DAY)[0] == "csv"
+    binlog.BinlogAppender(binlog.log_path(DAY, str(data_dir))).close()
+    assert live.today_source(DAY)[0] == "binlog"
+    (data_dir / f"{DAY}.csv").write_text("start_time,end_time,process,window\r\n", encoding="utf-8")
+    assert live.today_source(DAY)[0] == "csv"
@@ -0,0 +1,82 @@
+"""merge：乱序来源的排序、跨来源去重与跳过今天。"""
+
+import csv
+from datetime import datetime
+
+import merge
+
+
+def write_day(root, day, rows, header=("start_time", "end_time", "process", "window")):
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / f"{day}.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        w.writerows(rows)
+
+
+def read_day(root, day):
+    with open(root / f"{day}.csv", newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_unsorted_source_is_sorted_across_chunks(tmp_path):
+    # 末尾是补写的早先区间（如检查点恢复），分块读取时位于另一块
+    write_day(
+        tmp_path / "a",
+        "2025-12-01",
+        [["10:00:00", "11:00:00", "Code.exe", "x"], ["12:00:00", "13:00:00", "Code.exe", "y"], ["08:00:00", "09:00:00", "chrome.exe", "z"]],
+    )
+    rows = list(merge.source_rows(str(tmp_path / "a"), "a", "2025-12-01", chunk_rows=2))
+    assert [r[0] for r in rows] == [8 * 3600, 10 * 3600, 12 * 3600]
+    assert rows[0] == (8 * 3600, 9 * 3600, "chrome.exe", "z", "a")
+
+
+def test_merge_dedups_across_sources(tmp_path):
+    day = "2025-12-01"
+    write_day(tmp_path / "alice", day, [["09:00:00", "10:00:00", "Code.exe", "x"], ["08:00:00", "08:30:00", "Code.exe", "w"]])
+    write_day(tmp_path / "bob", day, [["09:30:00", "10:30:00", "Code.exe", "x"], ["11:00:00", "12:00:00", "chrome.exe", "y"]])
+    out = tmp_path / "out"
+    roots = [("alice", str(tmp_path / "alice")), ("bob", str(tmp_path / "bob"))]
+    assert merge.merge(roots, out_dir=str(out), fmt="csv", schema="hms", workers=1) == {day: 4}
+    assert read_day(out, day) == [
+        ["08:00:00", "08:30:00", "Code.exe", "w", "alice"],
+        ["09:00:00", "10:00:00", "Code.exe", "x", "alice"],
+        ["10:00:00", "10:30:00", "Code.exe", "x", "bob"],
+        ["11:00:00", "12:00:00", "chrome.exe", "y", "bob"],
+    ]
+
+
+def test_merge_skips_today(tmp_path):
+    today = datetime.now().strftime("%Y-%m-%d")
+    write_day(tmp_path / "a", today, [["09:00:00", "10:00:00", "Code.exe", "x"]])
+    write_day(tmp_path / "a", "2025-12-01", [["09:00:00", "10:00:00", "Code.exe", "x"]])
+    out = tmp_path / "out"
+    result = merge.merge([("a", str(tmp_path / "a"))], out_dir=str(out), fmt="csv", schema="hms", workers=1)
+    assert list(result) == ["2025-12-01"]
+    assert not (out / f"{today}.csv").exists()
+    assert merge.merge([("a", str(tmp_path / "a"))], days=[today], out_dir=str(out), fmt="csv", workers=1) == {}
+
+
+def test_merge_into_sqlite_drops_compacted_day(tmp_path, monkeypatch):
+    import compact
+    import stats
+
+    monkeypatch.chdir(tmp_path)
+    day = "2025-12-01"
+    write_day(tmp_path / "data", day, [["09:00:00", "10:00:00", "Code.exe", "x"]])
+    write_day(tmp_path / "data", "2025-12-02", [["09:00:00", "09:30:00", "Code.exe", "x"]])
+    compact.compact(before="2025-12-31")
+    assert compact.is_compacted(day)
+    write_day(tmp_path / "bob", day, [["11:00:00", "11:30:00", "chrome.exe", "y"]])
+
+    # 输出目录本身也是来源：先读出已压缩的记录，再移出月分区与汇总表
+    result = merge.merge([("here", "data"), ("bob", str(tmp_path / "bob"))], days=[day], out_dir="data", fmt="sqlite", workers=1)
+    assert result == {day: 2}
+    assert not compact.is_compacted(day)
+    assert compact.is_compacted("2025-12-02")
+    assert list(compact.load_month("2025-12")["day"].unique()) == ["2025-12-02"]
+
+    expected = {"Code.exe": 60.0, "chrome.exe": 30.0}
+    assert stats.DaySession(day).minutes().to_dict() == expected
+    assert stats.compute_minutes_for_days([day], None, None, workers=1).to_dict() == expected
+    assert stats.load_dataframe(stats.today_file(day)) is not None
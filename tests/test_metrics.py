@@ -0,0 +1,56 @@
+"""metrics：异常计数不因多层捕获而重复。"""
+
+import metrics
+import sources
+import tracker
+
+
+def test_error_counted_once_across_layers():
+    m = metrics.Metrics()
+
+    def probe():
+        raise OSError("access denied")
+
+    timed = m.timed("resolve", probe)
+    try:
+        timed()
+    except OSError as e:
+        m.error("loop", e)
+    assert m.counters == {"errors.resolve": 1}
+    assert "resolve: OSError" in m.last_error
+
+
+def test_distinct_errors_counted_separately():
+    m = metrics.Metrics()
+    m.error("loop", ValueError("a"))
+    m.error("loop", ValueError("a"))
+    assert m.counters["errors.loop"] == 2
+
+
+def test_loop_counts_failed_resolve_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracker, "CHECK_INTERVAL", 0)
+    m = metrics.Metrics()
+    calls = []
+
+    def probe():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("access denied")
+        return "Code.exe", "a.py"
+
+    class Source(sources.AdaptivePollingSource):
+        def next(self, timeout):
+            if len(calls) >= 2:
+                raise StopIteration
+            return super().next(timeout)
+
+    monkeypatch.setattr(tracker, "get_active_window", probe)
+    monkeypatch.setattr(sources, "default_source", lambda p: Source(p, min_interval=0, max_interval=0))
+    writer = tracker.RecordWriter()
+    monkeypatch.setattr(tracker, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(tracker.core, "DATA_DIR", str(tmp_path))
+    t = tracker.Tracker(writer=writer, metrics=m)
+    t.running = True
+    t.loop()
+    assert m.counters.get("errors.resolve") == 1
+    assert "errors.loop" not in m.counters
@@ -0,0 +1,116 @@
+"""跨午夜记录：stats、stream、aggcache、binlog、SQLite 与实时视图按同一规则（计到 24:00）统计。"""
+
+import os
+
+import pytest
+
+import binlog
+import live
+import sqlstore
+import stats
+import stream
+
+DAY = "2025-12-01"
+ROWS = [
+    ("23:30:00", "00:15:00", "Code.exe", "a"),  # 旧格式跨午夜：end < start
+    ("23:45:00", "24:30:00", "chrome.exe", "b"),  # 结束晚于 24:00
+]
+MINUTES = {"Code.exe": 30.0, "chrome.exe": 15.0}
+HOUR_23 = {"Code.exe": 1800.0, "chrome.exe": 900.0}
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    return tmp_path / "data"
+
+
+def _write_csv(path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("start_time,end_time,process,window\r\n")
+        f.writelines(",".join(r) + "\r\n" for r in ROWS)
+
+
+def _check_hours(hours):
+    """hours: {进程: 24 个小时秒数}。"""
+    assert {p: len(b) for p, b in hours.items()} == {p: 24 for p in MINUTES}
+    assert {p: b[23] for p, b in hours.items()} == HOUR_23
+    assert {p: sum(b[:23]) for p, b in hours.items()} == {p: 0 for p in MINUTES}
+
+
+def _check_session_hours(session):
+    assert session.hours() == {p: [(23, sec / 60)] for p, sec in HOUR_23.items()}
+
+
+def test_dataframe_paths(data_dir):
+    path = str(data_dir / f"{DAY}.csv")
+    _write_csv(path)
+    df = stats.load_dataframe(path)
+    assert stats.compute_minutes(df).to_dict() == MINUTES
+    assert stats.compute_minutes_in_range(df, "23:00:00", None).to_dict() == MINUTES
+    assert stats.IntervalIndex(df).minutes_in_range("23:00:00", None).to_dict() == MINUTES
+    assert stats.compute_minutes_by_hour(df) == {p: [(23, sec / 60)] for p, sec in HOUR_23.items()}
+
+
+@pytest.mark.parametrize("kind", ["csv", "binlog"])
+def test_file_paths(data_dir, kind):
+    if kind == "csv":
+        path = str(data_dir / f"{DAY}.csv")
+        _write_csv(path)
+    else:
+        path = binlog.log_path(DAY, str(data_dir))
+        out = binlog.BinlogAppender(path)
+        out.append_rows(ROWS)
+        out.close()
+
+    totals, hours = stream.aggregate(path, stream.Fanout(stream.Totals(), stream.HourBuckets())).result()
+    assert totals == {p: m * 60 for p, m in MINUTES.items()}
+    _check_hours(hours)
+
+    # 第一次建立 aggcache 条目，第二次从缓存读取
+    for _ in range(2):
+        session = stats.DaySession(DAY, path=path)
+        assert session.minutes().to_dict() == MINUTES
+        assert session.minutes_in_range("23:00:00", None).to_dict() == MINUTES
+        _check_session_hours(session)
+
+    reader = live.open_reader(live.today_source(DAY))
+    assert reader.source[0] == kind
+    assert reader.poll()
+    assert reader.minutes() == MINUTES
+    _check_hours(reader.hours)
+
+
+def test_sqlite_paths(data_dir):
+    path = str(data_dir / f"{DAY}.csv")
+    _write_csv(path)
+    sqlstore.import_files([path], remove=True)
+    # 早期版本导入的库：跨午夜记录的 end 加了 24 小时
+    conn = sqlstore.connect()
+    sqlstore.insert_rows(conn, "2025-12-02", [(23 * 3600 + 1800, 24 * 3600 + 900, "Code.exe", "a")])
+    conn.close()
+
+    assert sqlstore.minutes_for_days([DAY]) == MINUTES
+    assert sqlstore.minutes_for_days([DAY], start="23:00:00") == MINUTES
+    _check_hours(sqlstore.hour_seconds(DAY))
+    assert sqlstore.minutes_for_days(["2025-12-02"]) == {"Code.exe": 30.0}
+    assert sqlstore.hour_seconds("2025-12-02")["Code.exe"][23] == 1800.0
+
+    session = stats.DaySession(DAY)
+    assert session.minutes().to_dict() == MINUTES
+    _check_session_hours(session)
+
+    reader = live.open_reader(live.today_source(DAY))
+    assert reader.source[0] == "sqlite"
+    assert reader.poll()
+    assert reader.minutes() == MINUTES
+    _check_hours(reader.hours)
+
+
+def test_sqlstore_total_command(data_dir, capsys):
+    conn = sqlstore.connect()
+    sqlstore.insert_rows(conn, DAY, [(23 * 3600 + 1800, 24 * 3600 + 900, "Code.exe", "a"), (3600, 600, "Code.exe", "b")])
+    conn.close()
+    assert sqlstore.main(["total", "Code.exe", "--from", DAY, "--to", DAY]) == 0
+    assert capsys.readouterr().out.strip().endswith("30.0 分钟")
@@ -0,0 +1,299 @@
+"""采集管线：FakeSource -> Tracker -> RecordWriter，断言写出的日文件内容。"""
+
+import csv
+from datetime import datetime
+
+import pytest
+
+import core
+import sources
+import tracker
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(tracker, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(tracker, "MIN_DURATION", 0)
+    monkeypatch.setattr(tracker, "TITLE_RULES", [])
+    return tmp_path
+
+
+def at(hms, day="2025-12-01"):
+    return datetime.strptime(f"{day} {hms}", "%Y-%m-%d %H:%M:%S")
+
+
+def run(events, stop, **writer_args):
+    """回放 events 直到事件源耗尽，再在 stop 时刻停止。"""
+    t = tracker.Tracker(writer=tracker.RecordWriter(schema="hms", **writer_args), source=sources.FakeSource(events))
+    t.running = True
+    t.loop()
+    t.stop(stop)
+    return t
+
+
+def rows(data_dir, day="2025-12-01"):
+    path = data_dir / f"{day}.csv"
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        assert next(reader) == core.HEADER
+        return list(reader)
+
+
+def test_window_switch(data_dir):
+    t = run(
+        [
+            (at("09:00:00"), "Code.exe", "a.py"),
+            (at("09:00:00"), "Code.exe", "a.py"),  # 未变化
+            (at("09:10:00"), "Code.exe", "b.py"),
+            (at("09:30:00"), "chrome.exe", "Docs"),
+        ],
+        at("10:00:00"),
+    )
+    assert rows(data_dir) == [
+        ["09:00:00", "09:10:00", "Code.exe", "a.py"],
+        ["09:10:00", "09:30:00", "Code.exe", "b.py"],
+        ["09:30:00", "10:00:00", "chrome.exe", "Docs"],
+    ]
+    assert t.records == 3
+
+
+def test_idle_tick_commits_and_flushes(data_dir, monkeypatch):
+    monkeypatch.setattr(tracker, "MIN_DURATION", 5)
+    t = tracker.Tracker(
+        writer=tracker.RecordWriter(flush_interval=0, schema="hms"),
+        source=sources.FakeSource(
+            [
+                (at("09:00:00"), "Code.exe", "a.py"),
+                (at("09:10:00"), "chrome.exe", "Docs"),
+                None,  # 空闲 tick：当前窗口早已超过 MIN_DURATION，暂存段写出并落盘
+            ]
+        ),
+    )
+    t.running = True
+    t.loop()
+    assert t.records == 1
+    assert rows(data_dir) == [["09:00:00", "09:10:00", "Code.exe", "a.py"]]
+    t.stop(at("09:20:00"))
+    assert rows(data_dir)[-1] == ["09:10:00", "09:20:00", "chrome.exe", "Docs"]
+
+
+def test_without_idle_tick_rows_stay_buffered(data_dir):
+    t = tracker.Tracker(
+        writer=tracker.RecordWriter(schema="hms"),
+        source=sources.FakeSource([(at("09:00:00"), "Code.exe", "a.py"), (at("09:10:00"), "chrome.exe", "Docs")]),
+    )
+    t.running = True
+    t.loop()
+    assert not (data_dir / "2025-12-01.csv").exists()
+    t.stop(at("09:20:00"))
+    assert len(rows(data_dir)) == 2
+
+
+def test_midnight_split(data_dir):
+    run(
+        [
+            (at("23:50:00"), "Code.exe", "a.py"),
+            (at("00:10:00", "2025-12-02"), "chrome.exe", "Docs"),
+        ],
+        at("00:20:00", "2025-12-02"),
+    )
+    assert rows(data_dir, "2025-12-01") == [["23:50:00", "24:00:00", "Code.exe", "a.py"]]
+    assert rows(data_dir, "2025-12-02") == [
+        ["00:00:00", "00:10:00", "Code.exe", "a.py"],
+        ["00:10:00", "00:20:00", "chrome.exe", "Docs"],
+    ]
+
+
+def test_debounce_merges_short_flash(data_dir, monkeypatch):
+    monkeypatch.setattr(tracker, "MIN_DURATION", 2)
+    run(
+        [
+            (at("10:00:00"), "Code.exe", "a.py"),
+            (at("10:00:05"), "explorer.exe", "Downloads"),  # 1 秒的闪切
+            (at("10:00:06"), "Code.exe", "a.py"),
+            (at("10:00:10"), "chrome.exe", "Docs"),
+        ],
+        at("10:00:20"),
+    )
+    assert rows(data_dir) == [
+        ["10:00:00", "10:00:10", "Code.exe", "a.py"],
+        ["10:00:10", "10:00:20", "chrome.exe", "Docs"],
+    ]
+
+
+def test_debounce_keeps_long_enough_switches(data_dir, monkeypatch):
+    monkeypatch.setattr(tracker, "MIN_DURATION", 2)
+    run(
+        [
+            (at("10:00:00"), "Code.exe", "a.py"),
+            (at("10:00:05"), "explorer.exe", "Downloads"),
+            (at("10:00:08"), "Code.exe", "a.py"),
+        ],
+        at("10:00:20"),
+    )
+    assert rows(data_dir) == [
+        ["10:00:00", "10:00:05", "Code.exe", "a.py"],
+        ["10:00:05", "10:00:08", "explorer.exe", "Downloads"],
+        ["10:00:08", "10:00:20", "Code.exe", "a.py"],
+    ]
+
+
+def test_title_rules_merge_volatile_titles(data_dir, monkeypatch):
+    monkeypatch.setattr(tracker, "TITLE_RULES", [(r"^\(\d+\)\s*", "")])
+    run(
+        [
+            (at("11:00:00"), "Slack", "(3) general"),
+            (at("11:05:00"), "Slack", "(4) general"),  # 只有未读计数变化
+            (at("11:10:00"), "Slack", "random"),
+        ],
+        at("11:15:00"),
+    )
+    assert rows(data_dir) == [
+        ["11:00:00", "11:10:00", "Slack", "general"],
+        ["11:10:00", "11:15:00", "Slack", "random"],
+    ]
+
+
+def test_defaults_record_raw_titles(data_dir, monkeypatch):
+    monkeypatch.undo()
+    monkeypatch.setattr(core, "DATA_DIR", str(data_dir))
+    monkeypatch.setattr(tracker, "DATA_DIR", str(data_dir))
+    run(
+        [
+            (at("11:00:00"), "Slack", "(3) general"),
+            (at("11:00:01"), "Slack", "(4) general"),
+            (at("11:05:00"), "Slack", "(3) general"),
+        ],
+        at("11:10:00"),
+    )
+    assert [r[3] for r in rows(data_dir)] == ["(3) general", "(4) general", "(3) general"]
+
+
+@pytest.mark.parametrize(
+    "raw,expected",
+    [
+        ("● main.py - Visual Studio Code", "main.py - Visual Studio Code"),
+        ("(3) Slack | general", "Slack | general"),
+        ("Pomodoro (12:34) - Focus", "Pomodoro - Focus"),
+        ("Recording [01:02:03]", "Recording"),
+        ("Standup at 10:30 - Calendar", "Standup at 10:30 - Calendar"),  # 正文中的时刻保留
+        ("Downloading 45% ⠋", "Downloading"),
+    ],
+)
+def test_volatile_title_rules(monkeypatch, raw, expected):
+    monkeypatch.setattr(tracker, "TITLE_RULES", tracker.VOLATILE_TITLE_RULES)
+    assert tracker.normalize_title(raw) == expected
+
+
+class StopWhileWaiting(sources.FakeSource):
+    """在第 n 次 next() 等待期间（另一线程）调用 tracker.stop()，随后仍返回一个事件。"""
+
+    def __init__(self, events, n):
+        super().__init__(events)
+        self.n = n
+        self.tracker = None
+
+    def next(self, timeout):
+        self.n -= 1
+        if self.n == 0:
+            self.tracker.stop(at("09:20:00"))
+        return super().next(timeout)
+
+
+def test_event_after_stop_does_not_restore_checkpoint(data_dir):
+    import checkpoint
+
+    slot = checkpoint.Checkpoint(str(data_dir / "recorder.slot"), interval=0)
+    source = StopWhileWaiting(
+        [(at("09:00:00"), "Code.exe", "a.py"), (at("09:10:00"), "chrome.exe", "Docs"), (at("09:30:00"), "explorer.exe", "x")],
+        n=3,
+    )
+    t = tracker.Tracker(writer=tracker.RecordWriter(schema="hms"), source=source, checkpoint=slot)
+    source.tracker = t
+    t.running = True
+    t.loop()
+    assert not slot.read()
+    assert rows(data_dir) == [
+        ["09:00:00", "09:10:00", "Code.exe", "a.py"],
+        ["09:10:00", "09:20:00", "chrome.exe", "Docs"],
+    ]
+    slot.close()
+
+
+def test_discard_restarts_current_window(data_dir, monkeypatch):
+    import checkpoint
+
+    monkeypatch.setattr(tracker, "MIN_DURATION", 3600)
+
+    slot = checkpoint.Checkpoint(str(data_dir / "recorder.slot"), interval=0)
+    t = tracker.Tracker(
+        writer=tracker.RecordWriter(schema="hms"),
+        source=sources.FakeSource([(at("09:00:00"), "Code.exe", "a.py"), (at("09:10:00"), "chrome.exe", "Docs")]),
+        checkpoint=slot,
+    )
+    t.running = True
+    t.loop()
+    assert slot.read()["pending"][2] == "Code.exe"
+    t.discard(at("09:15:00"))
+    assert not slot.read()
+    t.stop(at("09:20:00"))
+    assert rows(data_dir) == [["09:15:00", "09:20:00", "chrome.exe", "Docs"]]
+    slot.close()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "binlog", "sqlite"])
+def test_records_after_clear_are_visible(tmp_path, monkeypatch, fmt):
+    import live
+    import stats
+
+    # 相对路径的 data/（core.DATA_DIR、数据库、aggcache）都落在临时目录
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tracker, "STORAGE_FORMAT", fmt)
+    day = "2025-12-01"
+    writer = tracker.make_writer()
+    t = tracker.Tracker(writer=writer, source=sources.FakeSource([(at("09:00:00"), "Code.exe", "a.py")]))
+    t.running = True
+    t.loop()
+    t.observe(at("09:30:00"), "chrome.exe", "Docs")
+    writer.flush()
+    t.discard(at("10:00:00"))
+    tracker.clear_day_files(day)
+    t.stop(at("10:20:00"))
+    assert stats.DaySession(day, use_cache=False).minutes().to_dict() == {"chrome.exe": 20.0}
+    assert live.today_source(day)[0] == fmt
+    reader = live.open_reader(live.today_source(day))
+    reader.poll()
+    assert reader.minutes() == {"chrome.exe": 20.0}
+
+
+@pytest.mark.parametrize("fmt", ["csv", "binlog", "sqlite"])
+@pytest.mark.parametrize("flushed", [False, True], ids=["buffered", "flushed"])
+def test_checkpoint_does_not_flush_buffer(tmp_path, monkeypatch, fmt, flushed):
+    import checkpoint
+    import stats
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tracker, "STORAGE_FORMAT", fmt)
+    monkeypatch.setattr(tracker, "MIN_DURATION", 0)
+    monkeypatch.setattr(tracker, "TITLE_RULES", [])
+    day = "2025-12-01"
+    slot = checkpoint.Checkpoint(str(tmp_path / "data" / "recorder.slot"), interval=0)
+    writer = tracker.make_writer()
+    events = [(at("09:00:00"), "Code.exe", "a.py"), (at("09:10:00"), "chrome.exe", "Docs"), (at("09:30:00"), "explorer.exe", "x")]
+    t = tracker.Tracker(writer=writer, source=sources.FakeSource(events), checkpoint=slot)
+    t.running = True
+    t.loop()
+    # 每个 tick 都写了检查点，但两段仍在写入器缓冲中，检查点记录了它们
+    assert stats.DaySession(day, use_cache=False).minutes().empty
+    assert [r[2] for r in slot.read()["buffered"]["rows"]] == ["Code.exe", "chrome.exe"]
+    if flushed:
+        # 检查点之后写入器按自己的节奏写盘，随后进程崩溃
+        writer.flush()
+
+    recovered = tracker.make_writer()
+    assert tracker.recover_checkpoint(recovered, slot) == (0 if flushed else 2)
+    recovered.close()
+    assert not slot.read()
+    assert stats.DaySession(day, use_cache=False).minutes().to_dict() == {"chrome.exe": 20.0, "Code.exe": 10.0}
+    slot.close()
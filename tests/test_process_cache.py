@@ -0,0 +1,131 @@
+"""ProcessInfoCache：用假解析器验证 PID 复用失效、LRU 上限与负缓存。"""
+
+from collections import Counter
+
+import pytest
+
+from tracker import NAME_MAP, ProcessInfoCache
+
+
+class FakeResolver:
+    """进程表：pid -> (创建时间, 进程名, exe 路径)；exe 路径 -> (mtime, 描述)。记录每个方法的调用次数。"""
+
+    def __init__(self):
+        self.procs = {}
+        self.files = {}
+        self.calls = Counter()
+
+    def create_time(self, pid):
+        self.calls["create_time"] += 1
+        return self.procs[pid][0]
+
+    def process_name(self, pid):
+        self.calls["process_name"] += 1
+        return self.procs[pid][1]
+
+    def exe(self, pid):
+        self.calls["exe"] += 1
+        return self.procs[pid][2]
+
+    def exe_mtime(self, path):
+        self.calls["exe_mtime"] += 1
+        return self.files.get(path, (None, None))[0]
+
+    def file_description(self, path):
+        self.calls["file_description"] += 1
+        return self.files.get(path, (None, None))[1]
+
+
+@pytest.fixture
+def resolver():
+    r = FakeResolver()
+    r.procs[100] = (1.0, "Code.exe", r"C:\vscode\Code.exe")
+    r.files[r"C:\vscode\Code.exe"] = (10.0, "Visual Studio Code")
+    return r
+
+
+def test_hit_skips_resolution(resolver):
+    cache = ProcessInfoCache(resolver)
+    assert cache.app_name(100) == "Visual Studio Code"
+    assert cache.app_name(100) == "Visual Studio Code"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert resolver.calls["exe"] == 1
+    assert resolver.calls["file_description"] == 1
+
+
+def test_pid_reuse_invalidates_by_create_time(resolver):
+    cache = ProcessInfoCache(resolver)
+    assert cache.app_name(100) == "Visual Studio Code"
+    # 原进程退出，同一 PID 分配给了另一个程序
+    resolver.procs[100] = (2.0, "notepad.exe", r"C:\Windows\notepad.exe")
+    resolver.files[r"C:\Windows\notepad.exe"] = (5.0, "Notepad")
+    assert cache.app_name(100) == "Notepad"
+    assert cache.misses == 2
+    assert cache.app_name(100) == "Notepad"
+    assert cache.hits == 1
+
+
+def test_new_process_of_same_exe_reuses_description(resolver):
+    cache = ProcessInfoCache(resolver)
+    resolver.procs[200] = (3.0, "Code.exe", r"C:\vscode\Code.exe")
+    assert cache.app_name(100) == cache.app_name(200) == "Visual Studio Code"
+    assert resolver.calls["file_description"] == 1
+
+
+def test_exe_upgrade_invalidates_description(resolver):
+    cache = ProcessInfoCache(resolver)
+    assert cache.app_name(100) == "Visual Studio Code"
+    resolver.files[r"C:\vscode\Code.exe"] = (11.0, "Visual Studio Code Insiders")
+    resolver.procs[101] = (4.0, "Code.exe", r"C:\vscode\Code.exe")
+    assert cache.app_name(101) == "Visual Studio Code Insiders"
+
+
+def test_missing_description_is_cached_and_falls_back(resolver):
+    cache = ProcessInfoCache(resolver)
+    resolver.procs[300] = (1.0, "chrome.exe", r"C:\chrome\chrome.exe")
+    resolver.procs[301] = (2.0, "chrome.exe", r"C:\chrome\chrome.exe")
+    resolver.files[r"C:\chrome\chrome.exe"] = (7.0, None)
+    assert cache.app_name(300) == NAME_MAP["chrome.exe"]
+    assert cache.app_name(301) == NAME_MAP["chrome.exe"]
+    # 没有版本信息的 exe 同样被缓存，不会每个进程都重查一次
+    assert resolver.calls["file_description"] == 1
+
+
+def test_no_exe_uses_process_name(resolver):
+    cache = ProcessInfoCache(resolver)
+    resolver.procs[400] = (1.0, "someapp.exe", None)
+    assert cache.app_name(400) == "someapp.exe"
+    assert resolver.calls["file_description"] == 0
+
+
+def test_pid_lru_bound(resolver):
+    cache = ProcessInfoCache(resolver, max_pids=3)
+    for pid in range(10):
+        resolver.procs[pid] = (1.0, f"p{pid}.exe", None)
+        cache.app_name(pid)
+    assert list(cache._pids) == [7, 8, 9]
+    # 命中的条目移到末尾，最久未用的先被淘汰
+    cache.app_name(7)
+    resolver.procs[10] = (1.0, "p10.exe", None)
+    cache.app_name(10)
+    assert list(cache._pids) == [9, 7, 10]
+
+
+def test_exe_lru_bound(resolver):
+    cache = ProcessInfoCache(resolver, max_exes=2)
+    for pid in range(5):
+        path = rf"C:\apps\a{pid}.exe"
+        resolver.procs[pid] = (1.0, f"a{pid}.exe", path)
+        resolver.files[path] = (1.0, f"App {pid}")
+        assert cache.app_name(pid) == f"App {pid}"
+    assert len(cache._exes) == 2
+    assert [k[0] for k in cache._exes] == [r"C:\apps\a3.exe", r"C:\apps\a4.exe"]
+
+
+def test_clear(resolver):
+    cache = ProcessInfoCache(resolver)
+    cache.app_name(100)
+    cache.clear()
+    cache.app_name(100)
+    assert cache.misses == 2
+    assert resolver.calls["file_description"] == 2
@@ -0,0 +1,63 @@
+"""sqlstore：读取路径只读打开、不执行 DDL；兼容没有 host 列的旧库。"""
+
+import sqlite3
+
+import pytest
+
+import sqlstore
+from core import local_host
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "whatdidido.db")
+    with sqlstore.connect(path) as conn:
+        sqlstore.insert_rows(conn, "2025-12-01", [(0, 600, "Code.exe", "a"), (3000, 4200, "chrome.exe", "b")])
+    conn.close()
+    return path
+
+
+def test_reader_is_read_only(db):
+    conn = sqlstore.connect_readonly(db)
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("CREATE TABLE x (a)")
+    conn.close()
+
+
+def test_reader_missing_db(tmp_path):
+    path = str(tmp_path / "none.db")
+    assert sqlstore.connect_readonly(path) is None
+    assert sqlstore.minutes_for_days(["2025-12-01"], path=path) == {}
+    assert not (tmp_path / "none.db").exists()
+
+
+def test_reads_do_not_change_schema(db):
+    # 用户手工删掉了索引：只读路径不会重建它
+    with sqlite3.connect(db) as conn:
+        conn.execute("DROP INDEX ix_intervals_process")
+    conn.close()
+    assert sqlstore.minutes_for_days(["2025-12-01"], path=db) == {"Code.exe": 10.0, "chrome.exe": 20.0}
+    assert sqlstore.stored_days(db) == ["2025-12-01"]
+    with sqlite3.connect(db) as conn:
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert "ix_intervals_process" not in names
+
+
+def test_old_database_without_host(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE intervals (id INTEGER PRIMARY KEY, day TEXT, start INTEGER, "end" INTEGER, process TEXT, window TEXT)')
+    conn.execute("INSERT INTO intervals (day, start, \"end\", process, window) VALUES ('2025-12-01', 3600, 7260, 'Code.exe', 'a')")
+    conn.commit()
+    conn.close()
+    assert sqlstore.minutes_for_days(["2025-12-01"], by="host", path=path) == {local_host(): 61.0}
+    hours = sqlstore.hour_seconds("2025-12-01", by="host", path=path)
+    assert hours[local_host()][1:3] == [3600.0, 60.0]
+    df = sqlstore.load_day("2025-12-01", path)
+    assert df["host"].isna().all()
+
+
+def test_delete_day_still_writes(db):
+    sqlstore.delete_day("2025-12-01", db)
+    assert sqlstore.stored_days(db) == []
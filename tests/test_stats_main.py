@@ -0,0 +1,62 @@
+"""stats.main 单日统计：能由 aggcache 回答时不解析数据文件；没有数据时直接返回；批量渲染找得到各种存储中的日期。"""
+
+import os
+import sys
+
+import pytest
+
+import stats
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "2025-12-01.csv").write_text(
+        "start_time,end_time,process,window\n09:00:00,10:00:00,Code.exe,a\n10:00:00,10:30:00,chrome.exe,b\n",
+        encoding="utf-8",
+    )
+    monkeypatch.chdir(tmp_path)
+    plotted = []
+    monkeypatch.setattr(stats, "plot_minutes", lambda target, *a, **k: plotted.append(target.minutes()))
+    loads = []
+    load = stats.load_dataframe
+    monkeypatch.setattr(stats, "load_dataframe", lambda path: loads.append(path) or load(path))
+    return plotted, loads
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["stats.py", *argv])
+    return stats.main()
+
+
+def test_full_day_does_not_parse_file(workdir, monkeypatch, capsys):
+    plotted, loads = workdir
+    assert run(monkeypatch, "--date", "2025-12-01") == 0
+    assert loads == []
+    assert plotted[0].to_dict() == {"Code.exe": 60.0, "chrome.exe": 30.0}
+    assert "90.0" in capsys.readouterr().out
+
+
+def test_unaligned_range_parses_file(workdir, monkeypatch):
+    plotted, loads = workdir
+    run(monkeypatch, "--date", "2025-12-01", "--start", "09:30:00", "--end", "10:15:00")
+    assert loads == [os.path.join("data", "2025-12-01.csv")]
+    assert plotted[0].to_dict() == {"Code.exe": 30.0, "chrome.exe": 15.0}
+
+
+def test_missing_day(workdir, monkeypatch, capsys):
+    plotted, _ = workdir
+    assert run(monkeypatch, "--date", "2030-01-01") == 0
+    assert plotted == []
+    assert "No data file" in capsys.readouterr().out
+
+
+def test_batch_renders_sqlite_day(workdir):
+    import sqlstore
+
+    sqlstore.import_files(remove=True)
+    assert stats.day_source("2025-12-01") == sqlstore.DB_FILE
+    assert stats.day_source("2030-01-01") is None
+    written = sorted(stats._render_day("2025-12-01", "assets"))
+    assert written == [os.path.join("assets", "2025-12-01.png"), os.path.join("assets", "2025-12-01_pie.png")]
+    assert stats._render_day("2025-12-01", "assets") == []
@@ -0,0 +1,243 @@
+"""向量化聚合（stats.compute_minutes* / _hour_matrix / IntervalIndex）与向量化前逐行实现的等价性。
+
+等价性只在旧实现能处理的输入（时间可解析、不跨午夜）上比较；跨午夜与坏行另行测试。
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import stats
+
+DAY = 24 * 3600
+
+
+# ---- 向量化前的实现（baseline 中 stats.py 原样复制，作为参考） ----
+
+def time_to_seconds(t):
+    h, m, s = map(int, t.split(":"))
+    return h * 3600 + m * 60 + s
+
+
+def compute_minutes(df: pd.DataFrame) -> pd.Series:
+    if "duration" not in df.columns:
+        df["duration"] = df.apply(
+            lambda r: time_to_seconds(r["end_time"]) - time_to_seconds(r["start_time"]),
+            axis=1,
+        )
+    summary = df.groupby("process")["duration"].sum().sort_values(ascending=False)
+    minutes = summary / 60
+    return minutes
+
+def compute_minutes_in_range(df: pd.DataFrame, start: str | None, end: str | None) -> pd.Series:
+    """按给定时间区间裁剪每条记录，仅统计与区间重叠的部分时长（分钟），并按进程聚合。"""
+    if start is None and end is None:
+        return compute_minutes(df)
+
+    start_s = time_to_seconds(start) if start else 0
+    end_s = time_to_seconds(end) if end else 24 * 3600
+
+    rows = []
+    for _, r in df.iterrows():
+        s = time_to_seconds(r["start_time"])
+        e = time_to_seconds(r["end_time"])
+        if e < s:
+            continue
+        # 计算与区间 [start_s, end_s] 的重叠部分
+        overlap_s = max(s, start_s)
+        overlap_e = min(e, end_s)
+        if overlap_e > overlap_s:
+            rows.append((r["process"], (overlap_e - overlap_s) / 60.0))
+
+    if not rows:
+        return pd.Series(dtype=float)
+    agg = {}
+    for proc, mins in rows:
+        agg[proc] = agg.get(proc, 0.0) + mins
+    return pd.Series(agg).sort_values(ascending=False)
+
+def compute_minutes_by_hour(df: pd.DataFrame) -> Dict[str, List[Tuple[int, float]]]:
+    """按小时聚合每个进程的用时（分钟）。返回 {process: [(hour, minutes), ...]}。
+    小时取 start_time 所在小时，以记录跨度拆分到跨越的各小时桶。
+    """
+    # 先确保有 duration
+    if "duration" not in df.columns:
+        df["duration"] = df.apply(
+            lambda r: time_to_seconds(r["end_time"]) - time_to_seconds(r["start_time"]),
+            axis=1,
+        )
+
+    buckets: Dict[str, Dict[int, float]] = {}
+    for _, row in df.iterrows():
+        start_s = time_to_seconds(row["start_time"])  # 秒
+        end_s = time_to_seconds(row["end_time"])      # 秒
+        proc = str(row["process"])
+        if end_s < start_s:
+            # 容错：若时间倒序，跳过
+            continue
+        if proc not in buckets:
+            buckets[proc] = {}
+
+        # 将区间拆分到每个小时边界（以本地当天 0 点为起点）
+        cur = start_s
+        while cur < end_s:
+            hour_start = (cur // 3600) * 3600
+            hour_end = hour_start + 3600
+            seg_end = min(end_s, hour_end)
+            seg_minutes = (seg_end - cur) / 60.0
+            hour = int(hour_start // 3600)
+            buckets[proc][hour] = buckets[proc].get(hour, 0.0) + seg_minutes
+            cur = seg_end
+
+    # 排序并转换为列表
+    result: Dict[str, List[Tuple[int, float]]] = {}
+    for proc, hm in buckets.items():
+        # 过滤掉接近 0 的值并按小时排序
+        items = [(h, m) for h, m in sorted(hm.items()) if m > 0.01]
+        result[proc] = items
+    return result
+
+
+# ---- 数据 ----
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=["start_time", "end_time", "process", "window"])
+
+
+def _fmt(x):
+    return f"{x // 3600:02d}:{x // 60 % 60:02d}:{x % 60:02d}"
+
+
+def _random_frame(n, seed):
+    """时间均可解析、不跨午夜的记录（结束最晚为 24:00:00），含零时长。"""
+    rng = np.random.default_rng(seed)
+    start = rng.integers(0, DAY, n)
+    end = np.minimum(start + rng.integers(0, 3 * 3600, n), DAY)
+    procs = rng.choice(["Code.exe", "chrome.exe", "微信", "explorer.exe"], n)
+    return _frame([[_fmt(int(s)), _fmt(int(e)), p, f"w{i % 7}"] for i, (s, e, p) in enumerate(zip(start, end, procs))])
+
+
+FRAMES = {
+    "random": _random_frame(2000, 1),
+    "boundaries": _frame(
+        [
+            ["00:00:00", "24:00:00", "explorer.exe", "c"],  # 整天（写入器在零点拆分时的形式）
+            ["08:59:59", "09:00:01", "Code.exe", "a"],
+            ["09:00:00", "10:00:00", "Code.exe", "a"],
+            ["12:00:00", "12:00:00", "微信", "d"],  # 零时长
+            ["12:59:59", "13:00:30", "chrome.exe", "b"],  # 跨整点的短记录
+        ]
+    ),
+}
+
+RANGES = [
+    (None, None),
+    ("09:00:00", "17:00:00"),
+    ("09:13:07", None),
+    (None, "00:10:00"),
+    ("23:00:00", "23:59:59"),
+    ("17:00:00", "09:00:00"),  # 起点晚于终点
+    ("30:00:00", "40:00:00"),  # 超出一天
+]
+
+
+def _assert_same(series, expected):
+    got = {k: float(v) for k, v in series.items()}
+    want = {k: float(v) for k, v in expected.items()}
+    assert got.keys() == want.keys()
+    for k in got:
+        assert got[k] == pytest.approx(want[k], abs=1e-9), k
+
+
+# ---- 与旧实现比较 ----
+
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_compute_minutes(name):
+    _assert_same(stats.compute_minutes(FRAMES[name].copy()), compute_minutes(FRAMES[name].copy()))
+
+
+@pytest.mark.parametrize("name", list(FRAMES))
+@pytest.mark.parametrize("start,end", RANGES)
+def test_compute_minutes_in_range(name, start, end):
+    got = stats.compute_minutes_in_range(FRAMES[name].copy(), start, end)
+    _assert_same(got, compute_minutes_in_range(FRAMES[name].copy(), start, end))
+
+
+@pytest.mark.parametrize("name", list(FRAMES))
+@pytest.mark.parametrize("start,end", [r for r in RANGES if r != (None, None)])
+def test_interval_index_matches_clipping(name, start, end):
+    index = stats.IntervalIndex(FRAMES[name])
+    _assert_same(index.minutes_in_range(start, end), compute_minutes_in_range(FRAMES[name].copy(), start, end))
+
+
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_compute_minutes_by_hour(name):
+    got = stats.compute_minutes_by_hour(FRAMES[name].copy())
+    expected = compute_minutes_by_hour(FRAMES[name].copy())
+    assert got.keys() == expected.keys()
+    for proc, items in expected.items():
+        assert [h for h, _ in got[proc]] == [h for h, _ in items], proc
+        assert [m for _, m in got[proc]] == pytest.approx([m for _, m in items]), proc
+
+
+# ---- 跨午夜与坏行（旧实现会丢弃或直接报错，这里按当前约定单独检查） ----
+
+MIDNIGHT = _frame(
+    [
+        ["23:30:00", "00:15:00", "Code.exe", "a"],  # 跨午夜：计到 24:00
+        ["23:59:59", "00:00:01", "chrome.exe", "b"],
+        ["23:00:00", "25:00:00", "explorer.exe", "c"],  # 结束晚于 24:00：截断
+        ["10:00:00", "10:30:00", "Code.exe", "a"],
+    ]
+)
+BAD = _frame(
+    [
+        ["", "09:00:00", "Code.exe", "x"],  # 空值
+        ["abc", "10:00:00", "chrome.exe", "y"],  # 无法解析
+        ["9:05:03", "9:15:03", "微信", "z"],  # 非定宽，可解析
+        ["11:00:00", "11:10:00", "Code.exe", "w"],
+    ]
+)
+
+
+def test_midnight_minutes():
+    expected = {"Code.exe": 60.0, "chrome.exe": 1 / 60, "explorer.exe": 60.0}
+    _assert_same(stats.compute_minutes(MIDNIGHT.copy()), expected)
+    _assert_same(stats.compute_minutes_in_range(MIDNIGHT.copy(), "23:00:00", None), {**expected, "Code.exe": 30.0})
+    _assert_same(stats.IntervalIndex(MIDNIGHT).minutes_in_range("23:45:00", None), {"Code.exe": 15.0, "chrome.exe": 1 / 60, "explorer.exe": 15.0})
+    _assert_same(stats.compute_minutes_in_range(MIDNIGHT.copy(), None, "10:15:00"), {"Code.exe": 15.0})
+
+
+def test_midnight_by_hour():
+    got = stats.compute_minutes_by_hour(MIDNIGHT.copy())
+    assert got == {"Code.exe": [(10, 30.0), (23, 30.0)], "chrome.exe": [(23, 1 / 60)], "explorer.exe": [(23, 60.0)]}
+
+
+def test_bad_rows_are_skipped():
+    _assert_same(stats.compute_minutes(BAD.copy()), {"Code.exe": 10.0, "chrome.exe": 0.0, "微信": 10.0})
+    _assert_same(stats.compute_minutes_in_range(BAD.copy(), "09:00:00", None), {"Code.exe": 10.0, "微信": 10.0})
+    assert stats.compute_minutes_by_hour(BAD.copy()) == {"Code.exe": [(11, 10.0)], "微信": [(9, 10.0)]}
+
+
+def test_empty_frame():
+    assert stats.compute_minutes(_frame([])).empty
+    assert stats.compute_minutes_in_range(_frame([]), "09:00:00", None).empty
+    assert stats.compute_minutes_by_hour(_frame([])) == {}
+
+
+def test_interval_arrays_clip_at_midnight():
+    df = _frame([["23:30:00", "00:15:00", "Code.exe", "a"], ["23:00:00", "25:00:00", "Code.exe", "b"]])
+    s, e, valid = stats._interval_arrays(df)
+    assert valid.all()
+    assert s.tolist() == [23 * 3600 + 1800, 23 * 3600] and e.tolist() == [DAY, DAY]
+    names, matrix = stats._hour_matrix(s, e, df["process"].to_numpy(dtype=object))
+    assert names == ["Code.exe"]
+    assert matrix.shape == (1, 24)
+    assert matrix[0, 23] == 5400 and matrix.sum() == 5400
+
+
+def test_hour_matrix_empty():
+    names, matrix = stats._hour_matrix(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), [])
+    assert names == [] and matrix.shape == (0, 24)
@@ -1,27 +1,69 @@
 import time
 import os
 import csv
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, time as dtime, timedelta
 
-import win32gui
-import win32process
-import psutil
-import win32api
+try:
+    import win32gui
+    import win32process
+    import psutil
+    import win32api
+except ImportError:
+    # 非 Windows 环境（或未安装 pywin32）下仍可导入本模块，复用记录写入等逻辑
+    win32gui = win32process = psutil = win32api = None
 
-import pystray
-from pystray import MenuItem as item
-from PIL import Image, ImageDraw
+import re
 import threading
 import sys
 import atexit
 import ctypes
 import subprocess
-import stats
+import binlog
+import checkpoint
+import core
+import ipc
+import metrics
+import sources
 
+# 托盘常驻进程只依赖轻量的 core；pystray/PIL 在 main() 中导入，不加载 pandas/matplotlib；
+# sqlstore（sqlite3）仅在 SQLite 存储或清空数据时导入
 
-CHECK_INTERVAL = 2  # 每 2 秒检测一次窗口变化
-DATA_DIR = "data"
+
+CHECK_INTERVAL = 2  # 出错后的重试间隔；窗口检测由 sources.py 的事件源负责
+IDLE_TICK = 15  # 无窗口变化时最长等待秒数，到时执行刷写等维护
+DATA_DIR = core.DATA_DIR
 STATE_FILE = os.path.join(DATA_DIR, "state.txt")
+STORAGE_FORMAT = "csv"  # 记录存储格式："csv"、"binlog"（紧凑二进制，见 binlog.py）或 "sqlite"（见 sqlstore.py）
+TIME_SCHEMA = "hms"  # CSV 时间列结构："hms"（HH:MM:SS）、"epoch"（整数纪元秒）或 "epoch_ms"（纪元毫秒）
+METRICS_ENABLED = False  # 埋点开关：开启后统计耗时/异常并定期写入 data/metrics.jsonl（见 metrics.py）
+MIN_DURATION = 0  # 短于该秒数的窗口不单独成行，并入前一段（0 表示不去抖，默认原样记录每次切换）
+# 可选的标题归一化规则 (正则, 替换文本)：去掉未读计数、未保存标记、进度、转圈动画与括号内的计时器
+VOLATILE_TITLE_RULES = [
+    (r"^\(\d+\)\s*", ""),  # 未读计数 "(3) Slack"
+    (r"^[●•*]\s*", ""),  # 未保存标记 "● file.py - VS Code"
+    (r"\b\d{1,3}(\.\d+)?%", ""),  # 进度百分比
+    (r"[\u2800-\u28ff]", ""),  # 盲文点阵转圈动画
+    (r"[(\[]\d{1,2}:\d{2}(:\d{2})?[)\]]", ""),  # 括号内的计时器 "(12:34)" / "[01:02:03]"，标题正文中的时刻保留
+    (r"\s{2,}", " "),
+]
+# 记录前对窗口标题做的归一化替换，按顺序应用；默认 [] 原样记录，需要时设为 VOLATILE_TITLE_RULES
+TITLE_RULES = []
+
+
+_title_rules = None  # (TITLE_RULES, [(编译后的正则, 替换文本)])，首次使用时编译
+
+
+def normalize_title(title):
+    """按 TITLE_RULES 归一化窗口标题，去掉计数、转圈、进度等易变部分。"""
+    global _title_rules
+    if not title or not TITLE_RULES:
+        return title
+    if _title_rules is None or _title_rules[0] is not TITLE_RULES:
+        _title_rules = (TITLE_RULES, [(re.compile(p), r) for p, r in TITLE_RULES])
+    for pattern, repl in _title_rules[1]:
+        title = pattern.sub(repl, title)
+    return title.strip(" -–—|")
 
 
 def _file_description(path: str) -> str | None:
@@ -58,34 +100,111 @@ def _file_description(path: str) -> str | None:
     return None
 
 
+# 针对常见进程名提供更友好的名称映射（无版本信息时使用）
+NAME_MAP = {
+    "Code.exe": "Visual Studio Code",
+    "msedge.exe": "Microsoft Edge",
+    "chrome.exe": "Google Chrome",
+    "explorer.exe": "文件资源管理器",
+    "python.exe": "Python",
+}
+
+
+class Win32ProcessResolver:
+    """查询进程与可执行文件信息的系统调用；ProcessInfoCache 通过它访问系统，测试时可替换。"""
+
+    def create_time(self, pid: int) -> float:
+        return psutil.Process(pid).create_time()
+
+    def process_name(self, pid: int) -> str:
+        return psutil.Process(pid).name()
+
+    def exe(self, pid: int) -> str | None:
+        try:
+            return psutil.Process(pid).exe()
+        except Exception:
+            return None
+
+    def exe_mtime(self, path: str) -> float | None:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def file_description(self, path: str) -> str | None:
+        return _file_description(path)
+
+
+class ProcessInfoCache:
+    """PID -> 应用名缓存。
+
+    - 以 PID 为键，同时记录进程创建时间，PID 被新进程复用时自动失效；
+    - 版本信息（GetFileVersionInfo/VerQueryValue）以 (exe 路径, mtime) 为键缓存，
+      同一程序的新进程或升级前后的文件都能正确命中/失效；
+    - 两级缓存均为有界 LRU。
+    """
+
+    def __init__(self, resolver=None, max_pids: int = 256, max_exes: int = 128):
+        self.resolver = resolver or Win32ProcessResolver()
+        self.max_pids = max_pids
+        self.max_exes = max_exes
+        self._pids: OrderedDict = OrderedDict()  # pid -> (create_time, app_name)
+        self._exes: OrderedDict = OrderedDict()  # (path, mtime) -> description | None
+        self.hits = 0
+        self.misses = 0
+
+    def app_name(self, pid: int) -> str:
+        created = self.resolver.create_time(pid)
+        entry = self._pids.get(pid)
+        if entry is not None and entry[0] == created:
+            self._pids.move_to_end(pid)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        name = self._resolve(pid)
+        self._pids[pid] = (created, name)
+        self._pids.move_to_end(pid)
+        while len(self._pids) > self.max_pids:
+            self._pids.popitem(last=False)
+        return name
+
+    def _resolve(self, pid: int) -> str:
+        exe = self.resolver.exe(pid)
+        app = self._description(exe) if exe else None
+        if app:
+            return app
+        pname = self.resolver.process_name(pid)
+        return NAME_MAP.get(pname, pname)
+
+    def _description(self, path: str) -> str | None:
+        key = (path, self.resolver.exe_mtime(path))
+        if key in self._exes:
+            self._exes.move_to_end(key)
+            return self._exes[key]
+        desc = self.resolver.file_description(path)
+        self._exes[key] = desc
+        while len(self._exes) > self.max_exes:
+            self._exes.popitem(last=False)
+        return desc
+
+    def clear(self):
+        self._pids.clear()
+        self._exes.clear()
+
+
+_process_cache = ProcessInfoCache()
+
+
 def get_active_window():
     hwnd = win32gui.GetForegroundWindow()
     _, pid = win32process.GetWindowThreadProcessId(hwnd)
-    process = psutil.Process(pid)
-    exe = None
-    try:
-        exe = process.exe()
-    except Exception:
-        exe = None
-    app = _file_description(exe) if exe else None
-    app_name = app or process.name()
-    if not app:
-        # 针对常见进程名提供更友好的名称映射
-        name_map = {
-            "Code.exe": "Visual Studio Code",
-            "msedge.exe": "Microsoft Edge",
-            "chrome.exe": "Google Chrome",
-            "explorer.exe": "文件资源管理器",
-            "python.exe": "Python",
-        }
-        app_name = name_map.get(process.name(), process.name())
-    return app_name, win32gui.GetWindowText(hwnd)
+    return _process_cache.app_name(pid), win32gui.GetWindowText(hwnd)
 
 
 def today_file():
     os.makedirs(DATA_DIR, exist_ok=True)
-    name = datetime.now().strftime("%Y-%m-%d") + ".csv"
-    return os.path.join(DATA_DIR, name)
+    return core.today_file()
 
 
 def set_state(running: bool):
@@ -97,85 +216,754 @@ def set_state(running: bool):
         pass
 
 
+HEADER = core.HEADER
+FLUSH_INTERVAL = 30  # 缓冲记录最长滞留秒数
+FLUSH_ROWS = 64  # 缓冲达到该条数立即写盘
+
+
+def split_days(start: datetime, end: datetime) -> list[tuple[str, datetime, datetime]]:
+    """把区间 [start, end] 在本地零点处拆开，返回 [(日期, 片段起点, 片段终点), ...]。"""
+    if end < start:
+        # 时钟回拨：按零长度区间处理
+        end = start
+    pieces = []
+    while True:
+        midnight = datetime.combine(start.date() + timedelta(days=1), dtime.min)
+        day = start.strftime("%Y-%m-%d")
+        if end <= midnight:
+            pieces.append((day, start, end))
+            return pieces
+        pieces.append((day, start, midnight))
+        start = midnight
+
+
+class RecordWriter:
+    """长期持有当日 CSV 句柄并批量写入。
+
+    记录先进入内存缓冲，达到 ``flush_rows`` 条或距上次写盘超过 ``flush_interval``
+    秒时一次性写出；跨过午夜后自动切换到新一天的 ``today_file()``。
+    输出与逐条 ``csv.writer`` 追加完全一致（UTF-8，``\\r\\n`` 行尾）。
+
+    起止时间为 datetime 时，跨午夜的区间拆成逐日片段写入各自日期的文件（前一段
+    以 24:00:00 结束），时间列按文件表头的结构（``schema``）格式化；追加到已有文件时
+    沿用该文件的结构。
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, flush_rows: int = FLUSH_ROWS, schema: str | None = None):
+        self.flush_interval = flush_interval
+        self.flush_rows = max(1, flush_rows)
+        self.schema = schema or TIME_SCHEMA
+        if self.schema not in core.SCHEMA_HEADERS:
+            raise ValueError(f"unknown time schema: {self.schema!r}")
+        self._lock = threading.Lock()
+        self._pending = []
+        self._day = None  # 缓冲记录所属日期
+        self._file = None
+        self._file_day = None
+        self._file_schema = None
+        self._writer = None
+        self._last_flush = time.monotonic()
+        self.metrics = None  # metrics.Metrics；None 表示不埋点
+
+    def write(self, start, end, process, window):
+        """写一条记录。start/end 为 datetime（按所属日期拆分）或 HH:MM:SS 字符串（记入今天）。"""
+        t0 = time.perf_counter() if self.metrics is not None else 0.0
+        if isinstance(start, datetime):
+            pieces = split_days(start, end)
+        else:
+            pieces = [(datetime.now().strftime("%Y-%m-%d"), start, end)]
+        with self._lock:
+            for day, s, e in pieces:
+                if day != self._day:
+                    # 跨天：先把前一天的缓冲写回前一天的文件
+                    self._flush_locked()
+                    self._day = day
+                self._pending.append([s, e, process, window])
+            if len(self._pending) >= self.flush_rows or self._due():
+                self._flush_locked()
+        if self.metrics is not None:
+            self.metrics.observe("write", time.perf_counter() - t0)
+
+    def flush_if_due(self):
+        """供采集循环每次 tick 调用：超过时间阈值才写盘。"""
+        if self._pending and self._due():
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def ensure_header(self):
+        """确保今天的 CSV 文件存在且有表头（打开当日文件即可）。"""
+        with self._lock:
+            day = datetime.now().strftime("%Y-%m-%d")
+            if day != self._day:
+                self._flush_locked()
+                self._day = day
+            self._open_locked(day)
+
+    def snapshot(self) -> dict | None:
+        """尚未写盘的缓冲，供检查点保存：{"day", "mark", "rows": [[起点时间戳, 终点时间戳, 进程, 标题], ...]}。
+
+        不触发写盘。mark 为该天存储当前的位置（见 stored_mark）；缓冲写盘后位置必然变化，
+        恢复时据此判断检查点之后缓冲是否已经落盘。缓冲为空时返回 None。
+        """
+        with self._lock:
+            if not self._pending:
+                return None
+            base = core.day_start_epoch(self._day)
+
+            def ts(value):
+                return value.timestamp() if isinstance(value, datetime) else base + core.time_to_seconds(value)
+
+            rows = [[ts(s), ts(e), p, w] for s, e, p, w in self._pending]
+            return {"day": self._day, "mark": self._mark_locked(self._day), "rows": rows}
+
+    def stored_mark(self, day: str) -> int:
+        """某天存储的当前位置（日文件大小；SQLite 为该天的记录数），只在写盘时增大。"""
+        with self._lock:
+            return self._mark_locked(day)
+
+    def _mark_locked(self, day) -> int:
+        try:
+            return os.path.getsize(core.today_file(day))
+        except OSError:
+            return 0
+
+    def discard(self):
+        """丢弃尚未写盘的记录（用于清除今日数据）。"""
+        with self._lock:
+            self._pending.clear()
+            self._close_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._close_locked()
+
+    def _due(self) -> bool:
+        return time.monotonic() - self._last_flush >= self.flush_interval
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        t0 = time.perf_counter() if self.metrics is not None else 0.0
+        self._open_locked(self._day)
+        self._write_locked(self._pending)
+        if self.metrics is not None:
+            self.metrics.observe("flush", time.perf_counter() - t0)
+            self.metrics.incr("rows_flushed", len(self._pending))
+        self._pending.clear()
+
+    def _time_value(self, value):
+        """把 datetime / HH:MM:SS 转为当前文件结构下的时间列值。"""
+        if self._file_schema == "hms":
+            if isinstance(value, datetime):
+                return core.seconds_to_time(self._day_seconds(value))
+            return value
+        if isinstance(value, datetime):
+            ts = value.timestamp()
+        else:
+            ts = core.day_start_epoch(self._file_day) + core.time_to_seconds(value)
+        return int(ts * 1000) if self._file_schema == "epoch_ms" else int(ts)
+
+    def _day_seconds(self, value: datetime) -> int:
+        """value 距所属文件日期零点的秒数（片段终点恰为次日零点时为 86400）。"""
+        midnight = datetime.strptime(self._file_day, "%Y-%m-%d")
+        return int((value - midnight).total_seconds())
+
+    def _write_locked(self, rows):
+        tv = self._time_value
+        self._writer.writerows([tv(s), tv(e), p, w] for s, e, p, w in rows)
+        self._file.flush()
+
+    def _open_locked(self, day):
+        if self._file is not None and self._file_day == day:
+            return
+        self._close_locked()
+        path = core.today_file(day)
+        os.makedirs(DATA_DIR, exist_ok=True)
+        f = open(path, "a", newline="", encoding="utf-8")
+        self._file = f
+        self._file_day = day
+        self._writer = csv.writer(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            self._file_schema = self.schema
+            self._writer.writerow(core.SCHEMA_HEADERS[self.schema])
+            f.flush()
+        else:
+            self._file_schema = _file_schema(path)
+
+    def _close_locked(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+        self._file = None
+        self._file_day = None
+        self._file_schema = None
+        self._writer = None
+
+
+def _file_schema(path: str) -> str:
+    """读取已有 CSV 的表头，判断其时间结构。"""
+    try:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return "hms"
+    return core.schema_of(header)
+
+
+class BinlogRecordWriter(RecordWriter):
+    """与 RecordWriter 相同的缓冲/跨天逻辑，落盘为 binlog 紧凑二进制格式。"""
+
+    def _write_locked(self, rows):
+        def tv(value):
+            return self._day_seconds(value) if isinstance(value, datetime) else value
+
+        self._file.append_rows([tv(s), tv(e), p, w] for s, e, p, w in rows)
+
+    def _open_locked(self, day):
+        if self._file is not None and self._file_day == day:
+            return
+        self._close_locked()
+        self._file = binlog.BinlogAppender(binlog.log_path(day, DATA_DIR))
+        self._file_day = day
+
+    def _mark_locked(self, day) -> int:
+        try:
+            return os.path.getsize(binlog.log_path(day, DATA_DIR))
+        except OSError:
+            return 0
+
+
+class SqliteRecordWriter(RecordWriter):
+    """与 RecordWriter 相同的缓冲/跨天逻辑，每次写盘为 SQLite 数据库中的一个插入事务。"""
+
+    def _write_locked(self, rows):
+        import sqlstore
+
+        def tv(value):
+            return self._day_seconds(value) if isinstance(value, datetime) else core.time_to_seconds(value)
+
+        sqlstore.insert_rows(self._file, self._file_day, [(tv(s), tv(e), p, w) for s, e, p, w in rows])
+
+    def _open_locked(self, day):
+        import sqlstore
+
+        if self._file is None:
+            self._file = sqlstore.connect()
+        self._file_day = day
+
+    def _mark_locked(self, day) -> int:
+        import sqlite3
+        import sqlstore
+
+        conn = self._file or sqlstore.connect_readonly(sqlstore.DB_FILE)
+        if conn is None:
+            return 0
+        try:
+            (count,) = conn.execute("SELECT COUNT(*) FROM intervals WHERE day = ?", (day,)).fetchone()
+        except sqlite3.Error:
+            count = 0
+        finally:
+            if conn is not self._file:
+                conn.close()
+        return count
+
+
+def make_writer() -> RecordWriter:
+    """按 STORAGE_FORMAT 创建记录写入器。"""
+    if STORAGE_FORMAT == "binlog":
+        return BinlogRecordWriter()
+    if STORAGE_FORMAT == "sqlite":
+        return SqliteRecordWriter()
+    return RecordWriter()
+
+
 def ensure_today_file_with_header():
     """确保今天的 CSV 文件存在且有表头。"""
     try:
-        path = today_file()
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        need_header = True
-        if os.path.exists(path):
-            try:
-                need_header = os.path.getsize(path) == 0
-            except OSError:
-                need_header = True
-        if (not os.path.exists(path)) or need_header:
-            with open(path, "a", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["start_time", "end_time", "process", "window"])
+        writer = make_writer()
+        writer.ensure_header()
+        writer.close()
     except Exception:
         pass
 
 
 def write_record(start, end, process, window):
-    path = today_file()
-    exists = os.path.exists(path)
-    need_header = True
-    if exists:
-        try:
-            need_header = os.path.getsize(path) == 0
-        except OSError:
-            need_header = True
-
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if not exists or need_header:
-            writer.writerow(["start_time", "end_time", "process", "window"])
-        writer.writerow([start, end, process, window])
+    """单条写入并立即落盘；采集循环使用 Tracker 持有的 RecordWriter 批量写入。"""
+    writer = make_writer()
+    writer.flush_rows = 1
+    try:
+        writer.write(start, end, process, window)
+    finally:
+        writer.close()
 
 
 class Tracker:
-    def __init__(self):
+    def __init__(
+        self,
+        writer: RecordWriter | None = None,
+        source=None,
+        on_change=None,
+        metrics=None,
+        checkpoint: "checkpoint.Checkpoint | None" = None,
+    ):
         self.running = False
         self.last_process = None
         self.last_window = None
-        self.last_start_time = None
+        self.last_start = None  # 当前窗口开始的时刻（datetime）
+        self.records = 0
+        # 已结束但尚未写出的一段 [start, end, process, window]：等待与后续区间合并
+        self._pending = None
+        self._last_raw = None
+        self.writer = writer or make_writer()
+        # 窗口事件源（见 sources.py）；None 时每次 loop() 创建默认事件源
+        self.source = source
+        # 窗口切换后的回调（无参数，在采集线程中调用），用于推送状态
+        self.on_change = on_change
+        # 埋点（metrics.Metrics）；None 时各埋点处只做一次判断
+        self.metrics = metrics
+        if metrics is not None:
+            self.writer.metrics = metrics
+        # 崩溃检查点（checkpoint.Checkpoint）；None 时不做检查点
+        self.checkpoint = checkpoint
+        # 采集线程每次 tick 的处理与其他线程调用的 stop()/discard() 互斥：
+        # 区间状态与检查点只在持锁时修改和写入，stop/discard 清空检查点后不会被旧状态覆盖
+        self._lock = threading.Lock()
+
+    @property
+    def last_start_time(self) -> str | None:
+        return self.last_start.strftime("%H:%M:%S") if self.last_start else None
+
+    def observe(self, when: datetime, process, window):
+        """处理一次窗口观测：归一化后的 (进程, 标题) 与上一窗口不同则结束上一段并开始新的一段。
+
+        上一段短于 MIN_DURATION 时并入暂存段；切回暂存段的窗口时接续该段，不另起一行。
+        """
+        if self.metrics is not None and (process, window) != self._last_raw:
+            self._last_raw = (process, window)
+            self.metrics.incr("intervals")
+        window = normalize_title(window)
+        if (process != self.last_process) or (window != self.last_window):
+            start = when
+            if self.last_process is not None:
+                self._finish(self.last_start, when, self.last_process, self.last_window)
+                p = self._pending
+                if p is not None and p[2] == process and p[3] == window:
+                    start = p[0]
+                    self._pending = None
+
+            self.last_process = process
+            self.last_window = window
+            self.last_start = start
+            if self.on_change is not None:
+                try:
+                    self.on_change()
+                except Exception:
+                    pass
+
+    def _finish(self, start: datetime, end: datetime, process, window):
+        """结束一段：过短或与暂存段相同则并入暂存段，否则写出暂存段并暂存本段。"""
+        p = self._pending
+        if p is not None and ((end - start).total_seconds() < MIN_DURATION or (p[2], p[3]) == (process, window)):
+            p[1] = end
+            return
+        self._commit()
+        self._pending = [start, end, process, window]
+
+    def _commit(self):
+        p, self._pending = self._pending, None
+        if p is None:
+            return
+        self.writer.write(*p)
+        self.records += 1
+        if self.metrics is not None:
+            self.metrics.record(p[1])
+            self.metrics.incr("rows")
+
+    def commit_due(self, now: datetime):
+        """当前窗口已持续 MIN_DURATION 以上时暂存段不会再被合并，写出它。"""
+        if self._pending is not None and (
+            self.last_start is None or (now - self.last_start).total_seconds() >= MIN_DURATION
+        ):
+            self._commit()
+
+    def discard(self, now: datetime | None = None):
+        """丢弃暂存段与尚未写盘的记录（用于清除今日数据），当前窗口从 now 起重新计时。
+
+        事件源只在窗口变化时通知，因此保留当前窗口而不是置空。
+        """
+        with self._lock:
+            self._pending = None
+            if self.last_process is not None:
+                self.last_start = now or datetime.now()
+            self.writer.discard()
+            if self.checkpoint is not None:
+                self.checkpoint.write(None)
+
+    def save_checkpoint(self, now: datetime):
+        """把打开的区间（截至 now）、暂存段与写入器中尚未写盘的缓冲写入检查点槽位。
+
+        只写槽位，不触发写盘：缓冲仍按写入器自己的节奏落盘。缓冲附带存储位置标记
+        （RecordWriter.snapshot），恢复时据此跳过检查点之后已经落盘的缓冲。
+        """
+        state = {}
+        buffered = self.writer.snapshot()
+        if buffered is not None:
+            state["buffered"] = buffered
+        if self.last_process is not None and self.last_start is not None:
+            state["open"] = [self.last_start.timestamp(), now.timestamp(), self.last_process, self.last_window]
+        p = self._pending
+        if p is not None:
+            state["pending"] = [p[0].timestamp(), p[1].timestamp(), p[2], p[3]]
+        self.checkpoint.write(state)
+        if self.metrics is not None:
+            self.metrics.incr("checkpoints")
 
     def loop(self):
-        while self.running:
+        m = self.metrics
+        probe = get_active_window if m is None else m.timed("resolve", get_active_window)
+        source = self.source or sources.default_source(probe)
+        try:
+            while self.running:
+                try:
+                    event = source.next(IDLE_TICK)
+                    # tick 耗时只计处理部分，不含等待窗口事件的时间
+                    t0 = time.perf_counter() if m is not None else 0.0
+                    with self._lock:
+                        # 等待事件期间可能已被 stop()：不再处理，也不再写检查点
+                        if not self.running:
+                            break
+                        if event is not None:
+                            self.observe(event.time, event.process, event.window)
+                        now = event.time if event is not None else datetime.now()
+                        self.commit_due(now)
+                        self.writer.flush_if_due()
+                        if self.checkpoint is not None and self.checkpoint.due():
+                            self.save_checkpoint(now)
+                    if m is not None:
+                        m.observe("tick", time.perf_counter() - t0)
+                        m.incr("events" if event is not None else "idle_ticks")
+                        m.maybe_export()
+                except StopIteration:
+                    break
+                except Exception as e:
+                    if m is not None:
+                        m.error("loop", e)
+                    time.sleep(CHECK_INTERVAL)
+        finally:
+            if source is not self.source:
+                source.close()
+
+    def stop(self, when: datetime | None = None):
+        with self._lock:
+            self.running = False
+            if self.last_process:
+                self._finish(self.last_start, when or datetime.now(), self.last_process, self.last_window)
+                # 已落盘，避免 stop() 与 atexit 重复写入同一条
+                self.last_process = None
+            self._commit()
+            self.writer.close()
+            if self.checkpoint is not None:
+                # 已全部落盘，清空检查点，下次启动无需恢复
+                self.checkpoint.write(None)
+
+
+def recover_checkpoint(writer: RecordWriter, slot: checkpoint.Checkpoint) -> int:
+    """把上次异常退出前检查点中的缓冲、暂存段与打开区间（截至最后一次检查点）补写到日文件。
+
+    缓冲只在其所属日期的存储位置与检查点时相同（即之后没有写盘）时补写。
+    返回补写的条数；完成后清空检查点。
+    """
+    state = slot.read()
+    if not state:
+        return 0
+    items = []
+    buffered = state.get("buffered")
+    try:
+        if buffered and writer.stored_mark(buffered["day"]) == buffered["mark"]:
+            items += list(buffered["rows"])
+    except (TypeError, KeyError, ValueError):
+        pass
+    items += [state.get("pending"), state.get("open")]
+    rows = 0
+    for item in items:
+        try:
+            start, end, process, window = item
+            start, end = datetime.fromtimestamp(start), datetime.fromtimestamp(end)
+        except (TypeError, ValueError, OverflowError, OSError):
+            continue
+        if end <= start:
+            continue
+        writer.write(start, end, process, window)
+        rows += 1
+    writer.flush()
+    slot.write(None)
+    return rows
+
+
+def clear_day_files(day: str):
+    """清空某天的数据：CSV 重置为只有表头，二进制日志直接删除（下次写入时重建），数据库中删除该日记录。
+
+    binlog / SQLite 存储时不留空 CSV：统计与实时视图优先读取 CSV，空文件会遮住之后记录的数据。
+    """
+    import sqlstore
+
+    sqlstore.delete_day(day)
+    path = core.today_file(day)
+    log = binlog.log_path(day, DATA_DIR)
+    for p in (log, binlog.strings_path(log)):
+        if os.path.exists(p):
+            os.remove(p)
+    if STORAGE_FORMAT in ("binlog", "sqlite"):
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(core.SCHEMA_HEADERS.get(TIME_SCHEMA, HEADER))
+
+
+class RecorderService:
+    """唯一的记录者：持有单写者锁（ipc.RecorderLock）与 Tracker，经本地 IPC 接受命令并推送状态。
+
+    同一时刻只有一个进程能 open() 成功，因此托盘与 GUI 不会各自写同一个日文件。
+    """
+
+    def __init__(self):
+        self.lock = ipc.RecorderLock()
+        self.server = None
+        self.tracker = None
+        self.metrics = None
+        self.checkpoint = None
+        self.listeners = []
+        self._thread = None
+        self._mutex = threading.RLock()
+
+    def open(self) -> bool:
+        """获取单写者锁并启动 IPC 服务；锁已被其他进程持有时返回 False。"""
+        if not self.lock.acquire():
+            return False
+        if METRICS_ENABLED:
+            self.metrics = metrics.Metrics(sink=metrics.MetricsFile())
+        self.checkpoint = checkpoint.Checkpoint()
+        self.tracker = Tracker(on_change=self._notify, metrics=self.metrics, checkpoint=self.checkpoint)
+        # 上次记录进程崩溃/断电时留下的打开区间，先补写
+        try:
+            recover_checkpoint(self.tracker.writer, self.checkpoint)
+        except Exception:
+            pass
+        self.server = ipc.Server(self.handle)
+        try:
+            self.server.start()
+        except OSError:
+            # 无法监听本地端口时仍可在本进程内记录
+            self.server = None
+        set_state(False)
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self.tracker is not None and self.tracker.running
+
+    def status(self) -> dict:
+        t = self.tracker
+        return {
+            "type": "state",
+            "running": self.running,
+            "process": t.last_process if t else None,
+            "since": t.last_start_time if t else None,
+            "records": t.records if t else 0,
+            "pid": os.getpid(),
+        }
+
+    def start(self) -> dict:
+        with self._mutex:
+            if not self.running:
+                if self._thread is not None and self._thread.is_alive():
+                    # 上一轮采集线程仍在等待事件源超时，换用新的 Tracker，旧线程随后自行退出
+                    self.tracker = Tracker(on_change=self._notify, metrics=self.metrics, checkpoint=self.checkpoint)
+                t = self.tracker
+                t.last_process = None
+                t.last_window = None
+                t.last_start = None
+                t.running = True
+                # 若当天文件不存在，则立即创建并写入表头，避免“未开始前无文件”的情况
+                t.writer.ensure_header()
+                self._thread = threading.Thread(target=t.loop, daemon=True)
+                self._thread.start()
+                set_state(True)
+        self._notify()
+        return self.status()
+
+    def stop(self) -> dict:
+        with self._mutex:
+            if self.running:
+                self.tracker.stop()
+                set_state(False)
+        self._notify()
+        return self.status()
+
+    def clear_today(self) -> dict:
+        with self._mutex:
+            t = self.tracker
+            # 丢弃尚未写盘的旧记录、当前窗口从此刻重新计时，避免清空后又写入旧区间
+            t.discard()
+            clear_day_files(datetime.now().strftime("%Y-%m-%d"))
+        self._notify()
+        return self.status()
+
+    def handle(self, msg: dict) -> dict:
+        """IPC 命令分发：status / start / stop / clear / metrics。"""
+        cmd = msg.get("cmd")
+        if cmd == "status":
+            return self.status()
+        if cmd == "metrics":
+            if self.metrics is None:
+                return {"type": "metrics", "enabled": False}
+            return {"type": "metrics", "enabled": True, **self.metrics.snapshot()}
+        if cmd == "start":
+            return self.start()
+        if cmd == "stop":
+            return self.stop()
+        if cmd == "clear":
+            return self.clear_today()
+        return {"error": f"unknown command: {cmd}"}
+
+    def _notify(self):
+        msg = self.status()
+        if self.server is not None:
+            self.server.broadcast(msg)
+        for fn in list(self.listeners):
             try:
-                process, window = get_active_window()
-                now = datetime.now().strftime("%H:%M:%S")
-
-                if (process != self.last_process) or (window != self.last_window):
-                    if self.last_process is not None:
-                        write_record(
-                            self.last_start_time,
-                            now,
-                            self.last_process,
-                            self.last_window,
-                        )
-
-                    self.last_process = process
-                    self.last_window = window
-                    self.last_start_time = now
-
-                time.sleep(CHECK_INTERVAL)
+                fn(msg)
             except Exception:
-                time.sleep(CHECK_INTERVAL)
+                pass
 
-    def stop(self):
-        self.running = False
-        now = datetime.now().strftime("%H:%M:%S")
-        if self.last_process:
-            write_record(
-                self.last_start_time,
-                now,
-                self.last_process,
-                self.last_window,
-            )
+    def close(self):
+        try:
+            self.stop()
+            if self.metrics is not None:
+                self.metrics.export()
+        finally:
+            if self.server is not None:
+                self.server.close()
+                self.server = None
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+                self.checkpoint = None
+            self.lock.release()
+
+
+class RecorderControl:
+    """托盘与 GUI 共用的记录控制入口。
+
+    本进程持锁时直接操作 RecorderService；否则经 IPC 把命令转发给持锁进程，
+    持锁进程退出后在下一次命令时自动接管。on_state(msg) 接收状态推送（可能在后台线程中调用）。
+    """
+
+    def __init__(self, host: bool = True, on_state=None):
+        self.on_state = on_state
+        self.service = None
+        self.client = ipc.Client()
+        self._subscribed = False
+        if host:
+            self._host()
+        self.connect()
+
+    @property
+    def local(self) -> bool:
+        return self.service is not None
+
+    def _host(self) -> bool:
+        service = RecorderService()
+        if not service.open():
+            return False
+        if self.on_state is not None:
+            service.listeners.append(self.on_state)
+        self.service = service
+        self.client.close()
+        self._subscribed = False
+        return True
+
+    def connect(self) -> bool:
+        """订阅其他进程的状态推送；本进程持锁或已订阅时直接返回 True。"""
+        if self.service is not None or self._subscribed:
+            return True
+        if self.on_state is None:
+            return False
+        self._subscribed = self.client.subscribe(self.on_state, self._on_remote_close)
+        return self._subscribed
+
+    def _on_remote_close(self):
+        self._subscribed = False
+        if self.service is None and self.on_state is not None:
+            self.on_state({"type": "state", "running": False, "disconnected": True})
+
+    def _call(self, cmd: str) -> dict:
+        if self.service is not None:
+            return self.service.handle({"cmd": cmd})
+        try:
+            return self.client.request(cmd)
+        except OSError:
+            pass
+        # 没有可达的记录进程：由本进程接管；锁被占用说明对端正在启动，稍后重试一次
+        if not self._host():
+            time.sleep(0.5)
+            try:
+                return self.client.request(cmd)
+            except OSError:
+                # 对端仍未就绪，或已退出而锁尚未释放：报告记录进程不可用
+                return {"type": "state", "running": False, "unavailable": True}
+        return self.service.handle({"cmd": cmd})
+
+    def start(self) -> dict:
+        return self._call("start")
+
+    def stop(self) -> dict:
+        return self._call("stop")
+
+    def clear_today(self) -> dict:
+        return self._call("clear")
+
+    def status(self) -> dict:
+        if self.service is not None:
+            return self.service.status()
+        try:
+            return self.client.request("status")
+        except (OSError, ValueError, RuntimeError):
+            return {"type": "state", "running": False}
+
+    def metrics(self) -> dict:
+        """记录进程的埋点快照；未开启埋点或无记录进程时 enabled 为 False。"""
+        if self.service is not None:
+            return self.service.handle({"cmd": "metrics"})
+        try:
+            return self.client.request("metrics")
+        except (OSError, ValueError, RuntimeError):
+            return {"type": "metrics", "enabled": False}
+
+    @property
+    def running(self) -> bool:
+        return bool(self.status().get("running"))
+
+    def close(self):
+        """本进程持锁时停止记录并释放锁；远程控制时只断开连接，不影响对端记录。"""
+        if self.service is not None:
+            self.service.close()
+            self.service = None
+        self.client.close()
 
 
 def create_image():
+    from PIL import Image, ImageDraw
+
     image = Image.new("RGB", (64, 64), color=(30, 30, 30))
     d = ImageDraw.Draw(image)
     d.rectangle((16, 16, 48, 48), fill=(0, 200, 255))
@@ -183,21 +971,15 @@ def create_image():
 
 
 def main():
-    tracker = Tracker()
-    # 初始不启动记录线程，等待用户点击“开始记录”
-    # 启动时将状态初始化为未记录
-    try:
-        set_state(False)
-    except Exception:
-        pass
+    import pystray
+    from pystray import MenuItem as item
+
+    # 单写者：获取锁成为记录进程；GUI 已持锁时本托盘经 IPC 控制它
+    recorder = RecorderControl(host=True)
 
     def quit_app(icon, item):
         try:
-            tracker.stop()
-        except Exception:
-            pass
-        try:
-            set_state(False)
+            recorder.close()
         except Exception:
             pass
         icon.stop()
@@ -224,25 +1006,21 @@ def main():
         threading.Thread(target=_worker, daemon=True).start()
 
     def start_tracking(icon, item):
-        if tracker.running:
-            return
         try:
-            tracker.running = True
-            tracker.last_process = None
-            tracker.last_window = None
-            tracker.last_start_time = None
-            # 若当天文件不存在，则立即创建并写入表头，避免“未开始前无文件”的情况
-            ensure_today_file_with_header()
-            threading.Thread(target=tracker.loop, daemon=True).start()
-            set_state(True)
+            if recorder.status().get("running"):
+                return
+            if recorder.start().get("unavailable"):
+                notify("记录进程不可用，请稍后重试。")
+                return
             notify("已开始记录。")
         except Exception:
             notify("启动记录失败")
 
     def stop_tracking(icon, item):
         try:
-            tracker.stop()
-            set_state(False)
+            if recorder.stop().get("unavailable"):
+                notify("记录进程不可用，请稍后重试。")
+                return
             notify("已停止记录。")
         except Exception:
             notify("停止记录失败")
@@ -250,7 +1028,7 @@ def main():
     def clear_today(icon, item):
         def worker():
             day = datetime.now().strftime("%Y-%m-%d")
-            path = stats.today_file(day)
+            path = core.today_file(day)
             # 使用原生消息框，系统模态并置顶，避免与托盘事件循环冲突
             try:
                 res = ctypes.windll.user32.MessageBoxW(
@@ -272,25 +1050,10 @@ def main():
                 pass
 
             try:
-                # 统一处理：若存在则清空并重置表头；若不存在则创建空文件含表头
-                os.makedirs(os.path.dirname(path), exist_ok=True)
-                with open(path, "w", newline="", encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["start_time", "end_time", "process", "window"])
-
-                # 重置当前跟踪状态，避免立刻写入旧区间
-                try:
-                    # 访问外部作用域的 tracker 对象
-                    nonlocal tracker
-                    tracker.last_process = None
-                    tracker.last_window = None
-                    tracker.last_start_time = None
-                except Exception:
-                    pass
-
-                # 将状态标记为已清空，若未运行则保持 stopped
-                set_state(tracker.running)
-
+                # 由持锁的记录进程清空（丢弃未写盘记录、重置表头、当前窗口重新计时）
+                if recorder.clear_today().get("unavailable"):
+                    notify("记录进程不可用，今日数据未清空。")
+                    return
                 notify("已清空今日数据。")
             except Exception:
                 notify("删除数据失败。")
@@ -353,13 +1116,13 @@ def main():
         ),
     )
 
-    # 确保进程退出时刷写最后一条
-    atexit.register(tracker.stop)
+    # 确保进程退出时刷写最后一条并释放锁
+    atexit.register(recorder.close)
 
     try:
         icon.run()
     except KeyboardInterrupt:
-        tracker.stop()
+        recorder.close()
         try:
             icon.stop()
         except Exception: